@@ -19,16 +19,22 @@ from app.routers.tools_backup_pro import router as tools_backup_pro_router
 from app.routers.tools_docker import router as tools_docker_router
 from app.routers.tools_fail2ban import router as tools_fail2ban_router
 from app.routers.tools_fw_profiles import router as tools_fw_profiles_router
+from app.routers.tools_jobs import router as tools_jobs_router
 from app.routers.tools_logs import router as tools_logs_router
 from app.routers.tools_main import router as tools_main_router
 from app.routers.tools_updates import router as tools_updates_router
 from app.runtime import stop_all_metrics
 from app.services.alerts import AlertsEngine
+from app.services.history import HISTORY
+from app.services.jobs import JOBS
+from app.services.outbox import OUTBOX
+from app.services.sessions import SESSIONS, PersistentFSMStorage
+from app.services.statedb import StateDatabase
 from app.services.storage import Storage
 
 
 def build_dispatcher(admin_middleware: AdminMiddleware) -> Dispatcher:
-    dispatcher = Dispatcher()
+    dispatcher = Dispatcher(storage=PersistentFSMStorage(SESSIONS))
     dispatcher.message.middleware(admin_middleware)
     dispatcher.callback_query.middleware(admin_middleware)
     dispatcher.include_router(menu_router)
@@ -45,6 +51,7 @@ def build_dispatcher(admin_middleware: AdminMiddleware) -> Dispatcher:
     dispatcher.include_router(tools_docker_router)
     dispatcher.include_router(tools_updates_router)
     dispatcher.include_router(tools_backup_pro_router)
+    dispatcher.include_router(tools_jobs_router)
     dispatcher.include_router(terminal_router)
     dispatcher.include_router(fallback_router)
     return dispatcher
@@ -52,19 +59,34 @@ def build_dispatcher(admin_middleware: AdminMiddleware) -> Dispatcher:
 
 async def main() -> None:
     settings = load_settings()
-    storage = Storage()
+    database = StateDatabase() if settings.state_backend == "sqlite" else None
+    storage = Storage(
+        flush_delay=settings.state_flush_delay,
+        max_staleness=settings.state_max_staleness,
+        database=database,
+    )
+    storage.start()
     bot = Bot(token=settings.bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
     middleware = AdminMiddleware(settings.admin_ids, storage)
     dispatcher = build_dispatcher(middleware)
-    alert_engine = AlertsEngine(bot, storage, settings.command_timeout)
+    OUTBOX.start(bot)
+    alert_engine = AlertsEngine(bot, storage, settings.command_timeout, settings.admin_ids)
     alert_task = asyncio.create_task(alert_engine.run())
+    HISTORY.open()
+    history_task = asyncio.create_task(HISTORY.run())
     try:
         await bot.delete_webhook(drop_pending_updates=True)
         await dispatcher.start_polling(bot, settings=settings, storage=storage)
     finally:
         alert_task.cancel()
-        await asyncio.gather(alert_task, return_exceptions=True)
+        history_task.cancel()
+        await asyncio.gather(alert_task, history_task, return_exceptions=True)
+        HISTORY.close()
         await stop_all_metrics()
+        await JOBS.shutdown()
+        await OUTBOX.stop()
+        await SESSIONS.close()
+        await storage.close()
 
 
 if __name__ == "__main__":
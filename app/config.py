@@ -11,6 +11,12 @@ class Settings:
     command_timeout: int
     terminal_timeout: int
     firewall_safe_ports: tuple[int, ...]
+    stream_interval: float
+    state_flush_delay: float
+    state_max_staleness: float
+    state_backend: str
+    backup_workers: int
+    backup_compression: str
 
 
 def _parse_admin_ids(primary_admin: int, raw_extra: str) -> tuple[int, ...]:
@@ -52,6 +58,14 @@ def _parse_ports(raw: str) -> tuple[int, ...]:
     return tuple(deduped)
 
 
+def _parse_float(raw: str, default: float, low: float, high: float) -> float:
+    try:
+        value = float(raw)
+    except ValueError:
+        return default
+    return max(low, min(value, high))
+
+
 def load_settings() -> Settings:
     load_dotenv()
     bot_token = os.getenv("BOT_TOKEN", "").strip()
@@ -65,10 +79,26 @@ def load_settings() -> Settings:
     command_timeout = int(os.getenv("COMMAND_TIMEOUT", "30"))
     terminal_timeout = int(os.getenv("TERMINAL_TIMEOUT", "60"))
     firewall_safe_ports = _parse_ports(os.getenv("FIREWALL_SAFE_PORTS", "22,80,443"))
+    stream_interval = _parse_float(os.getenv("STREAM_EDIT_INTERVAL", "3"), 3.0, 1.0, 60.0)
+    state_flush_delay = _parse_float(os.getenv("STATE_FLUSH_DELAY", "1"), 1.0, 0.0, 60.0)
+    state_max_staleness = _parse_float(os.getenv("STATE_MAX_STALENESS", "10"), 10.0, 0.0, 600.0)
+    state_backend = os.getenv("STATE_BACKEND", "json").strip().lower()
+    if state_backend not in {"json", "sqlite"}:
+        raise RuntimeError("STATE_BACKEND must be json or sqlite")
+    backup_workers = int(_parse_float(os.getenv("BACKUP_WORKERS", "0"), 0.0, 0.0, 64.0))
+    backup_compression = os.getenv("BACKUP_COMPRESSION", "gzip").strip().lower()
+    if backup_compression not in {"gzip", "zstd"}:
+        raise RuntimeError("BACKUP_COMPRESSION must be gzip or zstd")
     return Settings(
         bot_token=bot_token,
         admin_ids=_parse_admin_ids(primary_admin, extra_admins_raw),
         command_timeout=command_timeout,
         terminal_timeout=terminal_timeout,
         firewall_safe_ports=firewall_safe_ports,
+        stream_interval=stream_interval,
+        state_flush_delay=state_flush_delay,
+        state_max_staleness=state_max_staleness,
+        state_backend=state_backend,
+        backup_workers=backup_workers,
+        backup_compression=backup_compression,
     )
@@ -1,6 +1,10 @@
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from app.services.history import VIEWS
+from app.services.jobs import Job
+from app.services.metrics import DETAIL_VIEW
+
 
 def main_menu() -> InlineKeyboardMarkup:
     kb = InlineKeyboardBuilder()
@@ -54,16 +58,22 @@ def system_menu() -> InlineKeyboardMarkup:
     kb.button(text="Процессы", callback_data="sys:procs")
     kb.button(text="Kill PID", callback_data="sys:kill")
     kb.button(text="Службы", callback_data="sys:services")
+    kb.button(text="Очередь команд", callback_data="sys:queue")
     kb.button(text="⬅️ В главное", callback_data="menu:main")
-    kb.adjust(2, 2, 1)
+    kb.adjust(2, 2, 1, 1)
     return kb.as_markup()
 
 
-def metrics_menu() -> InlineKeyboardMarkup:
+def metrics_menu(level: str = "10m") -> InlineKeyboardMarkup:
     kb = InlineKeyboardBuilder()
+    for view in VIEWS:
+        mark = "• " if view.name == level else ""
+        kb.button(text=f"{mark}{view.title}", callback_data=f"sys:metrics:win:{view.name}")
+    mark = "• " if level == DETAIL_VIEW else ""
+    kb.button(text=f"{mark}Ядра / IO / сеть", callback_data=f"sys:metrics:win:{DETAIL_VIEW}")
     kb.button(text="Остановить", callback_data="sys:metrics:stop")
     kb.button(text="⬅️ Система", callback_data="menu:system")
-    kb.adjust(2)
+    kb.adjust(len(VIEWS), 1, 2)
     return kb.as_markup()
 
 
@@ -119,8 +129,9 @@ def tools_menu() -> InlineKeyboardMarkup:
     kb.button(text="⬆️ Обновления", callback_data="tools:updates")
     kb.button(text="💾 Бэкапы PRO", callback_data="tools:backup_pro")
     kb.button(text="👤 Админы", callback_data="tools:admins")
+    kb.button(text="🗂 Задачи", callback_data="tools:jobs")
     kb.button(text="⬅️ В главное", callback_data="menu:main")
-    kb.adjust(2, 2, 2, 2, 1)
+    kb.adjust(2, 2, 2, 2, 1, 1)
     return kb.as_markup()
 
 
@@ -142,10 +153,25 @@ def alerts_menu(enabled: bool) -> InlineKeyboardMarkup:
     kb.button(text="Disk порог", callback_data="al:set_disk")
     kb.button(text="Интервал", callback_data="al:set_interval")
     kb.button(text="Cooldown", callback_data="al:set_cooldown")
+    kb.button(text="Удержание", callback_data="al:set_hold")
+    kb.button(text="Гистерезис", callback_data="al:set_hysteresis")
     kb.button(text="Службы", callback_data="al:set_services")
+    kb.button(text="Правила", callback_data="al:rules")
+    kb.button(text="🔕 Мои уведомления", callback_data="al:mute")
+    kb.button(text="Журнал", callback_data="al:journal")
+    kb.button(text="📜 Инциденты 24ч", callback_data="al:incidents")
     kb.button(text="Тест алерта", callback_data="al:test")
     kb.button(text="⬅️ Инструменты", callback_data="menu:tools")
-    kb.adjust(1, 3, 2, 1, 1)
+    kb.adjust(1, 3, 2, 2, 2, 2, 2, 1)
+    return kb.as_markup()
+
+
+def alert_rules_menu() -> InlineKeyboardMarkup:
+    kb = InlineKeyboardBuilder()
+    kb.button(text="Добавить", callback_data="al:rule_add")
+    kb.button(text="Удалить", callback_data="al:rule_del")
+    kb.button(text="⬅️ Алерты", callback_data="tools:alerts")
+    kb.adjust(2, 1)
     return kb.as_markup()
 
 
@@ -230,10 +256,45 @@ def updates_confirm_menu() -> InlineKeyboardMarkup:
 def backup_pro_menu() -> InlineKeyboardMarkup:
     kb = InlineKeyboardBuilder()
     kb.button(text="Создать backup", callback_data="bpro:create")
+    kb.button(text="Инкрементальный", callback_data="bpro:incremental")
     kb.button(text="Список backup", callback_data="bpro:list")
     kb.button(text="Скачать backup", callback_data="bpro:download")
     kb.button(text="Восстановить backup", callback_data="bpro:restore")
+    kb.button(text="Проверить backup", callback_data="bpro:verify")
     kb.button(text="Удалить backup", callback_data="bpro:delete")
+    kb.button(text="🧩 Репозиторий (дедуп)", callback_data="bpro:repo")
     kb.button(text="⬅️ Инструменты", callback_data="menu:tools")
+    kb.adjust(2, 2, 2, 1, 1, 1)
+    return kb.as_markup()
+
+
+def backup_repo_menu() -> InlineKeyboardMarkup:
+    kb = InlineKeyboardBuilder()
+    kb.button(text="Снимок папки", callback_data="bpro:repo:snap")
+    kb.button(text="Снимки", callback_data="bpro:repo:list")
+    kb.button(text="Восстановить", callback_data="bpro:repo:restore")
+    kb.button(text="Удалить снимок", callback_data="bpro:repo:delete")
+    kb.button(text="🧹 Очистка чанков", callback_data="bpro:repo:gc")
+    kb.button(text="⬅️ Бэкапы PRO", callback_data="tools:backup_pro")
     kb.adjust(2, 2, 1, 1)
     return kb.as_markup()
+
+
+def jobs_menu(jobs: list[Job]) -> InlineKeyboardMarkup:
+    kb = InlineKeyboardBuilder()
+    sizes: list[int] = []
+    shown = 0
+    for job in jobs[:8]:
+        if job.active:
+            kb.button(text=f"⛔ Отменить #{job.id}", callback_data=f"job:cancel:{job.id}")
+        else:
+            kb.button(text=f"📄 Результат #{job.id}", callback_data=f"job:show:{job.id}")
+        shown += 1
+    sizes.extend([2] * (shown // 2))
+    if shown % 2:
+        sizes.append(1)
+    kb.button(text="🔄 Обновить", callback_data="tools:jobs")
+    kb.button(text="⬅️ Инструменты", callback_data="menu:tools")
+    sizes.append(2)
+    kb.adjust(*sizes)
+    return kb.as_markup()
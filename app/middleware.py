@@ -12,8 +12,7 @@ class AdminMiddleware(BaseMiddleware):
     async def __call__(self, handler, event, data):
         user = data.get("event_from_user")
         if user:
-            is_allowed = await self.storage.is_admin(user.id, self.admin_ids)
-            if not is_allowed:
+            if not self.storage.current.is_admin(user.id, self.admin_ids):
                 if isinstance(event, Message):
                     await event.answer("Доступ запрещен")
                 elif isinstance(event, CallbackQuery):
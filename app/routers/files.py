@@ -7,10 +7,10 @@ from aiogram.types import CallbackQuery, FSInputFile, Message
 
 from app.common import normalize_heavy_files
 from app.keyboards import backups_menu, files_menu
-from app.runtime import safe_delete, update_window_from_callback, update_window_from_message
+from app.runtime import safe_delete, start_message_job, update_window_from_callback, update_window_from_message
 from app.services.backups import create_backup
 from app.services.formatting import command_report, pre
-from app.services.shell import run_shell
+from app.services.shell import PRIORITY_MAINTENANCE, ProgressCallback, run_shell
 from app.states import BotStates
 from app.config import Settings
 
@@ -26,7 +26,7 @@ async def files_heavy(callback: CallbackQuery, settings: Settings, state: FSMCon
         "\\( -path /proc -o -path /sys -o -path /dev -o -path /run -o -path /tmp \\) -prune -o "
         "-type f -size +100M -printf '%s\\t%p\\n' 2>/dev/null | sort -nr | head -n 20"
     )
-    result = await run_shell(command, timeout=max(settings.command_timeout, 120))
+    result = await run_shell(command, timeout=max(settings.command_timeout, 120), priority=PRIORITY_MAINTENANCE)
     if result.returncode == 0 and not result.stderr.strip():
         normalized = normalize_heavy_files(result.stdout)
         text = f"<b>ТОП тяжелых файлов (>100 MB)</b>\n{pre(normalized, limit=3200)}"
@@ -73,7 +73,7 @@ async def backup_prompt(callback: CallbackQuery, state: FSMContext) -> None:
 
 
 @router.message(BotStates.waiting_backup_path, F.text)
-async def backup_input(message: Message, state: FSMContext) -> None:
+async def backup_input(message: Message, settings: Settings, state: FSMContext) -> None:
     source = Path(message.text.strip()).expanduser()
     if not source.is_absolute():
         await update_window_from_message(message, "<b>Бэкап папки</b>\nНужен абсолютный путь. Введите снова:", backups_menu())
@@ -84,16 +84,21 @@ async def backup_input(message: Message, state: FSMContext) -> None:
         await safe_delete(message)
         return
     await state.clear()
-    try:
-        archive_path, size_bytes, checksum = await create_backup(source)
-        text = (
+
+    async def _runner(progress: ProgressCallback) -> str:
+        try:
+            archive_path, size_bytes, checksum = await create_backup(
+                source, settings.backup_workers, settings.backup_compression
+            )
+        except Exception as exc:
+            return f"<b>Ошибка создания бэкапа</b>\n{pre(str(exc), limit=800)}"
+        return (
             "<b>Бэкап завершен</b>\n"
             f"<b>Источник:</b> <code>{html.escape(str(source))}</code>\n"
             f"<b>Архив:</b> <code>{html.escape(str(archive_path))}</code>\n"
             f"<b>Размер:</b> {size_bytes / 1024**2:.2f} MB\n"
             f"<b>SHA256:</b> <code>{checksum[:16]}...</code>"
         )
-    except Exception as exc:
-        text = f"<b>Ошибка создания бэкапа</b>\n{pre(str(exc), limit=800)}"
-    await update_window_from_message(message, text, backups_menu())
+
+    await start_message_job(message, f"Бэкап {source}", backups_menu(), _runner)
     await safe_delete(message)
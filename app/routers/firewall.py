@@ -9,6 +9,7 @@ from app.common import compact_report, disable_firewall, parse_port, parse_ports
 from app.config import Settings
 from app.keyboards import firewall_confirm_menu, firewall_menu
 from app.runtime import safe_delete, update_window_from_callback, update_window_from_message
+from app.services.cache import run_exec_cached
 from app.services.formatting import command_report
 from app.services.shell import run_exec
 from app.services.storage import Storage
@@ -21,7 +22,7 @@ router = Router()
 async def fw_rules(callback: CallbackQuery, settings: Settings, state: FSMContext) -> None:
     await callback.answer()
     await state.clear()
-    result = await run_exec(["iptables", "-L", "-n", "-v", "--line-numbers"], timeout=settings.command_timeout)
+    result = await run_exec_cached(["iptables", "-L", "-n", "-v", "--line-numbers"], timeout=settings.command_timeout)
     await update_window_from_callback(callback, command_report("Текущие правила iptables", result), firewall_menu())
 
 
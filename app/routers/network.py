@@ -8,6 +8,7 @@ from aiogram.types import CallbackQuery, Message
 from app.config import Settings
 from app.keyboards import network_menu
 from app.runtime import safe_delete, update_window_from_callback, update_window_from_message
+from app.services.cache import run_exec_cached
 from app.services.formatting import command_report
 from app.services.shell import run_exec
 from app.states import BotStates
@@ -36,7 +37,7 @@ def is_ping_target_valid(target: str) -> bool:
 async def net_ports(callback: CallbackQuery, settings: Settings, state: FSMContext) -> None:
     await callback.answer()
     await state.clear()
-    result = await run_exec(["ss", "-tulpnH"], timeout=settings.command_timeout)
+    result = await run_exec_cached(["ss", "-tulpnH"], timeout=settings.command_timeout)
     await update_window_from_callback(callback, command_report("Список портов", result), network_menu())
 
 
@@ -44,7 +45,7 @@ async def net_ports(callback: CallbackQuery, settings: Settings, state: FSMConte
 async def net_ifaces(callback: CallbackQuery, settings: Settings, state: FSMContext) -> None:
     await callback.answer()
     await state.clear()
-    result = await run_exec(["ip", "-br", "a"], timeout=settings.command_timeout)
+    result = await run_exec_cached(["ip", "-br", "a"], timeout=settings.command_timeout)
     await update_window_from_callback(callback, command_report("Сетевые интерфейсы", result), network_menu())
 
 
@@ -1,4 +1,3 @@
-import asyncio
 import html
 
 from aiogram import F, Router
@@ -8,12 +7,14 @@ from aiogram.types import CallbackQuery, Message
 from app.common import SERVICE_NAME_RE, parse_pid
 from app.config import Settings
 from app.keyboards import metrics_menu, service_actions_menu, service_input_menu, system_menu
-from app.runtime import RUNTIME, metrics_loop, safe_delete, stop_metrics, update_window_from_callback, update_window_from_message
+from app.runtime import METRICS_HUB, safe_delete, stop_metrics, update_window_from_callback, update_window_from_message
+from app.services.cache import EXEC_CACHE
 from app.services.formatting import command_report, pre
-from app.services.metrics import system_metrics_text
-from app.services.shell import run_exec, run_shell
+from app.services.history import VIEWS_BY_NAME
+from app.services.metrics import DETAIL_VIEW
+from app.services.shell import SCHEDULER, run_exec, run_shell
 from app.states import BotStates
-from app.texts import menu_text
+from app.texts import cache_text, menu_text, queue_text
 
 router = Router()
 
@@ -22,12 +23,25 @@ router = Router()
 async def sys_metrics(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
     await state.clear()
-    user_id = callback.from_user.id
-    await stop_metrics(user_id)
-    await update_window_from_callback(callback, system_metrics_text(), metrics_menu())
+    await _show_metrics(callback, "10m")
+
+
+@router.callback_query(F.data.startswith("sys:metrics:win:"))
+async def sys_metrics_window(callback: CallbackQuery, state: FSMContext) -> None:
+    level = callback.data.removeprefix("sys:metrics:win:")
+    if level not in VIEWS_BY_NAME and level != DETAIL_VIEW:
+        await callback.answer("Неизвестный период", show_alert=True)
+        return
+    await callback.answer()
+    await state.clear()
+    await _show_metrics(callback, level)
+
+
+async def _show_metrics(callback: CallbackQuery, level: str) -> None:
+    markup = metrics_menu(level)
+    await update_window_from_callback(callback, METRICS_HUB.text(level), markup)
     if callback.message:
-        task = asyncio.create_task(metrics_loop(callback.bot, callback.message.chat.id, callback.message.message_id, metrics_menu()))
-        RUNTIME.metrics_tasks[user_id] = task
+        METRICS_HUB.subscribe(callback.from_user.id, callback.message.chat.id, callback.message.message_id, markup, level)
 
 
 @router.callback_query(F.data == "sys:metrics:stop")
@@ -47,6 +61,15 @@ async def sys_processes(callback: CallbackQuery, settings: Settings, state: FSMC
     await update_window_from_callback(callback, command_report("ТОП-15 процессов", result), system_menu())
 
 
+@router.callback_query(F.data == "sys:queue")
+async def sys_queue(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    await stop_metrics(callback.from_user.id)
+    await state.clear()
+    text = f"{queue_text(SCHEDULER.limits, SCHEDULER.counts(), SCHEDULER.entries())}\n\n{cache_text(EXEC_CACHE.stats)}"
+    await update_window_from_callback(callback, text, system_menu())
+
+
 @router.callback_query(F.data == "sys:kill")
 async def sys_kill_prompt(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
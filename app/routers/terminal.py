@@ -6,6 +6,7 @@ from app.config import Settings
 from app.keyboards import main_menu
 from app.runtime import update_window_from_callback
 from app.services.formatting import command_report
+from app.services.outbox import OUTBOX
 from app.services.shell import run_shell
 from app.states import BotStates
 from app.texts import main_text
@@ -29,4 +30,4 @@ async def terminal_exec(message: Message, settings: Settings, state: FSMContext)
     if not command:
         return
     result = await run_shell(command, timeout=settings.terminal_timeout)
-    await message.answer(command_report("Терминал", result, limit=2800))
+    await OUTBOX.send(message.chat.id, command_report("Терминал", result, limit=2800))
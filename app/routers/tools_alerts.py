@@ -6,11 +6,15 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
 from app.common import SERVICE_NAME_RE, parse_interval, parse_percent
-from app.keyboards import alerts_menu
+from app.keyboards import alert_rules_menu, alerts_menu
 from app.runtime import safe_delete, update_window_from_callback, update_window_from_message
+from app.services.alerts import ALERT_CYCLE
+from app.services.eventlog import EVENT_LOG
+from app.services.outbox import OUTBOX, PRIORITY_ALERT
+from app.services.rules import MAX_RULES, parse_rule
 from app.services.storage import Storage
 from app.states import BotStates
-from app.texts import alerts_text
+from app.texts import alert_rules_text, alerts_text, incidents_text
 from app.views import render_alerts_callback, render_alerts_message
 
 router = Router()
@@ -21,7 +25,7 @@ async def alerts_toggle(callback: CallbackQuery, storage: Storage) -> None:
     await callback.answer()
     config = await storage.get_alerts()
     updated = await storage.set_alert_value("enabled", not bool(config.get("enabled")))
-    await update_window_from_callback(callback, alerts_text(updated), alerts_menu(bool(updated.get("enabled"))))
+    await update_window_from_callback(callback, alerts_text(updated, ALERT_CYCLE), alerts_menu(bool(updated.get("enabled"))))
 
 
 @router.callback_query(F.data == "al:set_cpu")
@@ -59,6 +63,22 @@ async def alerts_set_cooldown_prompt(callback: CallbackQuery, state: FSMContext)
     await update_window_from_callback(callback, "<b>Cooldown</b>\nВведите секунды 30-86400:", alerts_menu(True))
 
 
+@router.callback_query(F.data == "al:set_hold")
+async def alerts_set_hold_prompt(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    await state.set_state(BotStates.waiting_alert_hold)
+    text = "<b>Удержание</b>\nСколько секунд условие должно держаться до алерта и до восстановления (0-3600):"
+    await update_window_from_callback(callback, text, alerts_menu(True))
+
+
+@router.callback_query(F.data == "al:set_hysteresis")
+async def alerts_set_hysteresis_prompt(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    await state.set_state(BotStates.waiting_alert_hysteresis)
+    text = "<b>Гистерезис</b>\nНа сколько п.п. ниже порога значение должно опуститься для восстановления (0-50):"
+    await update_window_from_callback(callback, text, alerts_menu(True))
+
+
 @router.callback_query(F.data == "al:set_services")
 async def alerts_set_services_prompt(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
@@ -72,13 +92,65 @@ async def alerts_set_services_prompt(callback: CallbackQuery, state: FSMContext)
     await update_window_from_callback(callback, text, alerts_menu(True))
 
 
+@router.callback_query(F.data == "al:rules")
+async def alerts_rules(callback: CallbackQuery, storage: Storage, state: FSMContext) -> None:
+    await callback.answer()
+    await state.clear()
+    config = await storage.get_alerts()
+    await update_window_from_callback(callback, alert_rules_text(config.get("rules", [])), alert_rules_menu())
+
+
+@router.callback_query(F.data == "al:rule_add")
+async def alerts_rule_add_prompt(callback: CallbackQuery, storage: Storage, state: FSMContext) -> None:
+    await callback.answer()
+    config = await storage.get_alerts()
+    if len(config.get("rules", [])) >= MAX_RULES:
+        await update_window_from_callback(callback, f"<b>Правила</b>\nДостигнут лимит {MAX_RULES} правил.", alert_rules_menu())
+        return
+    await state.set_state(BotStates.waiting_alert_rule_add)
+    text = f"{alert_rules_text(config.get('rules', []))}\n\nВведите новое правило:"
+    await update_window_from_callback(callback, text, alert_rules_menu())
+
+
+@router.callback_query(F.data == "al:rule_del")
+async def alerts_rule_delete_prompt(callback: CallbackQuery, storage: Storage, state: FSMContext) -> None:
+    await callback.answer()
+    config = await storage.get_alerts()
+    await state.set_state(BotStates.waiting_alert_rule_delete)
+    text = f"{alert_rules_text(config.get('rules', []))}\n\nВведите номер правила для удаления:"
+    await update_window_from_callback(callback, text, alert_rules_menu())
+
+
+@router.callback_query(F.data == "al:mute")
+async def alerts_mute(callback: CallbackQuery, storage: Storage) -> None:
+    muted = await storage.toggle_alert_mute(callback.from_user.id)
+    await callback.answer("Алерты для вас выключены" if muted else "Алерты для вас включены")
+    await render_alerts_callback(callback, storage)
+
+
+@router.callback_query(F.data == "al:journal")
+async def alerts_journal_toggle(callback: CallbackQuery, storage: Storage) -> None:
+    await callback.answer()
+    config = await storage.get_alerts()
+    await storage.set_alert_value("journal", not bool(config.get("journal")))
+    await render_alerts_callback(callback, storage)
+
+
+@router.callback_query(F.data == "al:incidents")
+async def alerts_incidents(callback: CallbackQuery, storage: Storage) -> None:
+    await callback.answer()
+    summary = await EVENT_LOG.summary()
+    config = await storage.get_alerts()
+    await update_window_from_callback(callback, incidents_text(summary), alerts_menu(bool(config.get("enabled"))))
+
+
 @router.callback_query(F.data == "al:test")
 async def alerts_test(callback: CallbackQuery, storage: Storage) -> None:
     await callback.answer("Тест отправлен")
     chat_id = await storage.get_admin_chat_id()
     if chat_id:
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        await callback.bot.send_message(chat_id, f"🧪 Тест алерта\nВремя: <code>{now}</code>")
+        await OUTBOX.send(chat_id, f"🧪 Тест алерта\nВремя: <code>{now}</code>", priority=PRIORITY_ALERT)
     await render_alerts_callback(callback, storage)
 
 
@@ -147,6 +219,32 @@ async def alerts_set_cooldown_input(message: Message, storage: Storage, state: F
     await safe_delete(message)
 
 
+@router.message(BotStates.waiting_alert_hold, F.text)
+async def alerts_set_hold_input(message: Message, storage: Storage, state: FSMContext) -> None:
+    value = parse_interval(message.text.strip(), 0, 3600)
+    if value is None:
+        await update_window_from_message(message, "<b>Удержание</b>\nНужно число 0-3600. Введите снова:", alerts_menu(True))
+        await safe_delete(message)
+        return
+    await storage.set_alert_value("hold", value)
+    await state.clear()
+    await render_alerts_message(message, storage)
+    await safe_delete(message)
+
+
+@router.message(BotStates.waiting_alert_hysteresis, F.text)
+async def alerts_set_hysteresis_input(message: Message, storage: Storage, state: FSMContext) -> None:
+    value = parse_interval(message.text.strip(), 0, 50)
+    if value is None:
+        await update_window_from_message(message, "<b>Гистерезис</b>\nНужно число 0-50. Введите снова:", alerts_menu(True))
+        await safe_delete(message)
+        return
+    await storage.set_alert_value("hysteresis", value)
+    await state.clear()
+    await render_alerts_message(message, storage)
+    await safe_delete(message)
+
+
 @router.message(BotStates.waiting_alert_services, F.text)
 async def alerts_set_services_input(message: Message, storage: Storage, state: FSMContext) -> None:
     raw = message.text.strip()
@@ -174,3 +272,38 @@ async def alerts_set_services_input(message: Message, storage: Storage, state: F
     await state.clear()
     await render_alerts_message(message, storage)
     await safe_delete(message)
+
+
+@router.message(BotStates.waiting_alert_rule_add, F.text)
+async def alerts_rule_add_input(message: Message, storage: Storage, state: FSMContext) -> None:
+    spec = parse_rule(message.text.strip())
+    config = await storage.get_alerts()
+    rules = list(config.get("rules", []))
+    if spec is None:
+        text = f"{alert_rules_text(rules)}\n\nНе удалось разобрать правило. Введите снова:"
+        await update_window_from_message(message, text, alert_rules_menu())
+        await safe_delete(message)
+        return
+    if spec.text not in rules:
+        rules.append(spec.text)
+    updated = await storage.set_alert_rules(rules)
+    await state.clear()
+    await update_window_from_message(message, alert_rules_text(updated.get("rules", [])), alert_rules_menu())
+    await safe_delete(message)
+
+
+@router.message(BotStates.waiting_alert_rule_delete, F.text)
+async def alerts_rule_delete_input(message: Message, storage: Storage, state: FSMContext) -> None:
+    config = await storage.get_alerts()
+    rules = list(config.get("rules", []))
+    index = parse_interval(message.text.strip(), 1, max(len(rules), 1))
+    if index is None or not rules:
+        text = f"{alert_rules_text(rules)}\n\nНужен номер правила из списка. Введите снова:"
+        await update_window_from_message(message, text, alert_rules_menu())
+        await safe_delete(message)
+        return
+    rules.pop(index - 1)
+    updated = await storage.set_alert_rules(rules)
+    await state.clear()
+    await update_window_from_message(message, alert_rules_text(updated.get("rules", [])), alert_rules_menu())
+    await safe_delete(message)
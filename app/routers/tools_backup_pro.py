@@ -6,15 +6,46 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, FSInputFile, Message
 
 from app.common import format_backups
-from app.keyboards import backup_pro_menu
-from app.runtime import safe_delete, update_window_from_callback, update_window_from_message
-from app.services.backups import create_backup, delete_backup, list_backups, resolve_backup_name, restore_backup
-from app.services.formatting import pre
+from app.config import Settings
+from app.keyboards import backup_pro_menu, backup_repo_menu
+from app.runtime import safe_delete, start_message_job, update_window_from_callback, update_window_from_message
+from app.services.backups import (
+    ArchiveCheck,
+    create_backup,
+    create_incremental_backup,
+    delete_backup,
+    list_backups,
+    resolve_backup_name,
+    restore_backup,
+    verify_backup,
+)
+from app.services.formatting import human_bytes, pre
+from app.services.repository import REPOSITORY
+from app.services.shell import ProgressCallback
 from app.states import BotStates
+from app.texts import repository_text
 
 router = Router()
 
 
+def _checksum_line(check: ArchiveCheck) -> str:
+    if check.expected is None:
+        return "<b>SHA256:</b> файл .sha256 не найден, проверка пропущена"
+    if check.ok:
+        return "<b>SHA256:</b> ✅ совпадает"
+    return f"<b>SHA256:</b> ❌ не совпадает\n<code>{check.checksum}</code>\nожидалось <code>{check.expected}</code>"
+
+
+def _chain_line(check: ArchiveCheck) -> str:
+    if check.expected is None:
+        status = "без .sha256"
+    elif check.ok:
+        status = "SHA256 ✅"
+    else:
+        status = "SHA256 ❌"
+    return f"• <code>{html.escape(check.name)}</code> — {check.members} объектов, {status}"
+
+
 @router.callback_query(F.data == "bpro:list")
 async def backup_pro_list(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
@@ -31,7 +62,7 @@ async def backup_pro_create_prompt(callback: CallbackQuery, state: FSMContext) -
 
 
 @router.message(BotStates.waiting_backup_pro_source, F.text)
-async def backup_pro_create_input(message: Message, state: FSMContext) -> None:
+async def backup_pro_create_input(message: Message, settings: Settings, state: FSMContext) -> None:
     source = Path(message.text.strip()).expanduser()
     if not source.is_absolute():
         await update_window_from_message(message, "<b>Создать backup</b>\nНужен абсолютный путь. Введите снова:", backup_pro_menu())
@@ -42,18 +73,69 @@ async def backup_pro_create_input(message: Message, state: FSMContext) -> None:
         await safe_delete(message)
         return
     await state.clear()
-    try:
-        archive_path, size_bytes, checksum = await create_backup(source)
-        text = (
+
+    async def _runner(progress: ProgressCallback) -> str:
+        try:
+            archive_path, size_bytes, checksum = await create_backup(
+                source, settings.backup_workers, settings.backup_compression
+            )
+        except Exception as exc:
+            return f"<b>Ошибка backup</b>\n{pre(str(exc), limit=900)}"
+        return (
             "<b>Backup создан</b>\n"
             f"<b>Источник:</b> <code>{html.escape(str(source))}</code>\n"
             f"<b>Архив:</b> <code>{html.escape(str(archive_path))}</code>\n"
             f"<b>Размер:</b> {size_bytes / 1024**2:.2f} MB\n"
             f"<b>SHA256:</b> <code>{checksum}</code>"
         )
-    except Exception as exc:
-        text = f"<b>Ошибка backup</b>\n{pre(str(exc), limit=900)}"
-    await update_window_from_message(message, text, backup_pro_menu())
+
+    await start_message_job(message, f"Backup {source}", backup_pro_menu(), _runner)
+    await safe_delete(message)
+
+
+@router.callback_query(F.data == "bpro:incremental")
+async def backup_pro_incremental_prompt(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    await state.set_state(BotStates.waiting_backup_pro_incremental_source)
+    await update_window_from_callback(
+        callback,
+        "<b>Инкрементальный backup</b>\n"
+        "В архив попадут только новые и измененные файлы с прошлого backup этой папки "
+        "(первый запуск делает полный).\nВведите абсолютный путь к папке:",
+        backup_pro_menu(),
+    )
+
+
+@router.message(BotStates.waiting_backup_pro_incremental_source, F.text)
+async def backup_pro_incremental_input(message: Message, settings: Settings, state: FSMContext) -> None:
+    source = Path(message.text.strip()).expanduser()
+    if not source.is_absolute():
+        await update_window_from_message(message, "<b>Инкрементальный backup</b>\nНужен абсолютный путь. Введите снова:", backup_pro_menu())
+        await safe_delete(message)
+        return
+    if not source.exists() or not source.is_dir():
+        await update_window_from_message(message, "<b>Инкрементальный backup</b>\nПапка не найдена. Введите снова:", backup_pro_menu())
+        await safe_delete(message)
+        return
+    await state.clear()
+
+    async def _runner(progress: ProgressCallback) -> str:
+        try:
+            result = await create_incremental_backup(source, settings.backup_workers, settings.backup_compression)
+        except Exception as exc:
+            return f"<b>Ошибка backup</b>\n{pre(str(exc), limit=900)}"
+        base = f"<code>{html.escape(result.parent)}</code>" if result.parent else "нет (полный backup)"
+        return (
+            "<b>Инкрементальный backup создан</b>\n"
+            f"<b>Источник:</b> <code>{html.escape(str(source))}</code>\n"
+            f"<b>Архив:</b> <code>{html.escape(str(result.archive))}</code>\n"
+            f"<b>База:</b> {base}\n"
+            f"<b>Изменено:</b> {result.changed} · <b>без изменений:</b> {result.unchanged} · <b>удалено:</b> {result.deleted}\n"
+            f"<b>Размер:</b> {result.size / 1024**2:.2f} MB\n"
+            f"<b>SHA256:</b> <code>{result.checksum}</code>"
+        )
+
+    await start_message_job(message, f"Инкрементальный backup {source}", backup_pro_menu(), _runner)
     await safe_delete(message)
 
 
@@ -123,17 +205,58 @@ async def backup_pro_restore_target_input(message: Message, state: FSMContext) -
         return
     archive = Path(archive_raw)
     await state.clear()
-    try:
-        extracted = await restore_backup(archive, target)
+
+    async def _runner(progress: ProgressCallback) -> str:
+        try:
+            checks, removed = await restore_backup(archive, target)
+        except Exception as exc:
+            return f"<b>Ошибка восстановления</b>\n{pre(str(exc), limit=900)}"
         text = (
             "<b>Восстановление завершено</b>\n"
             f"<b>Архив:</b> <code>{html.escape(archive.name)}</code>\n"
             f"<b>Куда:</b> <code>{html.escape(str(target))}</code>\n"
-            f"<b>Объектов:</b> {extracted}"
+            f"<b>Объектов:</b> {sum(check.members for check in checks)}"
         )
-    except Exception as exc:
-        text = f"<b>Ошибка восстановления</b>\n{pre(str(exc), limit=900)}"
-    await update_window_from_message(message, text, backup_pro_menu())
+        if len(checks) == 1:
+            return f"{text}\n{_checksum_line(checks[0])}"
+        chain = "\n".join(_chain_line(check) for check in checks)
+        return f"{text}\n<b>Цепочка ({len(checks)}):</b>\n{chain}\n<b>Удалено путей:</b> {removed}"
+
+    await start_message_job(message, f"Восстановление {archive.name}", backup_pro_menu(), _runner)
+    await safe_delete(message)
+
+
+@router.callback_query(F.data == "bpro:verify")
+async def backup_pro_verify_prompt(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    await state.set_state(BotStates.waiting_backup_pro_verify_name)
+    items = list_backups(limit=10)
+    await update_window_from_callback(callback, f"{format_backups(items)}\n\n<b>Введите имя архива для проверки:</b>", backup_pro_menu())
+
+
+@router.message(BotStates.waiting_backup_pro_verify_name, F.text)
+async def backup_pro_verify_input(message: Message, state: FSMContext) -> None:
+    archive = resolve_backup_name(message.text.strip())
+    if not archive:
+        await update_window_from_message(message, "<b>Проверка backup</b>\nАрхив не найден. Введите имя снова:", backup_pro_menu())
+        await safe_delete(message)
+        return
+    await state.clear()
+
+    async def _runner(progress: ProgressCallback) -> str:
+        try:
+            check = await verify_backup(archive)
+        except Exception as exc:
+            return f"<b>Архив поврежден</b>\n<code>{html.escape(archive.name)}</code>\n{pre(str(exc), limit=900)}"
+        return (
+            "<b>Проверка backup</b>\n"
+            f"<b>Архив:</b> <code>{html.escape(archive.name)}</code>\n"
+            f"<b>Размер:</b> {check.size / 1024**2:.2f} MB\n"
+            f"<b>Объектов:</b> {check.members}\n"
+            f"{_checksum_line(check)}"
+        )
+
+    await start_message_job(message, f"Проверка {archive.name}", backup_pro_menu(), _runner)
     await safe_delete(message)
 
 
@@ -160,3 +283,140 @@ async def backup_pro_delete_input(message: Message, state: FSMContext) -> None:
         text = f"<b>Ошибка удаления</b>\n{pre(info, limit=700)}"
     await update_window_from_message(message, text, backup_pro_menu())
     await safe_delete(message)
+
+
+@router.callback_query(F.data.in_({"bpro:repo", "bpro:repo:list"}))
+async def backup_repo_view(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    await state.clear()
+    await update_window_from_callback(callback, repository_text(REPOSITORY.list_snapshots(limit=20)), backup_repo_menu())
+
+
+@router.callback_query(F.data == "bpro:repo:snap")
+async def backup_repo_snapshot_prompt(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    await state.set_state(BotStates.waiting_repo_source)
+    await update_window_from_callback(callback, "<b>Снимок в репозиторий</b>\nВведите абсолютный путь к папке:", backup_repo_menu())
+
+
+@router.message(BotStates.waiting_repo_source, F.text)
+async def backup_repo_snapshot_input(message: Message, settings: Settings, state: FSMContext) -> None:
+    source = Path(message.text.strip()).expanduser()
+    if not source.is_absolute() or not source.is_dir():
+        await update_window_from_message(message, "<b>Снимок в репозиторий</b>\nПапка не найдена. Введите абсолютный путь снова:", backup_repo_menu())
+        await safe_delete(message)
+        return
+    await state.clear()
+
+    async def _runner(progress: ProgressCallback) -> str:
+        try:
+            info = await REPOSITORY.snapshot(source, settings.backup_workers)
+        except Exception as exc:
+            return f"<b>Ошибка снимка</b>\n{pre(str(exc), limit=900)}"
+        return (
+            "<b>Снимок создан</b>\n"
+            f"<b>ID:</b> <code>{html.escape(info.id)}</code>\n"
+            f"<b>Источник:</b> <code>{html.escape(info.source)}</code>\n"
+            f"<b>Файлов:</b> {info.files} · <b>объем:</b> {human_bytes(info.size)}\n"
+            f"<b>Чанков:</b> {info.chunks}, новых {info.new_chunks} (+{human_bytes(info.new_bytes)} на диске)"
+        )
+
+    await start_message_job(message, f"Снимок {source}", backup_repo_menu(), _runner)
+    await safe_delete(message)
+
+
+@router.callback_query(F.data == "bpro:repo:restore")
+async def backup_repo_restore_prompt(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    await state.set_state(BotStates.waiting_repo_restore_id)
+    items = REPOSITORY.list_snapshots(limit=10)
+    await update_window_from_callback(callback, f"{repository_text(items)}\n\n<b>Введите id снимка для восстановления:</b>", backup_repo_menu())
+
+
+@router.message(BotStates.waiting_repo_restore_id, F.text)
+async def backup_repo_restore_id_input(message: Message, state: FSMContext) -> None:
+    snapshot_id = REPOSITORY.resolve(message.text)
+    if not snapshot_id:
+        await update_window_from_message(message, "<b>Восстановление снимка</b>\nСнимок не найден. Введите id снова:", backup_repo_menu())
+        await safe_delete(message)
+        return
+    await state.update_data(repo_snapshot=snapshot_id)
+    await state.set_state(BotStates.waiting_repo_restore_target)
+    await update_window_from_message(
+        message,
+        f"<b>Снимок:</b> <code>{html.escape(snapshot_id)}</code>\nВведите абсолютный путь папки назначения:",
+        backup_repo_menu(),
+    )
+    await safe_delete(message)
+
+
+@router.message(BotStates.waiting_repo_restore_target, F.text)
+async def backup_repo_restore_target_input(message: Message, state: FSMContext) -> None:
+    target = Path(message.text.strip()).expanduser()
+    if not target.is_absolute():
+        await update_window_from_message(message, "<b>Восстановление снимка</b>\nНужен абсолютный путь. Введите снова:", backup_repo_menu())
+        await safe_delete(message)
+        return
+    data = await state.get_data()
+    snapshot_id = REPOSITORY.resolve(str(data.get("repo_snapshot", "")))
+    await state.clear()
+    if not snapshot_id:
+        await update_window_from_message(message, "<b>Восстановление снимка</b>\nСнимок не выбран. Начните заново.", backup_repo_menu())
+        await safe_delete(message)
+        return
+
+    async def _runner(progress: ProgressCallback) -> str:
+        try:
+            restored = await REPOSITORY.restore(snapshot_id, target)
+        except Exception as exc:
+            return f"<b>Ошибка восстановления</b>\n{pre(str(exc), limit=900)}"
+        return (
+            "<b>Снимок восстановлен</b>\n"
+            f"<b>ID:</b> <code>{html.escape(snapshot_id)}</code>\n"
+            f"<b>Куда:</b> <code>{html.escape(str(target))}</code>\n"
+            f"<b>Объектов:</b> {restored}"
+        )
+
+    await start_message_job(message, f"Восстановление {snapshot_id}", backup_repo_menu(), _runner)
+    await safe_delete(message)
+
+
+@router.callback_query(F.data == "bpro:repo:delete")
+async def backup_repo_delete_prompt(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    await state.set_state(BotStates.waiting_repo_delete_id)
+    items = REPOSITORY.list_snapshots(limit=10)
+    await update_window_from_callback(callback, f"{repository_text(items)}\n\n<b>Введите id снимка для удаления:</b>", backup_repo_menu())
+
+
+@router.message(BotStates.waiting_repo_delete_id, F.text)
+async def backup_repo_delete_input(message: Message, state: FSMContext) -> None:
+    snapshot_id = REPOSITORY.resolve(message.text)
+    if not snapshot_id:
+        await update_window_from_message(message, "<b>Удаление снимка</b>\nСнимок не найден. Введите id снова:", backup_repo_menu())
+        await safe_delete(message)
+        return
+    await state.clear()
+    await REPOSITORY.delete(snapshot_id)
+    text = (
+        f"<b>Снимок удален</b>\n<code>{html.escape(snapshot_id)}</code>\n"
+        "Чанки освобождаются кнопкой «Очистка чанков»."
+    )
+    await update_window_from_message(message, text, backup_repo_menu())
+    await safe_delete(message)
+
+
+@router.callback_query(F.data == "bpro:repo:gc")
+async def backup_repo_gc(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    await state.clear()
+    try:
+        result = await REPOSITORY.gc()
+        text = (
+            "<b>Очистка репозитория</b>\n"
+            f"<b>Удалено чанков:</b> {result.removed} ({human_bytes(result.freed)})\n"
+            f"<b>Осталось:</b> {result.kept}"
+        )
+    except Exception as exc:
+        text = f"<b>Ошибка очистки</b>\n{pre(str(exc), limit=900)}"
+    await update_window_from_callback(callback, text, backup_repo_menu())
@@ -5,9 +5,10 @@ from aiogram.types import CallbackQuery, Message
 from app.common import CONTAINER_NAME_RE, resolve_compose_file
 from app.config import Settings
 from app.keyboards import docker_menu
-from app.runtime import safe_delete, update_window_from_callback, update_window_from_message
+from app.runtime import exec_job, safe_delete, start_callback_job, update_window_from_callback, update_window_from_message
+from app.services.cache import run_exec_cached
 from app.services.formatting import command_report
-from app.services.shell import run_exec, run_shell
+from app.services.shell import PRIORITY_MAINTENANCE, run_exec
 from app.services.storage import Storage
 from app.states import BotStates
 from app.views import render_docker_message
@@ -27,8 +28,8 @@ async def docker_info(callback: CallbackQuery, settings: Settings, state: FSMCon
 async def docker_containers(callback: CallbackQuery, settings: Settings, state: FSMContext) -> None:
     await callback.answer()
     await state.clear()
-    command = "docker ps -a --format 'table {{.Names}}\\t{{.Status}}\\t{{.Image}}\\t{{.Ports}}'"
-    result = await run_shell(command, timeout=max(settings.command_timeout, 90))
+    command = ["docker", "ps", "-a", "--format", "table {{.Names}}\\t{{.Status}}\\t{{.Image}}\\t{{.Ports}}"]
+    result = await run_exec_cached(command, timeout=max(settings.command_timeout, 90))
     await update_window_from_callback(callback, command_report("Контейнеры", result), docker_menu())
 
 
@@ -36,8 +37,8 @@ async def docker_containers(callback: CallbackQuery, settings: Settings, state:
 async def docker_images(callback: CallbackQuery, settings: Settings, state: FSMContext) -> None:
     await callback.answer()
     await state.clear()
-    command = "docker images --format 'table {{.Repository}}\\t{{.Tag}}\\t{{.ID}}\\t{{.Size}}'"
-    result = await run_shell(command, timeout=max(settings.command_timeout, 90))
+    command = ["docker", "images", "--format", "table {{.Repository}}\\t{{.Tag}}\\t{{.ID}}\\t{{.Size}}"]
+    result = await run_exec_cached(command, timeout=max(settings.command_timeout, 90))
     await update_window_from_callback(callback, command_report("Docker образы", result), docker_menu())
 
 
@@ -84,9 +85,10 @@ async def docker_compose_action(callback: CallbackQuery, settings: Settings, sto
         return
     if callback.data == "dock:compose_ps":
         command = ["docker", "compose", "-f", str(compose_path), "ps"]
-        title = "docker compose ps"
-        timeout = max(settings.command_timeout, 90)
-    elif callback.data == "dock:compose_up":
+        result = await run_exec(command, timeout=max(settings.command_timeout, 90))
+        await update_window_from_callback(callback, command_report("docker compose ps", result), docker_menu())
+        return
+    if callback.data == "dock:compose_up":
         command = ["docker", "compose", "-f", str(compose_path), "up", "-d"]
         title = "docker compose up -d"
         timeout = max(settings.command_timeout, 600)
@@ -98,8 +100,8 @@ async def docker_compose_action(callback: CallbackQuery, settings: Settings, sto
         command = ["docker", "compose", "-f", str(compose_path), "pull"]
         title = "docker compose pull"
         timeout = max(settings.command_timeout, 1200)
-    result = await run_exec(command, timeout=timeout)
-    await update_window_from_callback(callback, command_report(title, result), docker_menu())
+    runner = exec_job(command, title, timeout, settings.stream_interval, PRIORITY_MAINTENANCE)
+    await start_callback_job(callback, title, docker_menu(), runner)
 
 
 @router.callback_query(F.data == "dock:logs")
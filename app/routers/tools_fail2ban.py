@@ -6,6 +6,7 @@ from app.common import SERVICE_NAME_RE, parse_ip
 from app.config import Settings
 from app.keyboards import fail2ban_menu
 from app.runtime import safe_delete, update_window_from_callback, update_window_from_message
+from app.services.cache import run_exec_cached
 from app.services.formatting import command_report
 from app.services.shell import run_exec
 from app.states import BotStates
@@ -17,7 +18,7 @@ router = Router()
 async def f2b_status(callback: CallbackQuery, settings: Settings, state: FSMContext) -> None:
     await callback.answer()
     await state.clear()
-    result = await run_exec(["fail2ban-client", "status"], timeout=settings.command_timeout)
+    result = await run_exec_cached(["fail2ban-client", "status"], timeout=settings.command_timeout)
     await update_window_from_callback(callback, command_report("fail2ban status", result), fail2ban_menu())
 
 
@@ -25,7 +26,7 @@ async def f2b_status(callback: CallbackQuery, settings: Settings, state: FSMCont
 async def f2b_jails(callback: CallbackQuery, settings: Settings, state: FSMContext) -> None:
     await callback.answer()
     await state.clear()
-    result = await run_exec(["fail2ban-client", "status"], timeout=settings.command_timeout)
+    result = await run_exec_cached(["fail2ban-client", "status"], timeout=settings.command_timeout)
     await update_window_from_callback(callback, command_report("Список jail", result), fail2ban_menu())
 
 
@@ -44,7 +45,7 @@ async def f2b_jail_status_input(message: Message, settings: Settings, state: FSM
         await safe_delete(message)
         return
     await state.clear()
-    result = await run_exec(["fail2ban-client", "status", jail], timeout=settings.command_timeout)
+    result = await run_exec_cached(["fail2ban-client", "status", jail], timeout=settings.command_timeout)
     await update_window_from_message(message, command_report(f"fail2ban jail {jail}", result), fail2ban_menu())
     await safe_delete(message)
 
@@ -6,8 +6,8 @@ from app.common import apply_firewall_profile, parse_ip
 from app.config import Settings
 from app.keyboards import firewall_profile_confirm_menu, firewall_profiles_menu
 from app.runtime import safe_delete, update_window_from_callback, update_window_from_message
+from app.services.cache import run_exec_cached
 from app.services.formatting import command_report
-from app.services.shell import run_exec
 from app.states import BotStates
 
 router = Router()
@@ -16,7 +16,7 @@ router = Router()
 @router.callback_query(F.data == "fwp:show")
 async def firewall_profile_show(callback: CallbackQuery, settings: Settings) -> None:
     await callback.answer()
-    result = await run_exec(["iptables", "-L", "-n", "-v", "--line-numbers"], timeout=settings.command_timeout)
+    result = await run_exec_cached(["iptables", "-L", "-n", "-v", "--line-numbers"], timeout=settings.command_timeout)
     await update_window_from_callback(callback, command_report("Текущие правила iptables", result), firewall_profiles_menu())
 
 
@@ -0,0 +1,40 @@
+import html
+
+from aiogram import F, Router
+from aiogram.types import CallbackQuery
+
+from app.keyboards import jobs_menu
+from app.runtime import update_window_from_callback
+from app.services.jobs import JOBS
+from app.texts import jobs_text
+
+router = Router()
+
+
+def _parse_job_id(data: str | None) -> int | None:
+    raw = (data or "").rsplit(":", 1)[-1]
+    return int(raw) if raw.isdigit() else None
+
+
+@router.callback_query(F.data.startswith("job:cancel:"))
+async def jobs_cancel(callback: CallbackQuery) -> None:
+    job_id = _parse_job_id(callback.data)
+    if job_id is not None and JOBS.cancel(job_id):
+        await callback.answer(f"Задача #{job_id} отменяется")
+    else:
+        await callback.answer("Задача уже завершена", show_alert=True)
+    jobs = JOBS.list()
+    await update_window_from_callback(callback, jobs_text(jobs), jobs_menu(jobs))
+
+
+@router.callback_query(F.data.startswith("job:show:"))
+async def jobs_show(callback: CallbackQuery) -> None:
+    await callback.answer()
+    job_id = _parse_job_id(callback.data)
+    job = JOBS.get(job_id) if job_id is not None else None
+    jobs = JOBS.list()
+    if not job:
+        await update_window_from_callback(callback, jobs_text(jobs), jobs_menu(jobs))
+        return
+    text = job.result if not job.active else f"<b>{html.escape(job.title)}</b>\nЗадача #{job.id} еще выполняется."
+    await update_window_from_callback(callback, text, jobs_menu(jobs))
@@ -2,11 +2,12 @@ from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
 
-from app.keyboards import admins_menu, fail2ban_menu, firewall_profiles_menu, logs_menu, updates_menu
+from app.keyboards import admins_menu, fail2ban_menu, firewall_profiles_menu, jobs_menu, logs_menu, updates_menu
 from app.runtime import stop_metrics, update_window_from_callback
+from app.services.jobs import JOBS
 from app.services.storage import Storage
 from app.services.updates import detect_package_manager, manager_title
-from app.texts import updates_text
+from app.texts import jobs_text, updates_text
 from app.views import render_alerts_callback, render_backup_pro_callback, render_docker_callback
 
 router = Router()
@@ -36,3 +37,6 @@ async def tools_router(callback: CallbackQuery, state: FSMContext, storage: Stor
         await render_backup_pro_callback(callback)
     elif callback.data == "tools:admins":
         await update_window_from_callback(callback, "<b>👤 Админы</b>\nУправление доступом к боту:", admins_menu())
+    elif callback.data == "tools:jobs":
+        jobs = JOBS.list()
+        await update_window_from_callback(callback, jobs_text(jobs), jobs_menu(jobs))
@@ -4,9 +4,8 @@ from aiogram.types import CallbackQuery
 
 from app.config import Settings
 from app.keyboards import updates_confirm_menu, updates_menu
-from app.runtime import update_window_from_callback
-from app.services.formatting import command_report
-from app.services.shell import run_shell
+from app.runtime import shell_job, start_callback_job, update_window_from_callback
+from app.services.shell import PRIORITY_MAINTENANCE
 from app.services.updates import (
     detect_package_manager,
     manager_title,
@@ -27,8 +26,9 @@ async def updates_check(callback: CallbackQuery, settings: Settings, state: FSMC
     if not command:
         await update_window_from_callback(callback, "<b>Менеджер пакетов не поддерживается</b>", updates_menu())
         return
-    result = await run_shell(command, timeout=max(settings.command_timeout, 900))
-    await update_window_from_callback(callback, command_report(f"Проверка обновлений ({manager_title(manager)})", result), updates_menu())
+    title = f"Проверка обновлений ({manager_title(manager)})"
+    runner = shell_job(command, title, max(settings.command_timeout, 900), settings.stream_interval, PRIORITY_MAINTENANCE)
+    await start_callback_job(callback, title, updates_menu(), runner)
 
 
 @router.callback_query(F.data == "upd:upgrade")
@@ -56,8 +56,9 @@ async def updates_upgrade_confirm(callback: CallbackQuery, settings: Settings, s
     if not command:
         await update_window_from_callback(callback, "<b>Менеджер пакетов не поддерживается</b>", updates_menu())
         return
-    result = await run_shell(command, timeout=max(settings.command_timeout, 5400))
-    await update_window_from_callback(callback, command_report(f"Upgrade ({manager_title(manager)})", result), updates_menu())
+    title = f"Upgrade ({manager_title(manager)})"
+    runner = shell_job(command, title, max(settings.command_timeout, 5400), settings.stream_interval, PRIORITY_MAINTENANCE)
+    await start_callback_job(callback, title, updates_menu(), runner)
 
 
 @router.callback_query(F.data == "upd:clean")
@@ -69,5 +70,6 @@ async def updates_clean(callback: CallbackQuery, settings: Settings, state: FSMC
     if not command:
         await update_window_from_callback(callback, "<b>Менеджер пакетов не поддерживается</b>", updates_menu())
         return
-    result = await run_shell(command, timeout=max(settings.command_timeout, 900))
-    await update_window_from_callback(callback, command_report(f"Очистка кэша ({manager_title(manager)})", result), updates_menu())
+    title = f"Очистка кэша ({manager_title(manager)})"
+    runner = shell_job(command, title, max(settings.command_timeout, 900), settings.stream_interval, PRIORITY_MAINTENANCE)
+    await start_callback_job(callback, title, updates_menu(), runner)
@@ -1,17 +1,23 @@
 import asyncio
 from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Sequence
 
-from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import CallbackQuery, Message
 
-from app.services.metrics import system_metrics_text
+from app.services.formatting import command_report, progress_report
+from app.services.jobs import JOBS, Job
+from app.services.history import HISTORY, history_text
+from app.services.metrics import DETAIL_VIEW, SAMPLER, render_details, render_metrics
+from app.services.outbox import OUTBOX, PRIORITY_METRICS, PRIORITY_PROGRESS
+from app.services.sessions import SESSIONS
+from app.services.shell import ExecProgress, ProgressCallback, run_exec, run_shell
+from app.texts import job_started_text
 
 
 @dataclass(slots=True)
 class RuntimeState:
-    windows: dict[int, tuple[int, int]] = field(default_factory=dict)
-    metrics_tasks: dict[int, asyncio.Task] = field(default_factory=dict)
+    window_jobs: dict[tuple[int, int], int] = field(default_factory=dict)
 
 
 RUNTIME = RuntimeState()
@@ -25,73 +31,193 @@ async def safe_delete(message: Message) -> None:
 
 
 def remember_window(user_id: int, chat_id: int, message_id: int) -> None:
-    RUNTIME.windows[user_id] = (chat_id, message_id)
+    SESSIONS.set_window(user_id, chat_id, message_id)
+    RUNTIME.window_jobs.pop((chat_id, message_id), None)
 
 
 async def update_window_from_callback(callback: CallbackQuery, text: str, reply_markup) -> None:
     if not callback.message:
         return
-    remember_window(callback.from_user.id, callback.message.chat.id, callback.message.message_id)
+    chat_id = callback.message.chat.id
+    remember_window(callback.from_user.id, chat_id, callback.message.message_id)
     try:
-        await callback.message.edit_text(text=text, reply_markup=reply_markup)
-    except TelegramBadRequest as exc:
-        if "message is not modified" in str(exc).lower():
-            return
-        sent = await callback.bot.send_message(
-            chat_id=callback.message.chat.id,
-            text=text,
-            reply_markup=reply_markup,
-        )
+        await OUTBOX.edit(chat_id, callback.message.message_id, text, reply_markup)
+    except TelegramBadRequest:
+        sent = await OUTBOX.send(chat_id, text, reply_markup)
         remember_window(callback.from_user.id, sent.chat.id, sent.message_id)
 
 
 async def update_window_from_message(message: Message, text: str, reply_markup) -> None:
     user_id = message.from_user.id
-    entry = RUNTIME.windows.get(user_id)
+    entry = SESSIONS.get_window(user_id)
     if entry and entry[0] == message.chat.id:
+        RUNTIME.window_jobs.pop(entry, None)
         try:
-            await message.bot.edit_message_text(
-                chat_id=entry[0],
-                message_id=entry[1],
-                text=text,
-                reply_markup=reply_markup,
-            )
+            await OUTBOX.edit(entry[0], entry[1], text, reply_markup)
             return
         except TelegramBadRequest:
             pass
-    sent = await message.answer(text=text, reply_markup=reply_markup)
+    sent = await OUTBOX.send(message.chat.id, text, reply_markup)
     remember_window(user_id, sent.chat.id, sent.message_id)
 
 
-async def stop_metrics(user_id: int) -> None:
-    task = RUNTIME.metrics_tasks.pop(user_id, None)
-    if task:
-        task.cancel()
+def window_progress(chat_id: int, message_id: int, title: str, reply_markup) -> ProgressCallback:
+    async def _push(progress: ExecProgress) -> None:
         try:
-            await task
-        except asyncio.CancelledError:
-            pass
+            await OUTBOX.edit(chat_id, message_id, progress_report(title, progress), reply_markup, priority=PRIORITY_PROGRESS)
+        except TelegramBadRequest:
+            return
 
+    return _push
 
-async def stop_all_metrics() -> None:
-    tasks = list(RUNTIME.metrics_tasks.values())
-    for task in tasks:
-        task.cancel()
-    await asyncio.gather(*tasks, return_exceptions=True)
-    RUNTIME.metrics_tasks.clear()
+
+def job_window_progress(chat_id: int, message_id: int, job: Job, reply_markup) -> ProgressCallback:
+    push = window_progress(chat_id, message_id, f"{job.title} · задача #{job.id}", reply_markup)
+
+    async def _push(progress: ExecProgress) -> None:
+        if RUNTIME.window_jobs.get((chat_id, message_id)) != job.id:
+            return
+        await push(progress)
+
+    return _push
+
+
+def submit_window_job(
+    chat_id: int,
+    message_id: int,
+    title: str,
+    reply_markup,
+    runner: Callable[[ProgressCallback], Awaitable[str]],
+) -> Job:
+    key = (chat_id, message_id)
+
+    async def _run(job: Job) -> str:
+        return await runner(job_window_progress(chat_id, message_id, job, reply_markup))
+
+    async def _finish(job: Job) -> None:
+        if RUNTIME.window_jobs.get(key) == job.id:
+            RUNTIME.window_jobs.pop(key, None)
+            try:
+                await OUTBOX.edit(chat_id, message_id, job.result, reply_markup)
+                return
+            except TelegramBadRequest:
+                pass
+        await OUTBOX.send(chat_id, job.result)
+
+    job = JOBS.submit(title, _run, _finish)
+    RUNTIME.window_jobs[key] = job.id
+    return job
+
+
+async def start_callback_job(
+    callback: CallbackQuery,
+    title: str,
+    reply_markup,
+    runner: Callable[[ProgressCallback], Awaitable[str]],
+) -> Job | None:
+    if not callback.message:
+        return None
+    await update_window_from_callback(callback, job_started_text(title), reply_markup)
+    chat_id, message_id = SESSIONS.get_window(callback.from_user.id)
+    return submit_window_job(chat_id, message_id, title, reply_markup, runner)
 
 
-async def metrics_loop(bot: Bot, chat_id: int, message_id: int, reply_markup) -> None:
-    while True:
-        text = system_metrics_text()
+async def start_message_job(
+    message: Message,
+    title: str,
+    reply_markup,
+    runner: Callable[[ProgressCallback], Awaitable[str]],
+) -> Job:
+    await update_window_from_message(message, job_started_text(title), reply_markup)
+    chat_id, message_id = SESSIONS.get_window(message.from_user.id)
+    return submit_window_job(chat_id, message_id, title, reply_markup, runner)
+
+
+def exec_job(command: Sequence[str], title: str, timeout: int, interval: float, priority: str) -> Callable[[ProgressCallback], Awaitable[str]]:
+    async def _runner(progress: ProgressCallback) -> str:
+        result = await run_exec(command, timeout=timeout, on_progress=progress, interval=interval, priority=priority)
+        return command_report(title, result)
+
+    return _runner
+
+
+def shell_job(command: str, title: str, timeout: int, interval: float, priority: str) -> Callable[[ProgressCallback], Awaitable[str]]:
+    async def _runner(progress: ProgressCallback) -> str:
+        result = await run_shell(command, timeout=timeout, on_progress=progress, interval=interval, priority=priority)
+        return command_report(title, result)
+
+    return _runner
+
+
+@dataclass(slots=True)
+class MetricsViewer:
+    chat_id: int
+    message_id: int
+    reply_markup: object
+    level: str
+
+
+class MetricsHub:
+    def __init__(self, interval: float = 2.0) -> None:
+        self.interval = interval
+        self.viewers: dict[int, MetricsViewer] = {}
+        self._refs = 0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def refs(self) -> int:
+        return self._refs
+
+    def text(self, level: str) -> str:
+        snapshot = SAMPLER.latest(max_age=self.interval / 2)
+        extra = render_details(snapshot) if level == DETAIL_VIEW else history_text(HISTORY, level)
+        return f"{render_metrics(snapshot)}\n\n{extra}"
+
+    def subscribe(self, user_id: int, chat_id: int, message_id: int, reply_markup, level: str) -> None:
+        if user_id not in self.viewers:
+            self._refs += 1
+        self.viewers[user_id] = MetricsViewer(chat_id, message_id, reply_markup, level)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def unsubscribe(self, user_id: int) -> None:
+        if self.viewers.pop(user_id, None) is None:
+            return
+        self._refs -= 1
+        if self._refs <= 0:
+            await self.stop()
+
+    async def stop(self) -> None:
+        self.viewers.clear()
+        self._refs = 0
+        task, self._task = self._task, None
+        if task and task is not asyncio.current_task():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _push(self, user_id: int, viewer: MetricsViewer, text: str) -> None:
         try:
-            await bot.edit_message_text(
-                chat_id=chat_id,
-                message_id=message_id,
-                text=text,
-                reply_markup=reply_markup,
+            await OUTBOX.edit(viewer.chat_id, viewer.message_id, text, viewer.reply_markup, priority=PRIORITY_METRICS)
+        except TelegramBadRequest:
+            await self.unsubscribe(user_id)
+
+    async def _loop(self) -> None:
+        while self.viewers:
+            viewers = list(self.viewers.items())
+            texts = {level: self.text(level) for level in {viewer.level for _, viewer in viewers}}
+            await asyncio.gather(
+                *(self._push(user_id, viewer, texts[viewer.level]) for user_id, viewer in viewers),
+                return_exceptions=True,
             )
-        except TelegramBadRequest as exc:
-            if "message is not modified" not in str(exc).lower():
-                return
-        await asyncio.sleep(2)
+            await asyncio.sleep(self.interval)
+
+
+METRICS_HUB = MetricsHub()
+
+
+async def stop_metrics(user_id: int) -> None:
+    await METRICS_HUB.unsubscribe(user_id)
+
+
+async def stop_all_metrics() -> None:
+    await METRICS_HUB.stop()
@@ -1,114 +1,387 @@
+import asyncio
 import html
+import math
 import time
-from typing import Any
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Mapping, Sequence
 
-import psutil
 from aiogram import Bot
 
-from app.services.shell import run_exec
+from app.services.eventlog import EVENT_ALARM, EVENT_LOG, EVENT_RECOVER
+from app.services.history import HISTORY, SERIES, snapshot_values
+from app.services.journal import JournalWatcher
+from app.services.metrics import SAMPLER
+from app.services.outbox import OUTBOX, PRIORITY_ALERT
+from app.services.rules import RuleSet, collect_sources, format_rule_value
+from app.services.shell import PRIORITY_ALERTS, run_exec
 from app.services.storage import Storage
+from app.services.units import UnitEvent, UnitWatcher, unit_id
+
+SERVICE_BATCH = 100
+SERVICE_CHECK_TIMEOUT = 10
+UNIT_PROPERTIES = "Id,LoadState,ActiveState,SubState"
+SMOOTHING_SECONDS = 30.0
+FANOUT_LIMIT = 8
+DIGEST_LIMIT = 3800
+RECONCILE_CYCLES = 10
+
+EVENT_REPEAT = "repeat"
+
+METRIC_RULES: tuple[tuple[str, str, str], ...] = (
+    ("cpu", "CPU", "нормализован"),
+    ("ram", "RAM", "нормализована"),
+    ("disk", "Disk /", "нормализован"),
+)
+
+
+@dataclass(slots=True)
+class AlertState:
+    active: bool = False
+    value: float | None = None
+    updated: float = 0.0
+    pending_since: float | None = None
+    last_sent: float = 0.0
+
+    def observe(self, ts: float, sample: float, tau: float) -> float:
+        if self.value is None:
+            self.value = sample
+            self.updated = ts
+        elif ts > self.updated:
+            alpha = 1.0 - math.exp(-(ts - self.updated) / tau)
+            self.value += alpha * (sample - self.value)
+            self.updated = ts
+        return self.value
+
+    def advance(self, now: float, triggered: bool, cleared: bool, hold: float, cooldown: float) -> str | None:
+        if self.active and triggered:
+            self.pending_since = None
+            if now - self.last_sent >= cooldown:
+                self.last_sent = now
+                return EVENT_REPEAT
+            return None
+        wanted = cleared if self.active else triggered
+        if not wanted:
+            self.pending_since = None
+            return None
+        if self.pending_since is None:
+            self.pending_since = now
+        if now - self.pending_since < hold:
+            return None
+        self.pending_since = None
+        self.active = not self.active
+        self.last_sent = now
+        return EVENT_ALARM if self.active else EVENT_RECOVER
+
+
+@dataclass(slots=True)
+class AlertCycleStats:
+    started_at: float = 0.0
+    duration: float = 0.0
+    services: int = 0
+    unresolved: int = 0
+    cycles: int = 0
+    event_mode: bool = False
+    unit_events: int = 0
+
+
+ALERT_CYCLE = AlertCycleStats()
+
+
+def parse_unit_states(output: str) -> list[dict[str, str]]:
+    units: list[dict[str, str]] = []
+    current: dict[str, str] = {}
+    for line in output.splitlines():
+        if not line.strip():
+            if current:
+                units.append(current)
+                current = {}
+            continue
+        key, sep, value = line.partition("=")
+        if sep:
+            current[key.strip()] = value.strip()
+    if current:
+        units.append(current)
+    return units
+
+
+def match_unit_states(names: Sequence[str], units: list[dict[str, str]]) -> dict[str, dict[str, str]]:
+    if len(units) == len(names):
+        return dict(zip(names, units))
+    by_id = {unit.get("Id", ""): unit for unit in units}
+    return {name: by_id[unit_id(name)] for name in names if unit_id(name) in by_id}
+
+
+def unit_status(unit: dict[str, str]) -> tuple[str, str]:
+    active = unit.get("ActiveState", "unknown")
+    status = active if unit.get("LoadState", "loaded") == "loaded" else unit.get("LoadState", "unknown")
+    if unit.get("SubState"):
+        status = f"{status} ({unit['SubState']})"
+    return active, status
+
+
+def build_digest(lines: Sequence[str], limit: int = DIGEST_LIMIT) -> list[str]:
+    if len(lines) == 1:
+        return [lines[0]]
+    header = f"<b>🔔 Алерты ({len(lines)})</b> · {datetime.now().strftime('%H:%M:%S')}"
+    parts: list[str] = []
+    current = header
+    for line in lines:
+        if len(current) + len(line) + 1 > limit and current != header:
+            parts.append(current)
+            current = header
+        current = f"{current}\n{line}"
+    parts.append(current)
+    return parts
+
+
+class AlertDispatcher:
+    def __init__(self, storage: Storage, admin_ids: tuple[int, ...], concurrency: int = FANOUT_LIMIT) -> None:
+        self.storage = storage
+        self.admin_ids = admin_ids
+        self.concurrency = concurrency
+        self.pending: list[str] = []
+
+    def add(self, text: str) -> None:
+        self.pending.append(text)
+
+    async def recipients(self) -> list[int]:
+        config = await self.storage.get_alerts()
+        muted = set(config.get("muted", []))
+        recipients = await self.storage.list_admin_ids(self.admin_ids)
+        chat_id = await self.storage.get_admin_chat_id()
+        if chat_id and chat_id not in recipients:
+            recipients.append(chat_id)
+        return [item for item in recipients if item not in muted]
+
+    async def send(self, text: str) -> None:
+        await self.broadcast(build_digest([text]))
+
+    async def flush(self) -> None:
+        lines, self.pending = self.pending, []
+        if lines:
+            await self.broadcast(build_digest(lines))
+
+    async def broadcast(self, parts: Sequence[str]) -> None:
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def _deliver(chat_id: int) -> None:
+            async with slots:
+                for part in parts:
+                    await OUTBOX.send(chat_id, part, priority=PRIORITY_ALERT)
+
+        recipients = await self.recipients()
+        await asyncio.gather(*(_deliver(chat_id) for chat_id in recipients), return_exceptions=True)
 
 
 class AlertsEngine:
-    def __init__(self, bot: Bot, storage: Storage, command_timeout: int) -> None:
+    def __init__(self, bot: Bot, storage: Storage, command_timeout: int, admin_ids: tuple[int, ...]) -> None:
         self.bot = bot
         self.storage = storage
         self.command_timeout = command_timeout
-        self.last_sent: dict[str, float] = {}
-        self.active: dict[str, bool] = {}
+        self.dispatcher = AlertDispatcher(storage, admin_ids)
+        self.journal = JournalWatcher(self.dispatcher.send)
+        self.units = UnitWatcher(self._on_unit_event)
+        self.unit_states: dict[str, tuple[str, str]] = {}
+        self._watched: dict[str, str] = {}
+        self._units_synced = 0
+        self._event_cycles = 0
+        self.states: dict[str, AlertState] = {}
+        self.rules = RuleSet(())
 
-    async def _notify(self, chat_id: int, text: str) -> None:
-        await self.bot.send_message(chat_id=chat_id, text=text)
+    def _state(self, key: str) -> AlertState:
+        state = self.states.get(key)
+        if state is None:
+            state = AlertState()
+            self.states[key] = state
+        return state
 
-    async def _evaluate(
+    def _evaluate(
         self,
-        chat_id: int,
         key: str,
         triggered: bool,
+        cleared: bool,
         alarm_text: str,
         recover_text: str,
         cooldown: int,
+        hold: int,
     ) -> None:
-        now = time.monotonic()
-        was_active = self.active.get(key, False)
-        if triggered:
-            last = self.last_sent.get(key, 0.0)
-            if (not was_active) or (now - last >= cooldown):
-                await self._notify(chat_id, alarm_text)
-                self.last_sent[key] = now
-            self.active[key] = True
-            return
-        if was_active:
-            await self._notify(chat_id, recover_text)
-            self.last_sent[key] = now
-        self.active[key] = False
+        event = self._state(key).advance(time.monotonic(), triggered, cleared, hold, cooldown)
+        if event in {EVENT_ALARM, EVENT_RECOVER}:
+            EVENT_LOG.record(key, event)
+        if event in {EVENT_ALARM, EVENT_REPEAT}:
+            self.dispatcher.add(alarm_text)
+        elif event == EVENT_RECOVER:
+            self.dispatcher.add(recover_text)
+
+    def _metric_samples(self) -> list[tuple[float, ...]]:
+        since = min((self._state(f"metric:{name}").updated for name, _, _ in METRIC_RULES), default=0.0)
+        rows = HISTORY.since(since)
+        if rows:
+            return rows
+        return [(time.time(), *snapshot_values(SAMPLER.latest(max_age=1.0)))]
 
     async def check_once(self) -> None:
         config = await self.storage.get_alerts()
         if not config["enabled"]:
             return
-        chat_id = await self.storage.get_admin_chat_id()
-        if not chat_id:
-            return
         cooldown = int(config["cooldown"])
-        cpu = psutil.cpu_percent(interval=None)
-        ram = psutil.virtual_memory().percent
-        disk = psutil.disk_usage("/").percent
-        await self._evaluate(
-            chat_id,
-            "metric:cpu",
-            cpu >= config["cpu"],
-            f"🚨 CPU выше порога: {cpu:.1f}% (порог {config['cpu']}%)",
-            f"✅ CPU нормализован: {cpu:.1f}% (порог {config['cpu']}%)",
-            cooldown,
-        )
-        await self._evaluate(
-            chat_id,
-            "metric:ram",
-            ram >= config["ram"],
-            f"🚨 RAM выше порога: {ram:.1f}% (порог {config['ram']}%)",
-            f"✅ RAM нормализована: {ram:.1f}% (порог {config['ram']}%)",
-            cooldown,
+        hold = int(config["hold"])
+        hysteresis = int(config["hysteresis"])
+        rows = self._metric_samples()
+        for name, title, recovered in METRIC_RULES:
+            key = f"metric:{name}"
+            state = self._state(key)
+            column = SERIES.index(name) + 1
+            for row in rows:
+                state.observe(row[0], row[column], SMOOTHING_SECONDS)
+            value = state.value or 0.0
+            threshold = int(config[name])
+            self._evaluate(
+                key,
+                value >= threshold,
+                value < threshold - hysteresis,
+                f"🚨 {title} выше порога: {value:.1f}% (порог {threshold}%)",
+                f"✅ {title} {recovered}: {value:.1f}% (порог {threshold}%)",
+                cooldown,
+                hold,
+            )
+        await self._check_rules(config.get("rules", []), cooldown, hold)
+        services: list[str] = list(config.get("services", []))
+        self._watched = {unit_id(service): service for service in services}
+        self.unit_states = {service: item for service, item in self.unit_states.items() if service in services}
+        event_mode = (
+            self.units.healthy
+            and self.units.generation == self._units_synced
+            and self._event_cycles < RECONCILE_CYCLES
         )
-        await self._evaluate(
-            chat_id,
-            "metric:disk",
-            disk >= config["disk"],
-            f"🚨 Disk / выше порога: {disk:.1f}% (порог {config['disk']}%)",
-            f"✅ Disk / нормализован: {disk:.1f}% (порог {config['disk']}%)",
+        pending = [service for service in services if service not in self.unit_states] if event_mode else services
+        if pending:
+            generation = self.units.generation
+            states = await self._service_states(pending)
+            ALERT_CYCLE.unresolved = len(pending) - len(states)
+            for service, unit in states.items():
+                self.unit_states[service] = unit_status(unit)
+            if not event_mode and self.units.healthy:
+                self._units_synced = generation
+                self._event_cycles = 0
+        if event_mode:
+            self._event_cycles += 1
+        ALERT_CYCLE.services = len(services)
+        ALERT_CYCLE.event_mode = event_mode
+        for service in services:
+            current = self.unit_states.get(service)
+            if current is not None:
+                self._evaluate_service(service, current[0], current[1], cooldown)
+
+    def _evaluate_service(self, service: str, active: str, status: str, cooldown: int) -> None:
+        escaped = html.escape(service)
+        self._evaluate(
+            f"service:{service}",
+            active != "active",
+            active == "active",
+            f"🚨 Служба <code>{escaped}</code> неактивна: <b>{html.escape(status)}</b>",
+            f"✅ Служба <code>{escaped}</code> снова активна",
             cooldown,
+            0,
         )
-        services: list[str] = list(config.get("services", []))
-        for service in services:
-            result = await run_exec(
-                ["systemctl", "is-active", service],
-                timeout=max(10, self.command_timeout),
-            )
-            status = result.stdout.strip() or result.stderr.strip() or "unknown"
-            triggered = result.returncode != 0 or status != "active"
-            escaped = html.escape(service)
-            await self._evaluate(
-                chat_id,
-                f"service:{service}",
+
+    async def _on_unit_event(self, event: UnitEvent) -> None:
+        service = self._watched.get(event.unit)
+        if service is None:
+            return
+        ALERT_CYCLE.unit_events += 1
+        status = f"{event.state} ({event.result})" if event.result else event.state
+        self.unit_states[service] = (event.state, status)
+        config = await self.storage.get_alerts()
+        if not config["enabled"]:
+            return
+        self._evaluate_service(service, event.state, status, int(config["cooldown"]))
+        await self.dispatcher.flush()
+
+    async def _check_rules(self, texts: Sequence[str], cooldown: int, hold: int) -> None:
+        if self.rules.key != tuple(texts):
+            self.rules = RuleSet(texts)
+        if not self.rules.rules:
+            return
+        snapshot = SAMPLER.latest(max_age=1.0)
+        values = await asyncio.to_thread(collect_sources, self.rules.sources, snapshot)
+        for rule in self.rules.rules:
+            value = values[rule.index]
+            if value is None:
+                continue
+            triggered = rule.check(values)
+            escaped = html.escape(rule.text)
+            shown = format_rule_value(rule.spec, value)
+            self._evaluate(
+                f"rule:{rule.text}",
                 triggered,
-                f"🚨 Служба <code>{escaped}</code> неактивна: <b>{html.escape(status)}</b>",
-                f"✅ Служба <code>{escaped}</code> снова активна",
+                not triggered,
+                f"🚨 Правило <code>{escaped}</code>: {html.escape(shown)}",
+                f"✅ Правило <code>{escaped}</code> снято: {html.escape(shown)}",
                 cooldown,
+                hold,
             )
 
+    async def _query_units(self, names: Sequence[str]) -> dict[str, dict[str, str]]:
+        result = await run_exec(
+            ["systemctl", "show", "-p", UNIT_PROPERTIES, "--", *names],
+            timeout=min(SERVICE_CHECK_TIMEOUT, max(1, self.command_timeout)),
+            priority=PRIORITY_ALERTS,
+        )
+        if result.timed_out:
+            return {}
+        return match_unit_states(names, parse_unit_states(result.stdout))
+
+    async def _service_states(self, services: Sequence[str]) -> dict[str, dict[str, str]]:
+        if not services:
+            return {}
+        batches = [services[start : start + SERVICE_BATCH] for start in range(0, len(services), SERVICE_BATCH)]
+        results = await asyncio.gather(*(self._query_units(batch) for batch in batches), return_exceptions=True)
+        states: dict[str, dict[str, str]] = {}
+        for item in results:
+            if isinstance(item, dict):
+                states.update(item)
+        return states
+
+    async def _sync_watchers(self, config: Mapping[str, Any]) -> None:
+        if config["enabled"] and config["journal"]:
+            self.journal.start()
+        elif self.journal.running:
+            await self.journal.stop()
+        if config["enabled"] and config["services"]:
+            self.units.start()
+        elif self.units.running:
+            await self.units.stop()
+
     async def run(self) -> None:
+        try:
+            await EVENT_LOG.expire_open()
+            await self._loop()
+        finally:
+            await self.journal.stop()
+            await self.units.stop()
+            await EVENT_LOG.flush()
+
+    async def _loop(self) -> None:
         while True:
             config = await self.storage.get_alerts()
             interval = int(config["interval"])
+            await self._sync_watchers(config)
+            started = time.monotonic()
             try:
                 await self.check_once()
             except Exception as exc:
-                chat_id = await self.storage.get_admin_chat_id()
-                if chat_id:
-                    await self._notify(chat_id, f"⚠️ Ошибка цикла алертов: <code>{html.escape(str(exc))}</code>")
-            await self._sleep(interval)
-
-    async def _sleep(self, interval: int) -> None:
-        import asyncio
+                self.dispatcher.add(f"⚠️ Ошибка цикла алертов: <code>{html.escape(str(exc))}</code>")
+            try:
+                await self.dispatcher.flush()
+            except Exception:
+                pass
+            duration = time.monotonic() - started
+            ALERT_CYCLE.started_at = time.time() - duration
+            ALERT_CYCLE.duration = duration
+            ALERT_CYCLE.cycles += 1
+            await self._sleep(max(0.0, interval - duration))
 
+    async def _sleep(self, interval: float) -> None:
         await asyncio.sleep(max(10, min(interval, 3600)))
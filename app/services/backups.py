@@ -1,72 +1,597 @@
 import asyncio
+import gzip
 import hashlib
+import json
+import os
 import re
+import shutil
+import stat
+import struct
 import tarfile
+import threading
+import time
+import zlib
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, TypeVar
+
+from app.services.shell import PRIORITY_BACKUP, SCHEDULER
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 BACKUP_DIR = Path("/backup")
 SAFE_NAME_RE = re.compile(r"^[a-zA-Z0-9_.-]+$")
 
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+ARCHIVE_SUFFIXES = {COMPRESSION_GZIP: ".tar.gz", COMPRESSION_ZSTD: ".tar.zst"}
+GZIP_LEVEL = 6
+GZIP_BLOCK_SIZE = 1024 * 1024
+GZIP_WINDOW = 32 * 1024
+ZSTD_LEVEL = 3
+READ_CHUNK = 1024 * 1024
+
+MANIFEST_DIR = ".manifests"
+MAX_CHAIN = 30
+ENTRY_FILE = "f"
+ENTRY_DIR = "d"
+ENTRY_LINK = "l"
+ENTRY_SPECIAL = "s"
+
+T = TypeVar("T")
+
 
 def ensure_backup_dir() -> Path:
     BACKUP_DIR.mkdir(parents=True, exist_ok=True)
     return BACKUP_DIR
 
 
-def build_backup_name(source: Path) -> str:
+def default_workers() -> int:
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def available_compression(compression: str) -> str:
+    if compression == COMPRESSION_ZSTD and zstandard is not None:
+        return COMPRESSION_ZSTD
+    return COMPRESSION_GZIP
+
+
+def backup_stem(source: Path) -> str:
     base = source.name if source.name else "rootfs"
     safe = re.sub(r"[^a-zA-Z0-9_.-]+", "_", base).strip("_")
     if not safe:
         safe = "backup"
     stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"{safe}_{stamp}.tar.gz"
+    return f"{safe}_{stamp}"
+
+
+def build_backup_name(source: Path, compression: str = COMPRESSION_GZIP, incremental: bool = False) -> str:
+    kind = "_inc" if incremental else ""
+    return f"{backup_stem(source)}{kind}{ARCHIVE_SUFFIXES[compression]}"
+
+
+def _deflate_block(data: bytes, dictionary: bytes, level: int, last: bool) -> bytes:
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter:
+    def __init__(
+        self,
+        fileobj: BinaryIO,
+        workers: int,
+        level: int = GZIP_LEVEL,
+        block_size: int = GZIP_BLOCK_SIZE,
+    ) -> None:
+        self.fileobj = fileobj
+        self.workers = max(1, workers)
+        self.level = level
+        self.block_size = block_size
+        self.closed = False
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="gzip") if self.workers > 1 else None
+        self._pending: deque[Future] = deque()
+        self._buffer = bytearray()
+        self._dictionary = b""
+        self._crc = 0
+        self._size = 0
+        fileobj.write(struct.pack("<BBBBIBB", 0x1F, 0x8B, 8, 0, int(time.time()), 0, 3))
+
+    def __enter__(self) -> "ParallelGzipWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, data: bytes) -> int:
+        view = memoryview(data)
+        self._crc = zlib.crc32(view, self._crc)
+        self._size += len(view)
+        self._buffer += view
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[: self.block_size])
+            del self._buffer[: self.block_size]
+            self._submit(block, last=False)
+        return len(view)
+
+    def flush(self) -> None:
+        return
+
+    def _submit(self, block: bytes, last: bool) -> None:
+        dictionary, self._dictionary = self._dictionary, block[-GZIP_WINDOW:]
+        if self._executor is None:
+            self.fileobj.write(_deflate_block(block, dictionary, self.level, last))
+            return
+        self._pending.append(self._executor.submit(_deflate_block, block, dictionary, self.level, last))
+        while len(self._pending) > self.workers * 2:
+            self.fileobj.write(self._pending.popleft().result())
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._submit(bytes(self._buffer), last=True)
+            self._buffer.clear()
+            while self._pending:
+                self.fileobj.write(self._pending.popleft().result())
+            self.fileobj.write(struct.pack("<II", self._crc & 0xFFFFFFFF, self._size & 0xFFFFFFFF))
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+
+    def abort(self) -> None:
+        self.closed = True
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+
+def open_compressor(fileobj: BinaryIO, compression: str, workers: int):
+    if compression == COMPRESSION_ZSTD and zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=workers if workers > 1 else 0)
+        return compressor.stream_writer(fileobj, closefd=False)
+    return ParallelGzipWriter(fileobj, workers)
+
+
+class HashingWriter:
+    def __init__(self, fileobj: BinaryIO) -> None:
+        self.fileobj = fileobj
+        self.digest = hashlib.sha256()
+        self.size = 0
 
+    def write(self, data: bytes) -> int:
+        self.digest.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
 
-def _sha256_file(path: Path) -> str:
-    digest = hashlib.sha256()
-    with path.open("rb") as handle:
-        while True:
-            chunk = handle.read(1024 * 1024)
-            if not chunk:
-                break
-            digest.update(chunk)
-    return digest.hexdigest()
+    def flush(self) -> None:
+        self.fileobj.flush()
 
+    def hexdigest(self) -> str:
+        return self.digest.hexdigest()
 
-def _extract_safe(archive: tarfile.TarFile, target: Path) -> int:
+
+class HashingReader:
+    def __init__(self, fileobj: BinaryIO) -> None:
+        self.fileobj = fileobj
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.fileobj.read(size)
+        self.digest.update(data)
+        self.size += len(data)
+        return data
+
+    def drain(self) -> None:
+        while self.read(READ_CHUNK):
+            pass
+
+    def hexdigest(self) -> str:
+        return self.digest.hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
+class ArchiveCheck:
+    name: str
+    members: int
+    size: int
+    checksum: str
+    expected: str | None
+
+    @property
+    def ok(self) -> bool:
+        return self.expected is None or self.expected == self.checksum
+
+
+def checksum_path_for(archive_path: Path) -> Path:
+    return Path(f"{archive_path}.sha256")
+
+
+def read_checksum(archive_path: Path) -> str | None:
+    try:
+        text = checksum_path_for(archive_path).read_text(encoding="utf-8")
+    except OSError:
+        return None
+    value = text.split(maxsplit=1)[0].lower() if text.strip() else ""
+    return value if re.fullmatch(r"[0-9a-f]{64}", value) else None
+
+
+@contextmanager
+def open_archive_stream(fileobj: BinaryIO, name: str) -> Iterator[tarfile.TarFile]:
+    if not name.endswith(ARCHIVE_SUFFIXES[COMPRESSION_ZSTD]):
+        with tarfile.open(fileobj=fileobj, mode="r|gz") as archive:
+            yield archive
+        return
+    if zstandard is None:
+        raise RuntimeError("Для .tar.zst нужен модуль zstandard")
+    stream = zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False)
+    with tarfile.open(fileobj=stream, mode="r|") as archive:
+        yield archive
+
+
+def _scan_archive(archive_path: Path, visit: Callable[[tarfile.TarFile], int]) -> ArchiveCheck:
+    expected = read_checksum(archive_path)
+    with archive_path.open("rb") as handle:
+        reader = HashingReader(handle)
+        with open_archive_stream(reader, archive_path.name) as archive:
+            members = visit(archive)
+        reader.drain()
+    return ArchiveCheck(
+        name=archive_path.name,
+        members=members,
+        size=reader.size,
+        checksum=reader.hexdigest(),
+        expected=expected,
+    )
+
+
+def _verify_checksum(archive_path: Path) -> None:
+    expected = read_checksum(archive_path)
+    if expected is None:
+        return
+    with archive_path.open("rb") as handle:
+        reader = HashingReader(handle)
+        reader.drain()
+    if reader.hexdigest() != expected:
+        raise RuntimeError(f"SHA256 архива {archive_path.name} не совпадает, восстановление отменено")
+
+
+def _extract_safe(archive: tarfile.TarFile, target: Path, stop: threading.Event | None = None) -> int:
     target.mkdir(parents=True, exist_ok=True)
     target_resolved = target.resolve()
-    members = archive.getmembers()
-    for member in members:
+    count = 0
+    for member in archive:
+        if stop is not None and stop.is_set():
+            raise RuntimeError("Восстановление отменено")
         resolved = (target / member.name).resolve()
-        if not str(resolved).startswith(str(target_resolved)):
+        if not resolved.is_relative_to(target_resolved) or ".." in Path(member.name).parts:
             raise RuntimeError("Архив содержит небезопасный путь")
-    archive.extractall(path=target)
-    return len(members)
+        archive.extract(member, path=target)
+        count += 1
+    return count
+
+
+ManifestEntry = tuple[str, int, int, int, str]
+
+
+@dataclass(frozen=True, slots=True)
+class BackupManifest:
+    source: str
+    root: str
+    archive: str
+    parent: str | None
+    depth: int
+    created: float
+    entries: dict[str, ManifestEntry]
+    deleted: list[str]
 
 
-async def create_backup(source: Path) -> tuple[Path, int, str]:
+@dataclass(frozen=True, slots=True)
+class BackupResult:
+    archive: Path
+    size: int
+    checksum: str
+    parent: str | None
+    changed: int
+    unchanged: int
+    deleted: int
+
+
+def manifest_path_for(archive_path: Path) -> Path:
+    return Path(f"{archive_path}.manifest.gz")
+
+
+def _pointer_path(source: Path) -> Path:
+    key = hashlib.sha256(str(source).encode("utf-8")).hexdigest()[:16]
+    return ensure_backup_dir() / MANIFEST_DIR / f"{key}.last"
+
+
+def save_manifest(path: Path, manifest: BackupManifest) -> None:
+    payload = {
+        "version": 1,
+        "source": manifest.source,
+        "root": manifest.root,
+        "archive": manifest.archive,
+        "parent": manifest.parent,
+        "depth": manifest.depth,
+        "created": manifest.created,
+        "entries": manifest.entries,
+        "deleted": manifest.deleted,
+    }
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as handle:
+        json.dump(payload, handle, ensure_ascii=False, separators=(",", ":"))
+    tmp.replace(path)
+
+
+def load_manifest(path: Path) -> BackupManifest | None:
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as handle:
+            payload = json.load(handle)
+        entries = {str(rel): tuple(item) for rel, item in payload["entries"].items()}
+        return BackupManifest(
+            source=str(payload["source"]),
+            root=str(payload["root"]),
+            archive=str(payload["archive"]),
+            parent=payload["parent"],
+            depth=int(payload["depth"]),
+            created=float(payload["created"]),
+            entries=entries,
+            deleted=[str(rel) for rel in payload["deleted"]],
+        )
+    except (OSError, ValueError, KeyError, TypeError, EOFError):
+        return None
+
+
+def latest_manifest(source: Path) -> BackupManifest | None:
+    try:
+        name = _pointer_path(source).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    if not SAFE_NAME_RE.fullmatch(name):
+        return None
+    archive_path = ensure_backup_dir() / name
+    if not archive_path.is_file():
+        return None
+    manifest = load_manifest(manifest_path_for(archive_path))
+    if manifest is None or manifest.source != str(source) or manifest.depth >= MAX_CHAIN:
+        return None
+    return manifest
+
+
+def backup_chain(archive_path: Path) -> list[tuple[Path, BackupManifest | None]]:
+    chain: list[tuple[Path, BackupManifest | None]] = []
+    current = archive_path
+    while True:
+        manifest = load_manifest(manifest_path_for(current))
+        chain.append((current, manifest))
+        if manifest is None or manifest.parent is None:
+            break
+        parent = current.with_name(manifest.parent)
+        if not SAFE_NAME_RE.fullmatch(manifest.parent) or not parent.is_file() or len(chain) > MAX_CHAIN:
+            raise RuntimeError(f"Не найден базовый архив {manifest.parent}")
+        current = parent
+    chain.reverse()
+    return chain
+
+
+def dependent_backups(archive_path: Path) -> list[str]:
+    names: list[str] = []
+    for path in archive_path.parent.glob("*.manifest.gz"):
+        manifest = load_manifest(path)
+        if manifest is not None and manifest.parent == archive_path.name:
+            names.append(manifest.archive)
+    return names
+
+
+def walk_tree(source: Path) -> Iterator[tuple[str, os.DirEntry]]:
+    stack: list[tuple[str, str]] = [(str(source), "")]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                items = list(iterator)
+        except OSError:
+            continue
+        for entry in items:
+            rel = prefix + entry.name
+            yield rel, entry
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, rel + "/"))
+            except OSError:
+                continue
+
+
+def entry_signature(entry: os.DirEntry) -> tuple[str, os.stat_result, str] | None:
+    try:
+        info = entry.stat(follow_symlinks=False)
+        if stat.S_ISDIR(info.st_mode):
+            return ENTRY_DIR, info, ""
+        if stat.S_ISLNK(info.st_mode):
+            return ENTRY_LINK, info, os.readlink(entry.path)
+        if stat.S_ISREG(info.st_mode):
+            return ENTRY_FILE, info, ""
+        if stat.S_ISFIFO(info.st_mode):
+            return ENTRY_SPECIAL, info, "fifo"
+        if stat.S_ISCHR(info.st_mode) or stat.S_ISBLK(info.st_mode):
+            device = "chr" if stat.S_ISCHR(info.st_mode) else "blk"
+            return ENTRY_SPECIAL, info, f"{device}:{os.major(info.st_rdev)}:{os.minor(info.st_rdev)}"
+    except OSError:
+        return None
+    return None
+
+
+def make_special(path: Path, spec: str, mode: int) -> None:
+    if spec == "fifo":
+        os.mkfifo(path, mode)
+        return
+    device, major, minor = spec.split(":")
+    kind = stat.S_IFCHR if device == "chr" else stat.S_IFBLK
+    os.mknod(path, mode | kind, os.makedev(int(major), int(minor)))
+
+
+def _pack_tree(
+    source: Path,
+    archive_path: Path,
+    compression: str,
+    workers: int,
+    parent: BackupManifest | None,
+    stop: threading.Event,
+) -> tuple[int, str, dict[str, ManifestEntry], int, int]:
+    root = source.name if source.name else "rootfs"
+    previous = parent.entries if parent is not None else {}
+    entries: dict[str, ManifestEntry] = {}
+    changed = 0
+    unchanged = 0
+    with archive_path.open("wb") as handle:
+        writer = HashingWriter(handle)
+        with open_compressor(writer, compression, workers) as stream:
+            with tarfile.open(fileobj=stream, mode="w|") as archive:
+                archive.addfile(archive.gettarinfo(str(source), root))
+                for rel, entry in walk_tree(source):
+                    if stop.is_set():
+                        raise RuntimeError("Backup отменен")
+                    signature = entry_signature(entry)
+                    if signature is None:
+                        continue
+                    kind, info, digest = signature
+                    old = previous.get(rel)
+                    if old is not None and old[:4] == (kind, info.st_size, info.st_mtime_ns, info.st_ino) and (
+                        kind not in {ENTRY_LINK, ENTRY_SPECIAL} or old[4] == digest
+                    ):
+                        entries[rel] = old
+                        unchanged += 1
+                        continue
+                    try:
+                        member = archive.gettarinfo(entry.path, f"{root}/{rel}")
+                        if member.isreg():
+                            with open(entry.path, "rb") as file_handle:
+                                reader = HashingReader(file_handle)
+                                archive.addfile(member, reader)
+                            digest = reader.hexdigest()
+                        else:
+                            archive.addfile(member)
+                    except FileNotFoundError:
+                        continue
+                    entries[rel] = (kind, info.st_size, info.st_mtime_ns, info.st_ino, digest)
+                    changed += 1
+    return writer.size, writer.hexdigest(), entries, changed, unchanged
+
+
+def _finish_backup(source: Path, archive_path: Path, checksum: str, manifest: BackupManifest) -> None:
+    checksum_path_for(archive_path).write_text(f"{checksum}  {archive_path.name}\n", encoding="utf-8")
+    save_manifest(manifest_path_for(archive_path), manifest)
+    pointer = _pointer_path(source)
+    pointer.parent.mkdir(parents=True, exist_ok=True)
+    pointer.write_text(archive_path.name, encoding="utf-8")
+
+
+def _apply_deletions(target: Path, manifest: BackupManifest) -> int:
+    target_resolved = target.resolve()
+    removed = 0
+    for rel in manifest.deleted:
+        path = target / manifest.root / rel
+        if not path.parent.resolve().is_relative_to(target_resolved) or ".." in Path(rel).parts:
+            continue
+        try:
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+        except FileNotFoundError:
+            continue
+        removed += 1
+    return removed
+
+
+async def run_cancellable(func: Callable[[threading.Event], T]) -> T:
+    stop = threading.Event()
+    worker = asyncio.ensure_future(asyncio.to_thread(func, stop))
+    try:
+        return await asyncio.shield(worker)
+    except asyncio.CancelledError:
+        stop.set()
+        await asyncio.gather(worker, return_exceptions=True)
+        raise
+
+
+async def _create(source: Path, workers: int, compression: str, incremental: bool) -> BackupResult:
     destination = ensure_backup_dir()
-    archive_path = destination / build_backup_name(source)
+    compression = available_compression(compression)
+    workers = workers or default_workers()
+    parent = await asyncio.to_thread(latest_manifest, source) if incremental else None
+    archive_path = destination / build_backup_name(source, compression, incremental=parent is not None)
+
+    def _pack(stop: threading.Event) -> tuple[int, str, dict[str, ManifestEntry], int, int]:
+        return _pack_tree(source, archive_path, compression, workers, parent, stop)
+
+    async with SCHEDULER.slot(PRIORITY_BACKUP, f"backup {source}"):
+        try:
+            size_bytes, checksum, entries, changed, unchanged = await run_cancellable(_pack)
+        except BaseException:
+            archive_path.unlink(missing_ok=True)
+            raise
+    deleted = sorted(set(parent.entries) - set(entries)) if parent is not None else []
+    manifest = BackupManifest(
+        source=str(source),
+        root=source.name if source.name else "rootfs",
+        archive=archive_path.name,
+        parent=parent.archive if parent is not None else None,
+        depth=parent.depth + 1 if parent is not None else 0,
+        created=time.time(),
+        entries=entries,
+        deleted=deleted,
+    )
+    await asyncio.to_thread(_finish_backup, source, archive_path, checksum, manifest)
+    return BackupResult(
+        archive=archive_path,
+        size=size_bytes,
+        checksum=checksum,
+        parent=manifest.parent,
+        changed=changed,
+        unchanged=unchanged,
+        deleted=len(deleted),
+    )
 
-    def _pack() -> None:
-        arcname = source.name if source.name else "rootfs"
-        with tarfile.open(archive_path, "w:gz") as archive:
-            archive.add(source, arcname=arcname)
 
-    await asyncio.to_thread(_pack)
-    checksum = await asyncio.to_thread(_sha256_file, archive_path)
-    checksum_path = Path(f"{archive_path}.sha256")
-    checksum_path.write_text(f"{checksum}  {archive_path.name}\n", encoding="utf-8")
-    size_bytes = archive_path.stat().st_size
-    return archive_path, size_bytes, checksum
+async def create_backup(
+    source: Path,
+    workers: int = 0,
+    compression: str = COMPRESSION_GZIP,
+) -> tuple[Path, int, str]:
+    result = await _create(source, workers, compression, incremental=False)
+    return result.archive, result.size, result.checksum
+
+
+async def create_incremental_backup(
+    source: Path,
+    workers: int = 0,
+    compression: str = COMPRESSION_GZIP,
+) -> BackupResult:
+    return await _create(source, workers, compression, incremental=True)
 
 
 def list_backups(limit: int = 20) -> list[tuple[str, int, datetime]]:
     destination = ensure_backup_dir()
     items: list[tuple[str, int, datetime]] = []
-    for path in destination.glob("*.tar.gz"):
+    for path in destination.iterdir():
+        if not path.name.endswith(tuple(ARCHIVE_SUFFIXES.values())) or not path.is_file():
+            continue
         stat = path.stat()
         items.append((path.name, stat.st_size, datetime.fromtimestamp(stat.st_mtime)))
     items.sort(key=lambda item: item[2], reverse=True)
@@ -85,22 +610,51 @@ def resolve_backup_name(name: str) -> Path | None:
     return None
 
 
-async def restore_backup(archive_path: Path, target: Path) -> int:
-    def _restore() -> int:
-        with tarfile.open(archive_path, "r:gz") as archive:
-            return _extract_safe(archive, target)
+async def restore_backup(archive_path: Path, target: Path) -> tuple[list[ArchiveCheck], int]:
+    def _restore(stop: threading.Event) -> tuple[list[ArchiveCheck], int]:
+        checks: list[ArchiveCheck] = []
+        removed = 0
+        chain = backup_chain(archive_path)
+        for path, _ in chain:
+            if stop.is_set():
+                raise RuntimeError("Восстановление отменено")
+            _verify_checksum(path)
+        for path, manifest in chain:
+            check = _scan_archive(path, lambda archive: _extract_safe(archive, target, stop))
+            if not check.ok:
+                raise RuntimeError(f"SHA256 архива {path.name} изменился во время восстановления")
+            checks.append(check)
+            if manifest is not None:
+                removed += _apply_deletions(target, manifest)
+        return checks, removed
+
+    async with SCHEDULER.slot(PRIORITY_BACKUP, f"restore {archive_path.name}"):
+        return await run_cancellable(_restore)
+
+
+def _count_members(archive: tarfile.TarFile) -> int:
+    count = 0
+    for _ in archive:
+        count += 1
+    return count
+
 
-    return await asyncio.to_thread(_restore)
+async def verify_backup(archive_path: Path) -> ArchiveCheck:
+    async with SCHEDULER.slot(PRIORITY_BACKUP, f"verify {archive_path.name}"):
+        return await asyncio.to_thread(_scan_archive, archive_path, _count_members)
 
 
 def delete_backup(archive_path: Path) -> tuple[bool, str]:
+    dependents = dependent_backups(archive_path)
+    if dependents:
+        return False, f"Архив является базой для: {', '.join(sorted(dependents))}"
     try:
         archive_path.unlink(missing_ok=False)
     except Exception as exc:
         return False, str(exc)
-    checksum_path = Path(f"{archive_path}.sha256")
     try:
-        checksum_path.unlink(missing_ok=True)
+        checksum_path_for(archive_path).unlink(missing_ok=True)
+        manifest_path_for(archive_path).unlink(missing_ok=True)
     except Exception:
         pass
     return True, "OK"
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Sequence
+
+from app.services.shell import ExecResult, add_exec_listener, run_exec
+
+
+@dataclass(frozen=True, slots=True)
+class CacheRule:
+    prefix: tuple[str, ...]
+    ttl: float
+    tag: str
+
+
+@dataclass(frozen=True, slots=True)
+class InvalidationRule:
+    program: tuple[str, ...]
+    verbs: frozenset[str]
+    tag: str
+
+
+CACHE_RULES: tuple[CacheRule, ...] = (
+    CacheRule(("iptables", "-L"), 10.0, "iptables"),
+    CacheRule(("ss",), 5.0, "ports"),
+    CacheRule(("ip", "-br"), 10.0, "ifaces"),
+    CacheRule(("docker", "ps"), 5.0, "docker"),
+    CacheRule(("docker", "images"), 30.0, "docker"),
+    CacheRule(("fail2ban-client", "status"), 10.0, "fail2ban"),
+)
+
+INVALIDATION_RULES: tuple[InvalidationRule, ...] = (
+    InvalidationRule(("iptables",), frozenset({"-A", "-I", "-D", "-R", "-F", "-X", "-P", "-N", "-Z", "-E"}), "iptables"),
+    InvalidationRule(("docker", "compose"), frozenset({"up", "down", "pull", "start", "stop", "restart", "rm", "create"}), "docker"),
+    InvalidationRule(("docker",), frozenset({"run", "rm", "rmi", "start", "stop", "restart", "kill", "pull", "create"}), "docker"),
+    InvalidationRule(("fail2ban-client",), frozenset({"set", "unban", "reload", "start", "stop", "restart"}), "fail2ban"),
+    InvalidationRule(("systemctl",), frozenset({"start", "stop", "restart", "reload", "kill"}), "ports"),
+    InvalidationRule(("ip",), frozenset({"add", "del", "delete", "set", "flush"}), "ifaces"),
+)
+
+
+class LeaderCancelled(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    invalidations: int = 0
+
+
+class ResultCache:
+    def __init__(self, rules: tuple[CacheRule, ...], invalidations: tuple[InvalidationRule, ...]) -> None:
+        self.rules = rules
+        self.invalidations = invalidations
+        self.stats = CacheStats()
+        self._entries: dict[tuple[str, ...], tuple[float, ExecResult]] = {}
+        self._inflight: dict[tuple[str, ...], asyncio.Future[ExecResult]] = {}
+        self._generations: dict[str, int] = {}
+
+    def rule_for(self, argv: Sequence[str]) -> CacheRule | None:
+        for rule in self.rules:
+            if tuple(argv[: len(rule.prefix)]) == rule.prefix:
+                return rule
+        return None
+
+    def invalidate(self, tag: str) -> None:
+        self._generations[tag] = self._generations.get(tag, 0) + 1
+        stale = [key for key in self._entries if (rule := self.rule_for(key)) and rule.tag == tag]
+        for key in stale:
+            self._entries.pop(key, None)
+        self.stats.invalidations += 1
+
+    def observe(self, argv: Sequence[str]) -> None:
+        tokens = set(argv)
+        for rule in self.invalidations:
+            if tuple(argv[: len(rule.program)]) != rule.program:
+                continue
+            if tokens & rule.verbs:
+                self.invalidate(rule.tag)
+                return
+
+    async def run(self, command: Sequence[str], timeout: int) -> ExecResult:
+        rule = self.rule_for(command)
+        if rule is None:
+            return await run_exec(command, timeout=timeout)
+        key = tuple(command)
+        cached = self._entries.get(key)
+        if cached and cached[0] > time.monotonic():
+            self.stats.hits += 1
+            return cached[1]
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except LeaderCancelled:
+                return await self.run(command, timeout)
+        self.stats.misses += 1
+        generation = self._generations.get(rule.tag, 0)
+        future: asyncio.Future[ExecResult] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await run_exec(command, timeout=timeout)
+        except asyncio.CancelledError:
+            future.set_exception(LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        now = time.monotonic()
+        for stale in [item for item, (expires, _) in self._entries.items() if expires <= now]:
+            self._entries.pop(stale, None)
+        if not result.timed_out and self._generations.get(rule.tag, 0) == generation:
+            self._entries[key] = (now + rule.ttl, result)
+        future.set_result(result)
+        return result
+
+
+EXEC_CACHE = ResultCache(CACHE_RULES, INVALIDATION_RULES)
+add_exec_listener(EXEC_CACHE.observe)
+
+
+async def run_exec_cached(command: Sequence[str], timeout: int) -> ExecResult:
+    return await EXEC_CACHE.run(command, timeout=timeout)
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+EVENT_LOG_PATH = Path("data") / "alerts.jsonl"
+EVENT_LOG_MAX_BYTES = 1024 * 1024
+EVENT_LOG_BACKUPS = 3
+FLAP_THRESHOLD = 3
+
+EVENT_ALARM = "alarm"
+EVENT_RECOVER = "recover"
+EVENT_EXPIRE = "expire"
+
+
+@dataclass(frozen=True, slots=True)
+class AlertEvent:
+    ts: float
+    key: str
+    event: str
+
+
+@dataclass(frozen=True, slots=True)
+class Incident:
+    key: str
+    started: float
+    ended: float | None
+    expired: bool = False
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.ended is None else self.ended - self.started
+
+
+@dataclass(frozen=True, slots=True)
+class KeyStats:
+    key: str
+    incidents: int
+    mttr: float | None
+    open: bool
+
+    @property
+    def flapping(self) -> bool:
+        return self.incidents >= FLAP_THRESHOLD
+
+
+@dataclass(frozen=True, slots=True)
+class EventSummary:
+    window: int
+    incidents: list[Incident]
+    keys: list[KeyStats]
+
+
+def build_incidents(events: Sequence[AlertEvent]) -> list[Incident]:
+    opened: dict[str, float] = {}
+    incidents: list[Incident] = []
+    for item in sorted(events, key=lambda event: event.ts):
+        if item.event == EVENT_ALARM:
+            opened.setdefault(item.key, item.ts)
+        elif item.event in {EVENT_RECOVER, EVENT_EXPIRE} and item.key in opened:
+            incidents.append(Incident(item.key, opened.pop(item.key), item.ts, item.event == EVENT_EXPIRE))
+    incidents.extend(Incident(key, started, None) for key, started in opened.items())
+    incidents.sort(key=lambda incident: incident.started, reverse=True)
+    return incidents
+
+
+def summarize(events: Sequence[AlertEvent], now: float, window: int = 86400) -> EventSummary:
+    since = now - window
+    incidents = [incident for incident in build_incidents(events) if incident.ended is None or incident.ended >= since]
+    grouped: dict[str, list[Incident]] = {}
+    for incident in incidents:
+        grouped.setdefault(incident.key, []).append(incident)
+    keys: list[KeyStats] = []
+    for key, items in grouped.items():
+        durations = [item.duration for item in items if item.duration is not None and not item.expired]
+        keys.append(
+            KeyStats(
+                key=key,
+                incidents=len(items),
+                mttr=sum(durations) / len(durations) if durations else None,
+                open=any(item.ended is None for item in items),
+            )
+        )
+    keys.sort(key=lambda stats: (-stats.incidents, stats.key))
+    return EventSummary(window=window, incidents=incidents, keys=keys)
+
+
+class AlertEventLog:
+    def __init__(
+        self,
+        path: Path = EVENT_LOG_PATH,
+        max_bytes: int = EVENT_LOG_MAX_BYTES,
+        backups: int = EVENT_LOG_BACKUPS,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._pending: list[AlertEvent] = []
+        self._writer: asyncio.Task | None = None
+
+    def record(self, key: str, event: str, ts: float | None = None) -> None:
+        self._pending.append(AlertEvent(time.time() if ts is None else ts, key, event))
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        while self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except OSError:
+                continue
+
+    async def flush(self) -> None:
+        writer = self._writer
+        if writer is not None:
+            await asyncio.gather(writer, return_exceptions=True)
+        if self._pending:
+            await self._drain()
+
+    def _files(self) -> list[Path]:
+        rotated = [self.path.with_name(f"{self.path.name}.{index}") for index in range(self.backups, 0, -1)]
+        return rotated + [self.path]
+
+    def _rotate(self) -> None:
+        for index in range(self.backups, 0, -1):
+            source = self.path if index == 1 else self.path.with_name(f"{self.path.name}.{index - 1}")
+            if source.exists():
+                source.replace(self.path.with_name(f"{self.path.name}.{index}"))
+
+    def _write(self, batch: Sequence[AlertEvent]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = "".join(
+            json.dumps({"ts": round(item.ts, 3), "key": item.key, "event": item.event}, ensure_ascii=False) + "\n"
+            for item in batch
+        ).encode("utf-8")
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(payload) > self.max_bytes:
+            self._rotate()
+        with self.path.open("ab") as handle:
+            handle.write(payload)
+
+    def _read(self, since: float) -> list[AlertEvent]:
+        events: list[AlertEvent] = []
+        for path in self._files():
+            try:
+                handle = path.open("r", encoding="utf-8")
+            except OSError:
+                continue
+            with handle:
+                for line in handle:
+                    try:
+                        data = json.loads(line)
+                        item = AlertEvent(float(data["ts"]), str(data["key"]), str(data["event"]))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    if item.ts >= since:
+                        events.append(item)
+        return events
+
+    async def expire_open(self, lookback: int = 7 * 86400) -> int:
+        await self.flush()
+        now = time.time()
+        events = await asyncio.to_thread(self._read, now - lookback)
+        keys = [incident.key for incident in build_incidents(events) if incident.ended is None]
+        for key in keys:
+            self.record(key, EVENT_EXPIRE, now)
+        await self.flush()
+        return len(keys)
+
+    async def summary(self, window: int = 86400, lookback: int = 7 * 86400) -> EventSummary:
+        await self.flush()
+        now = time.time()
+        events = await asyncio.to_thread(self._read, now - max(window, lookback))
+        return summarize(events, now, window)
+
+
+EVENT_LOG = AlertEventLog()
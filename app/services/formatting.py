@@ -1,6 +1,6 @@
 import html
 
-from app.services.shell import ExecResult
+from app.services.shell import ExecProgress, ExecResult, OutputCapture
 
 
 def clip_text(text: str, limit: int = 3200) -> str:
@@ -16,10 +16,20 @@ def pre(text: str, limit: int = 3200) -> str:
     return f"<pre>{html.escape(clip_text(text, limit=limit))}</pre>"
 
 
+def capture_text(capture: OutputCapture) -> str:
+    dropped = capture.dropped
+    if not dropped:
+        return capture.text()
+    head, tail = capture.parts()
+    if head and not head.endswith("\n"):
+        head += "\n"
+    return f"{head}... пропущено {human_bytes(dropped)} ...\n{tail}"
+
+
 def command_report(title: str, result: ExecResult, limit: int = 3000) -> str:
     status = "TIMEOUT" if result.timed_out else str(result.returncode)
-    payload = result.stdout.strip()
-    err = result.stderr.strip()
+    payload = capture_text(result.stdout_capture).strip()
+    err = capture_text(result.stderr_capture).strip()
     if err:
         if payload:
             payload = f"{payload}\n\nstderr:\n{err}"
@@ -28,9 +38,30 @@ def command_report(title: str, result: ExecResult, limit: int = 3000) -> str:
     if not payload:
         payload = "(пусто)"
     clipped = clip_text(payload, limit=limit)
+    elided = f" | <b>Пропущено:</b> {human_bytes(result.elided)}" if result.elided else ""
     return (
         f"<b>{html.escape(title)}</b>\n"
         f"<code>{html.escape(result.command)}</code>\n"
-        f"<b>Код:</b> {html.escape(status)} | <b>Время:</b> {result.duration:.2f} c\n"
+        f"<b>Код:</b> {html.escape(status)} | <b>Время:</b> {result.duration:.2f} c{elided}\n"
         f"<pre>{html.escape(clipped)}</pre>"
     )
+
+
+def human_bytes(value: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+
+def progress_report(title: str, progress: ExecProgress, limit: int = 2500) -> str:
+    tail = progress.tail.strip()
+    if len(tail) > limit:
+        tail = "...\n" + tail[-limit:].split("\n", 1)[-1]
+    return (
+        f"<b>{html.escape(title)}</b> ⏳\n"
+        f"<code>{html.escape(progress.command)}</code>\n"
+        f"<b>Прошло:</b> {progress.elapsed:.0f} c | <b>Получено:</b> {human_bytes(progress.received)}\n"
+        f"<pre>{html.escape(tail or '(ожидание вывода)')}</pre>"
+    )
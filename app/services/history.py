@@ -0,0 +1,323 @@
+import asyncio
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+from app.services.metrics import SAMPLER, MetricsSnapshot
+
+SERIES: tuple[str, ...] = ("cpu", "ram", "disk", "load1", "net_rx", "net_tx", "disk_read", "disk_write")
+PERCENT_SERIES = frozenset({"cpu", "ram", "disk"})
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+HISTORY_DIR = Path("data") / "metrics"
+MAGIC = b"SBMHIST1"
+HEADER = struct.Struct("<8sIIIII")
+CURSOR = struct.Struct("<II")
+CURSOR_OFFSET = HEADER.size - CURSOR.size
+HEADER_SIZE = 64
+RECORD = struct.Struct(f"<d{len(SERIES)}f")
+
+
+@dataclass(frozen=True, slots=True)
+class Resolution:
+    name: str
+    title: str
+    step: int
+    capacity: int
+
+
+RESOLUTIONS: tuple[Resolution, ...] = (
+    Resolution("10m", "10 мин", 1, 600),
+    Resolution("6h", "6 ч", 10, 2160),
+    Resolution("7d", "7 д", 60, 10080),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class HistoryView:
+    name: str
+    title: str
+    level: str
+    span: int
+
+
+VIEWS: tuple[HistoryView, ...] = (
+    HistoryView("10m", "10 мин", "10m", 600),
+    HistoryView("6h", "6 ч", "6h", 6 * 3600),
+    HistoryView("24h", "24 ч", "7d", 24 * 3600),
+    HistoryView("7d", "7 д", "7d", 7 * 86400),
+)
+VIEWS_BY_NAME = {view.name: view for view in VIEWS}
+
+
+class MappedRing:
+    __slots__ = ("resolution", "capacity", "path", "_map", "pos", "count")
+
+    def __init__(self, resolution: Resolution, path: Path | None = None) -> None:
+        self.resolution = resolution
+        self.capacity = resolution.capacity
+        self.path = path
+        self.pos = 0
+        self.count = 0
+        size = HEADER_SIZE + self.capacity * RECORD.size
+        self._map = self._open_file(path, size) if path is not None else None
+        if self._map is None:
+            self.path = None
+            self._map = mmap.mmap(-1, size)
+            self._reset()
+        elif not self._load_header():
+            self._reset()
+
+    @staticmethod
+    def _open_file(path: Path, size: int) -> mmap.mmap | None:
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            return None
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            return mmap.mmap(fd, size)
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+
+    def _load_header(self) -> bool:
+        magic, record_size, capacity, step, pos, count = HEADER.unpack_from(self._map, 0)
+        if (magic, record_size, capacity, step) != (MAGIC, RECORD.size, self.capacity, self.resolution.step):
+            return False
+        if pos >= capacity or count > capacity:
+            return False
+        self.pos = pos
+        self.count = count
+        return True
+
+    def _reset(self) -> None:
+        self.pos = 0
+        self.count = 0
+        HEADER.pack_into(self._map, 0, MAGIC, RECORD.size, self.capacity, self.resolution.step, 0, 0)
+
+    def append(self, ts: float, values: Sequence[float]) -> None:
+        RECORD.pack_into(self._map, HEADER_SIZE + self.pos * RECORD.size, ts, *values)
+        self.pos = (self.pos + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        CURSOR.pack_into(self._map, CURSOR_OFFSET, self.pos, self.count)
+
+    def _slice(self, index: int, size: int) -> list[tuple[float, ...]]:
+        offset = HEADER_SIZE + index * RECORD.size
+        return list(RECORD.iter_unpack(self._map[offset : offset + size * RECORD.size]))
+
+    def records(self, limit: int | None = None) -> list[tuple[float, ...]]:
+        size = self.count if limit is None else min(limit, self.count)
+        if size <= 0:
+            return []
+        start = (self.pos - size) % self.capacity
+        first = min(size, self.capacity - start)
+        rows = self._slice(start, first)
+        if first < size:
+            rows.extend(self._slice(0, size - first))
+        return rows
+
+    def close(self) -> None:
+        if self._map.closed:
+            return
+        if self.path is not None:
+            try:
+                self._map.flush()
+            except OSError:
+                pass
+        self._map.close()
+
+
+class HistoryLevel:
+    __slots__ = ("resolution", "ring", "_bucket", "_sums", "_samples")
+
+    def __init__(self, ring: MappedRing) -> None:
+        self.resolution = ring.resolution
+        self.ring = ring
+        self._bucket: int | None = None
+        self._sums = array("d", bytes(8 * len(SERIES)))
+        self._samples = 0
+
+    def _flush(self) -> None:
+        if not self._samples or self._bucket is None:
+            return
+        averages = [total / self._samples for total in self._sums]
+        self.ring.append(float(self._bucket * self.resolution.step), averages)
+        for index in range(len(SERIES)):
+            self._sums[index] = 0.0
+        self._samples = 0
+
+    def add(self, ts: float, values: Sequence[float]) -> None:
+        bucket = int(ts // self.resolution.step)
+        if self._bucket is not None and bucket != self._bucket:
+            self._flush()
+        self._bucket = bucket
+        for index, value in enumerate(values):
+            self._sums[index] += value
+        self._samples += 1
+        if self.resolution.step == 1:
+            self._flush()
+
+
+@dataclass(frozen=True, slots=True)
+class SeriesStats:
+    minimum: float
+    average: float
+    maximum: float
+    p95: float
+
+
+def snapshot_values(snapshot: MetricsSnapshot) -> tuple[float, ...]:
+    return (
+        snapshot.cpu,
+        snapshot.ram_percent,
+        snapshot.disk_percent,
+        snapshot.load1,
+        snapshot.net_rx,
+        snapshot.net_tx,
+        snapshot.disk_read,
+        snapshot.disk_write,
+    )
+
+
+def series_stats(values: Sequence[float]) -> SeriesStats | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return SeriesStats(
+        minimum=ordered[0],
+        average=sum(ordered) / len(ordered),
+        maximum=ordered[-1],
+        p95=ordered[int(0.95 * (len(ordered) - 1))],
+    )
+
+
+def sparkline(values: Sequence[float], width: int = 24, low: float | None = None, high: float | None = None) -> str:
+    if not values:
+        return ""
+    if len(values) > width:
+        step = len(values) / width
+        buckets: list[float] = []
+        for index in range(width):
+            chunk = values[int(index * step) : int((index + 1) * step)] or [values[int(index * step)]]
+            buckets.append(sum(chunk) / len(chunk))
+        values = buckets
+    low = min(values) if low is None else low
+    high = max(values) if high is None else high
+    span = high - low
+    if span <= 0:
+        return SPARK_CHARS[0] * len(values)
+    last = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[max(0, min(last, int((value - low) / span * last + 0.5)))] for value in values)
+
+
+class MetricsHistory:
+    def __init__(self, resolutions: tuple[Resolution, ...] = RESOLUTIONS) -> None:
+        self.resolutions = resolutions
+        self.directory: Path | None = None
+        self.levels = {resolution.name: HistoryLevel(MappedRing(resolution)) for resolution in resolutions}
+
+    def open(self, directory: Path = HISTORY_DIR) -> None:
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            return
+        levels = {
+            resolution.name: HistoryLevel(MappedRing(resolution, directory / f"{resolution.name}.ring"))
+            for resolution in self.resolutions
+        }
+        self.close()
+        self.directory = directory
+        self.levels = levels
+
+    def close(self) -> None:
+        for level in self.levels.values():
+            level.ring.close()
+
+    def record(self, ts: float, values: Sequence[float]) -> None:
+        for level in self.levels.values():
+            level.add(ts, values)
+
+    def window(self, view: HistoryView, now: float | None = None) -> list[tuple[float, ...]]:
+        history_level = self.levels.get(view.level)
+        if history_level is None:
+            return []
+        now = time.time() if now is None else now
+        limit = math.ceil(view.span / history_level.resolution.step)
+        cutoff = now - view.span
+        return [row for row in history_level.ring.records(limit) if row[0] >= cutoff]
+
+    def since(self, ts: float, level: str = "10m") -> list[tuple[float, ...]]:
+        history_level = self.levels.get(level)
+        if history_level is None:
+            return []
+        limit = max(1, math.ceil((time.time() - ts) / history_level.resolution.step) + 1)
+        return [row for row in history_level.ring.records(min(limit, history_level.ring.capacity)) if row[0] > ts]
+
+    async def run(self, interval: float = 1.0) -> None:
+        while True:
+            snapshot = SAMPLER.sample()
+            self.record(time.time(), snapshot_values(snapshot))
+            await asyncio.sleep(interval)
+
+
+HISTORY = MetricsHistory()
+
+
+def _format_value(series: str, value: float) -> str:
+    if series in PERCENT_SERIES:
+        return f"{value:.0f}%"
+    if series == "load1":
+        return f"{value:.2f}"
+    if value >= 1024**2:
+        return f"{value / 1024**2:.1f}M"
+    if value >= 1024:
+        return f"{value / 1024:.0f}K"
+    return f"{value:.0f}"
+
+
+SERIES_TITLES = {
+    "cpu": "CPU",
+    "ram": "RAM",
+    "disk": "Disk",
+    "load1": "Load",
+    "net_rx": "Net↓",
+    "net_tx": "Net↑",
+    "disk_read": "IO R",
+    "disk_write": "IO W",
+}
+
+
+def history_text(history: MetricsHistory, view_name: str) -> str:
+    view = VIEWS_BY_NAME.get(view_name)
+    if view is None:
+        return ""
+    rows = history.window(view)
+    if not rows:
+        return f"<b>История ({view.title}):</b> данных пока нет"
+    columns = list(zip(*rows))
+    lines: list[str] = []
+    for index, series in enumerate(SERIES, start=1):
+        values = columns[index]
+        stats = series_stats(values)
+        if stats is None:
+            continue
+        bounds = (0.0, 100.0) if series in PERCENT_SERIES else (None, None)
+        spark = sparkline(values, low=bounds[0], high=bounds[1])
+        lines.append(
+            f"{SERIES_TITLES[series]:<5}{spark}\n"
+            f"     min {_format_value(series, stats.minimum)} avg {_format_value(series, stats.average)} "
+            f"max {_format_value(series, stats.maximum)} p95 {_format_value(series, stats.p95)}"
+        )
+    body = "\n".join(lines)
+    return f"<b>История ({view.title}):</b>\n<pre>{body}</pre>"
@@ -0,0 +1,99 @@
+import asyncio
+import html
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+
+@dataclass(slots=True)
+class Job:
+    id: int
+    title: str
+    state: str
+    created_at: float
+    finished_at: float | None = None
+    result: str = ""
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.state == JOB_RUNNING
+
+    @property
+    def duration(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return end - self.created_at
+
+
+JobRunner = Callable[[Job], Awaitable[str]]
+JobCallback = Callable[[Job], Awaitable[None]]
+
+
+class JobManager:
+    def __init__(self, history: int = 30) -> None:
+        self.history = history
+        self._jobs: dict[int, Job] = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, title: str, runner: JobRunner, on_finish: JobCallback | None = None) -> Job:
+        job = Job(id=next(self._ids), title=title, state=JOB_RUNNING, created_at=time.time())
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, runner, on_finish))
+        self._prune()
+        return job
+
+    async def _run(self, job: Job, runner: JobRunner, on_finish: JobCallback | None) -> None:
+        try:
+            job.result = await runner(job)
+            job.state = JOB_DONE
+        except asyncio.CancelledError:
+            job.state = JOB_CANCELLED
+            job.result = f"<b>{html.escape(job.title)}</b>\nЗадача #{job.id} отменена."
+        except Exception as exc:
+            job.state = JOB_FAILED
+            job.result = f"<b>{html.escape(job.title)}</b>\nОшибка: <code>{html.escape(str(exc))}</code>"
+        finally:
+            job.finished_at = time.time()
+            job.task = None
+        if on_finish:
+            try:
+                await on_finish(job)
+            except Exception:
+                pass
+
+    def _prune(self) -> None:
+        finished = [job for job in self._jobs.values() if not job.active]
+        excess = len(finished) - self.history
+        if excess <= 0:
+            return
+        finished.sort(key=lambda item: item.id)
+        for job in finished[:excess]:
+            self._jobs.pop(job.id, None)
+
+    def get(self, job_id: int) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        return sorted(self._jobs.values(), key=lambda item: (not item.active, -item.id))
+
+    def cancel(self, job_id: int) -> bool:
+        job = self._jobs.get(job_id)
+        if not job or not job.active or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    async def shutdown(self) -> None:
+        tasks = [job.task for job in self._jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+JOBS = JobManager()
@@ -0,0 +1,266 @@
+import asyncio
+import html
+import json
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Sequence
+
+from app.services.shell import stream_lines
+
+CURSOR_PATH = Path("data") / "journal.cursor"
+CHECKPOINT_INTERVAL = 5.0
+PATTERN_COOLDOWN = 300.0
+RESTART_DELAY = 5.0
+MESSAGE_LIMIT = 500
+COUNTER_KEYS_LIMIT = 4096
+
+CURSOR_RE = re.compile(r'"__CURSOR"\s*:\s*"([^"]+)"')
+
+
+@dataclass(frozen=True, slots=True)
+class JournalPattern:
+    name: str
+    title: str
+    regex: str
+    threshold: int = 1
+    window: float = 0.0
+    source: str = ""
+
+
+JOURNAL_PATTERNS: tuple[JournalPattern, ...] = (
+    JournalPattern("oom", "OOM killer", r"Out of memory: Kill(?:ed)? process|invoked oom-killer|oom-kill:"),
+    JournalPattern("segfault", "Segfault", r"segfault at [0-9a-f]+|general protection fault|traps: \S+\[\d+\] trap"),
+    JournalPattern(
+        "disk_io",
+        "Ошибка дискового I/O",
+        r"I/O error, dev \S+|Buffer I/O error|blk_update_request: (?:critical|I/O)|EXT4-fs error|XFS \(\S+\): (?:metadata I/O error|Corruption)",
+    ),
+    JournalPattern(
+        "ssh_bruteforce",
+        "SSH перебор паролей",
+        r"Failed password for (?:invalid user )?\S+ from|Invalid user \S+ from|maximum authentication attempts exceeded",
+        threshold=10,
+        window=60.0,
+        source=r" from (\S+)",
+    ),
+)
+
+
+class PatternMatcher:
+    def __init__(self, patterns: Sequence[JournalPattern]) -> None:
+        self.patterns = {pattern.name: pattern for pattern in patterns}
+        combined = "|".join(f"(?P<{pattern.name}>{pattern.regex})" for pattern in patterns)
+        self._regex = re.compile(combined)
+        self._sources = {pattern.name: re.compile(pattern.source) for pattern in patterns if pattern.source}
+
+    def match(self, text: str) -> JournalPattern | None:
+        found = self._regex.search(text)
+        if found is None or found.lastgroup is None:
+            return None
+        return self.patterns[found.lastgroup]
+
+    def source(self, pattern: JournalPattern, text: str) -> str:
+        regex = self._sources.get(pattern.name)
+        found = regex.search(text) if regex is not None else None
+        return found.group(1) if found else ""
+
+
+class PatternLimiter:
+    def __init__(self, cooldown: float = PATTERN_COOLDOWN) -> None:
+        self.cooldown = cooldown
+        self._last: dict[str, float] = {}
+        self._suppressed: dict[str, int] = {}
+
+    def allow(self, name: str, now: float) -> int | None:
+        last = self._last.get(name)
+        if last is not None and now - last < self.cooldown:
+            self._suppressed[name] = self._suppressed.get(name, 0) + 1
+            return None
+        if last is None and len(self._last) >= COUNTER_KEYS_LIMIT:
+            for key, ts in list(self._last.items()):
+                if now - ts >= self.cooldown and key not in self._suppressed:
+                    del self._last[key]
+        self._last[name] = now
+        return self._suppressed.pop(name, 0)
+
+
+class PatternCounter:
+    def __init__(self, limit: int = COUNTER_KEYS_LIMIT) -> None:
+        self.limit = limit
+        self._hits: dict[tuple[str, str], deque[float]] = {}
+        self._windows: dict[str, float] = {}
+
+    def hit(self, pattern: JournalPattern, source: str, now: float) -> int:
+        if pattern.threshold <= 1:
+            return 1
+        key = (pattern.name, source)
+        hits = self._hits.get(key)
+        if hits is None:
+            self._windows[pattern.name] = pattern.window
+            if len(self._hits) >= self.limit:
+                self.prune(now)
+            if len(self._hits) >= self.limit:
+                del self._hits[next(iter(self._hits))]
+            hits = self._hits[key] = deque()
+        while hits and now - hits[0] > pattern.window:
+            hits.popleft()
+        hits.append(now)
+        if len(hits) < pattern.threshold:
+            return 0
+        del self._hits[key]
+        return pattern.threshold
+
+    def prune(self, now: float) -> None:
+        for key, hits in list(self._hits.items()):
+            if not hits or now - hits[-1] > self._windows.get(key[0], 0.0):
+                del self._hits[key]
+
+
+def parse_entry(line: str) -> dict | None:
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(entry, dict):
+        return None
+    message = entry.get("MESSAGE")
+    if isinstance(message, list):
+        entry["MESSAGE"] = bytes(item for item in message if isinstance(item, int) and 0 <= item < 256).decode(
+            "utf-8", errors="replace"
+        )
+    elif not isinstance(message, str):
+        return None
+    return entry
+
+
+def load_cursor(path: Path) -> str | None:
+    try:
+        value = path.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return value or None
+
+
+def save_cursor(path: Path, cursor: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(cursor, encoding="utf-8")
+    tmp.replace(path)
+
+
+def journal_command(cursor: str | None) -> list[str]:
+    command = ["journalctl", "-f", "-o", "json", "--no-pager"]
+    if cursor:
+        command.append(f"--after-cursor={cursor}")
+    else:
+        command.extend(["-n", "0"])
+    return command
+
+
+def journal_alert_text(pattern: JournalPattern, entry: dict, suppressed: int, count: int = 1, origin: str = "") -> str:
+    source = entry.get("SYSLOG_IDENTIFIER") or entry.get("_COMM") or "kernel"
+    message = entry["MESSAGE"].strip()
+    if len(message) > MESSAGE_LIMIT:
+        message = message[:MESSAGE_LIMIT] + "…"
+    text = f"🧾 Журнал: <b>{html.escape(pattern.title)}</b> ({html.escape(str(source))})\n<code>{html.escape(message)}</code>"
+    if count > 1:
+        text += f"\n{count} совпадений за {int(pattern.window)} с"
+        if origin:
+            text += f" от <code>{html.escape(origin)}</code>"
+    if suppressed:
+        text += f"\n+{suppressed} похожих за последние {int(PATTERN_COOLDOWN // 60)} мин"
+    return text
+
+
+LineSource = Callable[[Sequence[str]], AsyncIterator[str]]
+AlertSink = Callable[[str], Awaitable[None]]
+
+
+class JournalWatcher:
+    def __init__(
+        self,
+        sink: AlertSink,
+        patterns: Sequence[JournalPattern] = JOURNAL_PATTERNS,
+        cursor_path: Path = CURSOR_PATH,
+        source: LineSource = stream_lines,
+    ) -> None:
+        self.sink = sink
+        self.matcher = PatternMatcher(patterns)
+        self.limiter = PatternLimiter()
+        self.counter = PatternCounter()
+        self.cursor_path = cursor_path
+        self.source = source
+        self.matched = 0
+        self.lines = 0
+        self._last_line: str | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def checkpoint(self) -> None:
+        line, self._last_line = self._last_line, None
+        if line is None:
+            return
+        found = CURSOR_RE.search(line)
+        if found:
+            try:
+                save_cursor(self.cursor_path, found.group(1))
+            except OSError:
+                pass
+
+    async def _checkpoint_loop(self) -> None:
+        while True:
+            await asyncio.sleep(CHECKPOINT_INTERVAL)
+            self.checkpoint()
+
+    async def handle_line(self, line: str) -> None:
+        self.lines += 1
+        self._last_line = line
+        if self.matcher.match(line) is not None:
+            entry = parse_entry(line)
+            pattern = self.matcher.match(entry["MESSAGE"]) if entry else None
+            if pattern is not None:
+                self.matched += 1
+                now = time.monotonic()
+                origin = self.matcher.source(pattern, entry["MESSAGE"])
+                count = self.counter.hit(pattern, origin, now)
+                limit_key = f"{pattern.name}:{origin}" if pattern.source else pattern.name
+                suppressed = self.limiter.allow(limit_key, now) if count else None
+                if suppressed is not None:
+                    try:
+                        await self.sink(journal_alert_text(pattern, entry, suppressed, count, origin))
+                    except Exception:
+                        pass
+                    self.checkpoint()
+
+    async def run(self) -> None:
+        ticker = asyncio.create_task(self._checkpoint_loop())
+        try:
+            while True:
+                command = journal_command(load_cursor(self.cursor_path))
+                try:
+                    async for line in self.source(command):
+                        await self.handle_line(line)
+                except (OSError, ValueError):
+                    pass
+                self.checkpoint()
+                await asyncio.sleep(RESTART_DELAY)
+        finally:
+            ticker.cancel()
+            await asyncio.gather(ticker, return_exceptions=True)
+            self.checkpoint()
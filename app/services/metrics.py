@@ -1,7 +1,51 @@
+import os
+import time
+from dataclasses import dataclass
 from datetime import datetime
 
 import psutil
 
+DETAIL_VIEW = "detail"
+SKIP_DISK_PREFIXES = ("loop", "ram")
+SKIP_NICS = frozenset({"lo"})
+DEVICE_ROWS = 8
+
+
+@dataclass(frozen=True, slots=True)
+class DiskRate:
+    name: str
+    read: float
+    write: float
+    iops: float
+
+
+@dataclass(frozen=True, slots=True)
+class NicRate:
+    name: str
+    rx: float
+    tx: float
+
+
+@dataclass(frozen=True, slots=True)
+class MetricsSnapshot:
+    taken_at: datetime
+    cpu: float
+    ram_percent: float
+    ram_used: int
+    ram_total: int
+    disk_percent: float
+    disk_used: int
+    disk_total: int
+    uptime: int
+    load1: float
+    net_rx: float
+    net_tx: float
+    disk_read: float
+    disk_write: float
+    cores: tuple[float, ...] = ()
+    disks: tuple[DiskRate, ...] = ()
+    nics: tuple[NicRate, ...] = ()
+
 
 def _human_uptime(seconds: int) -> str:
     days, rem = divmod(seconds, 86400)
@@ -12,16 +56,166 @@ def _human_uptime(seconds: int) -> str:
     return f"{hours:02}:{minutes:02}:{secs:02}"
 
 
-def system_metrics_text() -> str:
-    cpu = psutil.cpu_percent(interval=None)
-    mem = psutil.virtual_memory()
-    disk = psutil.disk_usage("/")
-    uptime_seconds = int(datetime.now().timestamp() - psutil.boot_time())
+def _human_rate(value: float) -> str:
+    if value >= 1024**2:
+        return f"{value / 1024**2:.1f} MB/s"
+    if value >= 1024:
+        return f"{value / 1024:.1f} KB/s"
+    return f"{value:.0f} B/s"
+
+
+class MetricsSampler:
+    def __init__(self) -> None:
+        self._prev_at: float | None = None
+        self._prev_net: tuple[int, int] = (0, 0)
+        self._prev_disk: tuple[int, int] = (0, 0)
+        self._prev_cores: list[tuple[float, float]] = []
+        self._prev_disks: dict[str, tuple[int, int, int]] = {}
+        self._prev_nics: dict[str, tuple[int, int]] = {}
+        self._latest: MetricsSnapshot | None = None
+        self._latest_at = 0.0
+
+    def _io_totals(self) -> tuple[tuple[int, int], tuple[int, int]]:
+        net = psutil.net_io_counters()
+        disk = psutil.disk_io_counters()
+        net_totals = (net.bytes_recv, net.bytes_sent) if net else (0, 0)
+        disk_totals = (disk.read_bytes, disk.write_bytes) if disk else (0, 0)
+        return net_totals, disk_totals
+
+    def _core_usage(self) -> tuple[float, ...]:
+        current: list[tuple[float, float]] = []
+        for times in psutil.cpu_times(percpu=True):
+            total = sum(times) - getattr(times, "guest", 0.0) - getattr(times, "guest_nice", 0.0)
+            idle = times.idle + getattr(times, "iowait", 0.0)
+            current.append((total, idle))
+        usage: list[float] = []
+        if len(self._prev_cores) == len(current):
+            for (total, idle), (prev_total, prev_idle) in zip(current, self._prev_cores):
+                delta = total - prev_total
+                busy = delta - (idle - prev_idle)
+                usage.append(max(0.0, min(100.0, busy / delta * 100)) if delta > 0 else 0.0)
+        self._prev_cores = current
+        return tuple(usage)
+
+    def _disk_rates(self, elapsed: float | None) -> tuple[DiskRate, ...]:
+        counters = psutil.disk_io_counters(perdisk=True) or {}
+        current: dict[str, tuple[int, int, int]] = {}
+        rates: list[DiskRate] = []
+        for name, item in counters.items():
+            if name.startswith(SKIP_DISK_PREFIXES):
+                continue
+            current[name] = (item.read_bytes, item.write_bytes, item.read_count + item.write_count)
+            previous = self._prev_disks.get(name)
+            if elapsed and previous:
+                read, write, ops = (max(0.0, (cur - prev) / elapsed) for cur, prev in zip(current[name], previous))
+                rates.append(DiskRate(name, read, write, ops))
+        self._prev_disks = current
+        rates.sort(key=lambda item: (-(item.read + item.write), item.name))
+        return tuple(rates[:DEVICE_ROWS])
+
+    def _nic_rates(self, elapsed: float | None) -> tuple[NicRate, ...]:
+        counters = psutil.net_io_counters(pernic=True) or {}
+        current: dict[str, tuple[int, int]] = {}
+        rates: list[NicRate] = []
+        for name, item in counters.items():
+            if name in SKIP_NICS:
+                continue
+            current[name] = (item.bytes_recv, item.bytes_sent)
+            previous = self._prev_nics.get(name)
+            if elapsed and previous:
+                rx, tx = (max(0.0, (cur - prev) / elapsed) for cur, prev in zip(current[name], previous))
+                rates.append(NicRate(name, rx, tx))
+        self._prev_nics = current
+        rates.sort(key=lambda item: (-(item.rx + item.tx), item.name))
+        return tuple(rates[:DEVICE_ROWS])
+
+    def sample(self) -> MetricsSnapshot:
+        now = datetime.now()
+        mono = time.monotonic()
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage("/")
+        net_totals, disk_totals = self._io_totals()
+        rates = [0.0, 0.0, 0.0, 0.0]
+        elapsed = mono - self._prev_at if self._prev_at is not None and mono > self._prev_at else None
+        if elapsed:
+            current = net_totals + disk_totals
+            previous = self._prev_net + self._prev_disk
+            rates = [max(0.0, (cur - prev) / elapsed) for cur, prev in zip(current, previous)]
+        self._prev_at = mono
+        self._prev_net = net_totals
+        self._prev_disk = disk_totals
+        snapshot = MetricsSnapshot(
+            taken_at=now,
+            cpu=psutil.cpu_percent(interval=None),
+            ram_percent=mem.percent,
+            ram_used=mem.used,
+            ram_total=mem.total,
+            disk_percent=disk.percent,
+            disk_used=disk.used,
+            disk_total=disk.total,
+            uptime=int(now.timestamp() - psutil.boot_time()),
+            load1=os.getloadavg()[0],
+            net_rx=rates[0],
+            net_tx=rates[1],
+            disk_read=rates[2],
+            disk_write=rates[3],
+            cores=self._core_usage(),
+            disks=self._disk_rates(elapsed),
+            nics=self._nic_rates(elapsed),
+        )
+        self._latest = snapshot
+        self._latest_at = mono
+        return snapshot
+
+    def latest(self, max_age: float) -> MetricsSnapshot:
+        if self._latest is None or time.monotonic() - self._latest_at > max_age:
+            return self.sample()
+        return self._latest
+
+
+SAMPLER = MetricsSampler()
+
+
+def render_metrics(snapshot: MetricsSnapshot) -> str:
     return (
         "<b>Системные метрики</b>\n"
-        f"<b>CPU:</b> {cpu:.1f}%\n"
-        f"<b>RAM:</b> {mem.percent:.1f}% ({mem.used / 1024**3:.2f} / {mem.total / 1024**3:.2f} GB)\n"
-        f"<b>Disk /:</b> {disk.percent:.1f}% ({disk.used / 1024**3:.2f} / {disk.total / 1024**3:.2f} GB)\n"
-        f"<b>Uptime:</b> {_human_uptime(uptime_seconds)}\n"
-        f"<b>Обновлено:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        f"<b>CPU:</b> {snapshot.cpu:.1f}% | <b>Load:</b> {snapshot.load1:.2f}\n"
+        f"<b>RAM:</b> {snapshot.ram_percent:.1f}% ({snapshot.ram_used / 1024**3:.2f} / {snapshot.ram_total / 1024**3:.2f} GB)\n"
+        f"<b>Disk /:</b> {snapshot.disk_percent:.1f}% ({snapshot.disk_used / 1024**3:.2f} / {snapshot.disk_total / 1024**3:.2f} GB)\n"
+        f"<b>Net:</b> ↓ {_human_rate(snapshot.net_rx)} ↑ {_human_rate(snapshot.net_tx)}\n"
+        f"<b>Disk I/O:</b> R {_human_rate(snapshot.disk_read)} W {_human_rate(snapshot.disk_write)}\n"
+        f"<b>Uptime:</b> {_human_uptime(snapshot.uptime)}\n"
+        f"<b>Обновлено:</b> {snapshot.taken_at.strftime('%Y-%m-%d %H:%M:%S')}"
     )
+
+
+def _short_rate(value: float) -> str:
+    if value >= 1024**2:
+        return f"{value / 1024**2:.1f}M"
+    if value >= 1024:
+        return f"{value / 1024:.0f}K"
+    return f"{value:.0f}"
+
+
+def render_details(snapshot: MetricsSnapshot) -> str:
+    sections: list[str] = []
+    if snapshot.cores:
+        cells = [f"{index:>2}:{value:>3.0f}%" for index, value in enumerate(snapshot.cores)]
+        rows = ["  ".join(cells[start : start + 4]) for start in range(0, len(cells), 4)]
+        body = "\n".join(rows)
+        sections.append(f"<b>Ядра CPU</b> (макс. {max(snapshot.cores):.0f}%)\n<pre>{body}</pre>")
+    if snapshot.disks:
+        rows = [f"{'disk':<10}{'R/s':>7}{'W/s':>7}{'IOPS':>7}"]
+        for item in snapshot.disks:
+            rows.append(f"{item.name[:10]:<10}{_short_rate(item.read):>7}{_short_rate(item.write):>7}{item.iops:>7.0f}")
+        body = "\n".join(rows)
+        sections.append(f"<b>Диски</b>\n<pre>{body}</pre>")
+    if snapshot.nics:
+        rows = [f"{'nic':<10}{'RX/s':>8}{'TX/s':>8}"]
+        for item in snapshot.nics:
+            rows.append(f"{item.name[:10]:<10}{_short_rate(item.rx):>8}{_short_rate(item.tx):>8}")
+        body = "\n".join(rows)
+        sections.append(f"<b>Сеть</b>\n<pre>{body}</pre>")
+    if not sections:
+        return "<b>Детали:</b> данных пока нет"
+    return "\n".join(sections)
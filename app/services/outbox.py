@@ -0,0 +1,241 @@
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+PRIORITY_ALERT = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_PROGRESS = 2
+PRIORITY_METRICS = 3
+
+KIND_SEND = "send"
+KIND_EDIT = "edit"
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+@dataclass(slots=True)
+class OutboundItem:
+    kind: str
+    chat_id: int
+    message_id: int | None
+    text: str
+    reply_markup: Any
+    priority: int
+    seq: int
+    waiters: list[asyncio.Future] = field(default_factory=list)
+
+    @property
+    def key(self) -> tuple[int, int] | None:
+        if self.kind == KIND_EDIT and self.message_id is not None:
+            return (self.chat_id, self.message_id)
+        return None
+
+
+class Outbox:
+    def __init__(self, chat_rate: float = 1.0, chat_burst: float = 3.0, global_rate: float = 25.0, concurrency: int = 4) -> None:
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.concurrency = concurrency
+        self.bot: Bot | None = None
+        self.sent = 0
+        self.coalesced = 0
+        self.retries = 0
+        self._global = TokenBucket(global_rate, global_rate)
+        self._buckets: dict[int, TokenBucket] = {}
+        self._blocked: dict[int, float] = {}
+        self._queue: list[OutboundItem] = []
+        self._edits: dict[tuple[int, int], OutboundItem] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._slots: asyncio.Semaphore | None = None
+        self._worker: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    def start(self, bot: Bot) -> None:
+        self.bot = bot
+        if self._worker is None or self._worker.done():
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        worker, self._worker = self._worker, None
+        if worker:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        for item in self._queue:
+            for waiter in item.waiters:
+                if not waiter.done():
+                    waiter.cancel()
+        self._queue.clear()
+        self._edits.clear()
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    async def send(self, chat_id: int, text: str, reply_markup: Any = None, priority: int = PRIORITY_INTERACTIVE) -> Any:
+        item = OutboundItem(KIND_SEND, chat_id, None, text, reply_markup, priority, next(self._seq))
+        return await self._enqueue(item)
+
+    async def edit(
+        self,
+        chat_id: int,
+        message_id: int,
+        text: str,
+        reply_markup: Any = None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Any:
+        pending = self._edits.get((chat_id, message_id))
+        if pending is not None:
+            pending.text = text
+            pending.reply_markup = reply_markup
+            pending.priority = min(pending.priority, priority)
+            self.coalesced += 1
+            waiter = asyncio.get_running_loop().create_future()
+            pending.waiters.append(waiter)
+            self._wakeup.set()
+            return await waiter
+        item = OutboundItem(KIND_EDIT, chat_id, message_id, text, reply_markup, priority, next(self._seq))
+        return await self._enqueue(item)
+
+    async def _enqueue(self, item: OutboundItem) -> Any:
+        if self.bot is None:
+            raise RuntimeError("Outbox is not started")
+        if self._worker is None or self._worker.done():
+            self.start(self.bot)
+        waiter = asyncio.get_running_loop().create_future()
+        item.waiters.append(waiter)
+        self._push(item)
+        return await waiter
+
+    def _push(self, item: OutboundItem) -> None:
+        key = item.key
+        if key is not None:
+            newer = self._edits.get(key)
+            if newer is not None:
+                newer.waiters.extend(item.waiters)
+                newer.priority = min(newer.priority, item.priority)
+                return
+            self._edits[key] = item
+        self._queue.append(item)
+        self._wakeup.set()
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._buckets[chat_id] = bucket
+        return bucket
+
+    def _pick(self, now: float) -> tuple[OutboundItem | None, float]:
+        global_wait = self._global.wait_time(now)
+        best_wait = float("inf")
+        for item in sorted(self._queue, key=lambda entry: (entry.priority, entry.seq)):
+            wait = max(
+                global_wait,
+                self._bucket(item.chat_id).wait_time(now),
+                self._blocked.get(item.chat_id, 0.0) - now,
+            )
+            if wait <= 0:
+                return item, 0.0
+            best_wait = min(best_wait, wait)
+        return None, best_wait
+
+    async def _run(self) -> None:
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            item, wait = self._pick(now)
+            if item is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._slots.acquire()
+            self._queue.remove(item)
+            if item.key is not None and self._edits.get(item.key) is item:
+                self._edits.pop(item.key, None)
+            now = time.monotonic()
+            self._global.take(now)
+            self._bucket(item.chat_id).take(now)
+            task = asyncio.create_task(self._deliver(item))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _deliver(self, item: OutboundItem) -> None:
+        try:
+            if item.kind == KIND_EDIT:
+                result = await self.bot.edit_message_text(
+                    chat_id=item.chat_id,
+                    message_id=item.message_id,
+                    text=item.text,
+                    reply_markup=item.reply_markup,
+                )
+            else:
+                result = await self.bot.send_message(chat_id=item.chat_id, text=item.text, reply_markup=item.reply_markup)
+        except TelegramRetryAfter as exc:
+            self.retries += 1
+            self._blocked[item.chat_id] = time.monotonic() + float(exc.retry_after)
+            self._push(item)
+            return
+        except TelegramBadRequest as exc:
+            if "message is not modified" in str(exc).lower():
+                self._resolve(item, None)
+            else:
+                self._fail(item, exc)
+            return
+        except Exception as exc:
+            self._fail(item, exc)
+            return
+        finally:
+            self._slots.release()
+            self._wakeup.set()
+        self.sent += 1
+        self._resolve(item, result)
+
+    def _resolve(self, item: OutboundItem, result: Any) -> None:
+        for waiter in item.waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    def _fail(self, item: OutboundItem, exc: Exception) -> None:
+        for waiter in item.waiters:
+            if not waiter.done():
+                waiter.set_exception(exc)
+
+
+OUTBOX = Outbox()
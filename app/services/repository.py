@@ -0,0 +1,402 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import stat
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from itertools import repeat
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from app.services.backups import (
+    BACKUP_DIR,
+    ENTRY_DIR,
+    ENTRY_FILE,
+    ENTRY_LINK,
+    ENTRY_SPECIAL,
+    backup_stem,
+    default_workers,
+    entry_signature,
+    make_special,
+    run_cancellable,
+    walk_tree,
+)
+from app.services.shell import PRIORITY_BACKUP, SCHEDULER
+
+REPOSITORY_DIR = BACKUP_DIR / "repo"
+SNAPSHOT_ID_RE = re.compile(r"^[a-zA-Z0-9_.-]+$")
+
+CHUNK_MIN = 64 * 1024
+CHUNK_AVG = 256 * 1024
+CHUNK_MAX = 1024 * 1024
+CHUNK_LEVEL = 3
+READ_SIZE = 4 * 1024 * 1024
+HASH_MASK = (1 << 64) - 1
+MASK_STRICT = ((1 << 20) - 1) << 44
+MASK_LOOSE = ((1 << 16) - 1) << 48
+GEAR: tuple[int, ...] = tuple(
+    int.from_bytes(hashlib.sha256(bytes([value])).digest()[:8], "little") for value in range(256)
+)
+
+
+def cut_point(data: bytearray, start: int, end: int) -> int:
+    size = end - start
+    if size <= CHUNK_MIN:
+        return end
+    normal = start + min(CHUNK_AVG, size)
+    limit = start + min(CHUNK_MAX, size)
+    gear = GEAR
+    fingerprint = 0
+    index = start + CHUNK_MIN
+    while index < normal:
+        fingerprint = ((fingerprint << 1) + gear[data[index]]) & HASH_MASK
+        index += 1
+        if not fingerprint & MASK_STRICT:
+            return index
+    while index < limit:
+        fingerprint = ((fingerprint << 1) + gear[data[index]]) & HASH_MASK
+        index += 1
+        if not fingerprint & MASK_LOOSE:
+            return index
+    return limit
+
+
+def iter_chunks(handle: BinaryIO) -> Iterator[bytes]:
+    buffer = bytearray()
+    position = 0
+    eof = False
+    while True:
+        while not eof and len(buffer) - position < CHUNK_MAX:
+            data = handle.read(READ_SIZE)
+            if not data:
+                eof = True
+                break
+            if position:
+                del buffer[:position]
+                position = 0
+            buffer += data
+        if position >= len(buffer):
+            return
+        end = len(buffer) if eof else position + CHUNK_MAX
+        cut = cut_point(buffer, position, end)
+        yield bytes(buffer[position:cut])
+        position = cut
+
+
+def chunk_path(chunks_dir: Path, digest: str) -> Path:
+    return chunks_dir / digest[:2] / digest
+
+
+def store_chunk(chunks_dir: Path, digest: str, data: bytes) -> int:
+    path = chunk_path(chunks_dir, digest)
+    if path.exists():
+        return 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = zlib.compress(data, CHUNK_LEVEL)
+    tmp = path.with_name(f"{digest}.{os.getpid()}.tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
+    return len(payload)
+
+
+def load_chunk(chunks_dir: Path, digest: str) -> bytes:
+    data = zlib.decompress(chunk_path(chunks_dir, digest).read_bytes())
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise RuntimeError(f"Чанк {digest[:12]} поврежден")
+    return data
+
+
+def chunk_file(path: str, chunks_dir: str) -> tuple[list[str], int, int, int] | None:
+    directory = Path(chunks_dir)
+    digests: list[str] = []
+    size = 0
+    new_chunks = 0
+    new_bytes = 0
+    try:
+        with open(path, "rb") as handle:
+            for chunk in iter_chunks(handle):
+                digest = hashlib.sha256(chunk).hexdigest()
+                stored = store_chunk(directory, digest, chunk)
+                if stored:
+                    new_chunks += 1
+                    new_bytes += stored
+                digests.append(digest)
+                size += len(chunk)
+    except OSError:
+        return None
+    return digests, size, new_chunks, new_bytes
+
+
+@dataclass(frozen=True, slots=True)
+class SnapshotInfo:
+    id: str
+    source: str
+    created: float
+    files: int
+    size: int
+    chunks: int
+    new_chunks: int
+    new_bytes: int
+
+
+@dataclass(frozen=True, slots=True)
+class GcResult:
+    removed: int
+    freed: int
+    kept: int
+
+
+class ChunkRepository:
+    def __init__(self, root: Path = REPOSITORY_DIR) -> None:
+        self.root = root
+        self.chunks = root / "chunks"
+        self.snapshots = root / "snapshots"
+        self._lock = asyncio.Lock()
+
+    def _ensure(self) -> None:
+        self.chunks.mkdir(parents=True, exist_ok=True)
+        self.snapshots.mkdir(parents=True, exist_ok=True)
+
+    def _meta_path(self, snapshot_id: str) -> Path:
+        return self.snapshots / f"{snapshot_id}.json"
+
+    def _index_path(self, snapshot_id: str) -> Path:
+        return self.snapshots / f"{snapshot_id}.index.gz"
+
+    def resolve(self, snapshot_id: str) -> str | None:
+        clean = snapshot_id.strip()
+        if not SNAPSHOT_ID_RE.fullmatch(clean) or not self._meta_path(clean).is_file():
+            return None
+        return clean
+
+    def list_snapshots(self, limit: int | None = 20) -> list[SnapshotInfo]:
+        items: list[SnapshotInfo] = []
+        if not self.snapshots.is_dir():
+            return items
+        for path in self.snapshots.glob("*.json"):
+            try:
+                items.append(SnapshotInfo(**json.loads(path.read_text(encoding="utf-8"))))
+            except (OSError, ValueError, TypeError):
+                continue
+        items.sort(key=lambda item: item.created, reverse=True)
+        return items[:limit]
+
+    def _load_index(self, snapshot_id: str) -> dict:
+        with gzip.open(self._index_path(snapshot_id), "rt", encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def _new_id(self, source: Path) -> str:
+        stem = backup_stem(source)
+        snapshot_id = stem
+        counter = 1
+        while self._meta_path(snapshot_id).exists() or self._index_path(snapshot_id).exists():
+            counter += 1
+            snapshot_id = f"{stem}-{counter}"
+        return snapshot_id
+
+    def _previous_entries(self, source: Path) -> dict[str, list]:
+        for info in self.list_snapshots(limit=None):
+            if info.source != str(source):
+                continue
+            try:
+                index = self._load_index(info.id)
+            except (OSError, ValueError, EOFError):
+                continue
+            return {item[0]: item for item in index["entries"] if item[1] == ENTRY_FILE and len(item) > 6}
+        return {}
+
+    def _snapshot(self, source: Path, workers: int, stop: threading.Event) -> SnapshotInfo:
+        self._ensure()
+        snapshot_id = self._new_id(source)
+        previous = self._previous_entries(source)
+        entries: list[list | None] = []
+        files: list[tuple[int, str]] = []
+        total_chunks = 0
+        size = 0
+        stored = 0
+        for rel, entry in walk_tree(source):
+            if stop.is_set():
+                raise RuntimeError("Снимок отменен")
+            signature = entry_signature(entry)
+            if signature is None:
+                continue
+            kind, info, target = signature
+            item = [
+                rel,
+                kind,
+                stat.S_IMODE(info.st_mode),
+                info.st_mtime_ns,
+                info.st_size,
+                target or None,
+                info.st_ino,
+                info.st_uid,
+                info.st_gid,
+            ]
+            if kind == ENTRY_FILE:
+                old = previous.get(rel)
+                if old is not None and (old[3], old[4], old[6]) == (info.st_mtime_ns, info.st_size, info.st_ino):
+                    item[5] = old[5]
+                    total_chunks += len(old[5])
+                    size += info.st_size
+                    stored += 1
+                else:
+                    files.append((len(entries), entry.path))
+            entries.append(item)
+        paths = [path for _, path in files]
+        chunks_dir = str(self.chunks)
+        pool: ProcessPoolExecutor | None = None
+        if workers > 1 and len(paths) > 1:
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            results = pool.map(chunk_file, paths, repeat(chunks_dir), chunksize=16)
+        else:
+            results = map(chunk_file, paths, repeat(chunks_dir))
+        new_chunks = 0
+        new_bytes = 0
+        try:
+            for (index, _), result in zip(files, results):
+                if stop.is_set():
+                    raise RuntimeError("Снимок отменен")
+                if result is None:
+                    entries[index] = None
+                    continue
+                digests, file_size, created_chunks, created_bytes = result
+                entries[index][4] = file_size
+                entries[index][5] = digests
+                total_chunks += len(digests)
+                new_chunks += created_chunks
+                new_bytes += created_bytes
+                size += file_size
+                stored += 1
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+        info = SnapshotInfo(
+            id=snapshot_id,
+            source=str(source),
+            created=time.time(),
+            files=stored,
+            size=size,
+            chunks=total_chunks,
+            new_chunks=new_chunks,
+            new_bytes=new_bytes,
+        )
+        root = source.name if source.name else "rootfs"
+        index_tmp = self._index_path(snapshot_id).with_suffix(".tmp")
+        with gzip.open(index_tmp, "wt", encoding="utf-8") as handle:
+            json.dump(
+                {"id": snapshot_id, "root": root, "entries": [item for item in entries if item is not None]},
+                handle,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        index_tmp.replace(self._index_path(snapshot_id))
+        meta_tmp = self._meta_path(snapshot_id).with_suffix(".tmp")
+        meta_tmp.write_text(json.dumps(asdict(info)), encoding="utf-8")
+        meta_tmp.replace(self._meta_path(snapshot_id))
+        return info
+
+    async def snapshot(self, source: Path, workers: int = 0) -> SnapshotInfo:
+        workers = workers or default_workers()
+        async with self._lock, SCHEDULER.slot(PRIORITY_BACKUP, f"snapshot {source}"):
+            return await run_cancellable(lambda stop: self._snapshot(source, workers, stop))
+
+    def _restore(self, snapshot_id: str, target: Path) -> int:
+        index = self._load_index(snapshot_id)
+        base = target / index["root"]
+        target.mkdir(parents=True, exist_ok=True)
+        target_resolved = target.resolve()
+        base.mkdir(parents=True, exist_ok=True)
+        directories: list[tuple[Path, int, int, list]] = []
+        chown = os.geteuid() == 0
+        count = 0
+        for rel, kind, mode, mtime_ns, _, data, *extra in index["entries"]:
+            path = base / rel
+            owner = extra[1:3] if chown else []
+            if not path.parent.resolve().is_relative_to(target_resolved) or ".." in Path(rel).parts:
+                raise RuntimeError("Снимок содержит небезопасный путь")
+            if kind == ENTRY_DIR:
+                path.mkdir(parents=True, exist_ok=True)
+                directories.append((path, mode, mtime_ns, owner))
+            elif kind == ENTRY_LINK:
+                if path.is_symlink() or path.exists():
+                    path.unlink()
+                os.symlink(data, path)
+                if owner:
+                    os.lchown(path, *owner)
+            elif kind == ENTRY_SPECIAL:
+                if path.is_symlink() or path.exists():
+                    path.unlink()
+                make_special(path, data, mode)
+                if owner:
+                    os.lchown(path, *owner)
+                os.chmod(path, mode)
+                os.utime(path, ns=(mtime_ns, mtime_ns))
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with path.open("wb") as handle:
+                    for digest in data:
+                        handle.write(load_chunk(self.chunks, digest))
+                if owner:
+                    os.lchown(path, *owner)
+                os.chmod(path, mode)
+                os.utime(path, ns=(mtime_ns, mtime_ns))
+            count += 1
+        for path, mode, mtime_ns, owner in reversed(directories):
+            if owner:
+                os.lchown(path, *owner)
+            os.chmod(path, mode)
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return count
+
+    async def restore(self, snapshot_id: str, target: Path) -> int:
+        async with SCHEDULER.slot(PRIORITY_BACKUP, f"restore snapshot {snapshot_id}"):
+            return await asyncio.to_thread(self._restore, snapshot_id, target)
+
+    async def delete(self, snapshot_id: str) -> bool:
+        async with self._lock:
+            if self.resolve(snapshot_id) is None:
+                return False
+            self._meta_path(snapshot_id).unlink(missing_ok=True)
+            self._index_path(snapshot_id).unlink(missing_ok=True)
+            return True
+
+    def _gc(self) -> GcResult:
+        self._ensure()
+        live: set[str] = set()
+        for path in self.snapshots.glob("*.index.gz"):
+            index = self._load_index(path.name[: -len(".index.gz")])
+            for _, kind, _, _, _, data, *_ in index["entries"]:
+                if kind == ENTRY_FILE:
+                    live.update(data)
+        removed = 0
+        freed = 0
+        kept = 0
+        for bucket in os.scandir(self.chunks):
+            if not bucket.is_dir(follow_symlinks=False):
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name in live:
+                    kept += 1
+                    continue
+                try:
+                    size = entry.stat(follow_symlinks=False).st_size
+                    os.unlink(entry.path)
+                except OSError:
+                    continue
+                removed += 1
+                freed += size
+        return GcResult(removed=removed, freed=freed, kept=kept)
+
+    async def gc(self) -> GcResult:
+        async with self._lock, SCHEDULER.slot(PRIORITY_BACKUP, "repository gc"):
+            return await asyncio.to_thread(self._gc)
+
+
+REPOSITORY = ChunkRepository()
@@ -0,0 +1,217 @@
+import operator
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+import psutil
+
+from app.services.formatting import human_bytes
+from app.services.metrics import MetricsSnapshot
+
+MAX_RULES = 200
+
+RULE_RE = re.compile(
+    r"^(?P<metric>[a-z][a-z0-9]*)(?::(?P<arg>[^\s<>=]+))?(?:\s+(?P<field>[a-z]+))?\s*(?P<op>>=|<=|>|<)\s*(?P<rhs>.+)$"
+)
+NUMBER_RE = re.compile(r"^(?P<number>\d+(?:\.\d+)?)\s*(?P<suffix>[kmgt]?)(?:i?b)?%?$")
+PROC_NAME_RE = re.compile(r"^[a-zA-Z0-9_.@+-]{1,64}$")
+
+SUFFIXES = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+OPERATORS: dict[str, Callable[[float, float], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+UNIT_PERCENT = "%"
+UNIT_BYTES = "B"
+UNIT_PLAIN = ""
+
+SIMPLE_METRICS = {
+    "cpu": UNIT_PERCENT,
+    "ram": UNIT_PERCENT,
+    "swap": UNIT_PERCENT,
+    "load1": UNIT_PLAIN,
+    "load5": UNIT_PLAIN,
+    "load15": UNIT_PLAIN,
+}
+PATH_METRICS = {"disk": UNIT_PERCENT, "inodes": UNIT_PERCENT}
+PROC_FIELDS = {"rss": UNIT_BYTES, "count": UNIT_PLAIN}
+
+Source = tuple[str, ...]
+SampleVector = Sequence[float | None]
+
+
+@dataclass(frozen=True, slots=True)
+class RuleSpec:
+    text: str
+    source: Source
+    op: str
+    threshold: float
+    unit: str
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRule:
+    spec: RuleSpec
+    index: int
+    check: Callable[[SampleVector], bool]
+
+    @property
+    def text(self) -> str:
+        return self.spec.text
+
+
+def _parse_number(raw: str) -> float | None:
+    match = NUMBER_RE.fullmatch(raw.strip().lower())
+    if not match:
+        return None
+    return float(match.group("number")) * SUFFIXES[match.group("suffix")]
+
+
+def _parse_threshold(raw: str) -> float | None:
+    parts = [part.strip() for part in raw.lower().split("*")]
+    if len(parts) == 1:
+        return _parse_number(parts[0])
+    if len(parts) != 2 or "ncpu" not in parts:
+        return None
+    other = parts[1] if parts[0] == "ncpu" else parts[0]
+    factor = 1.0 if other == "ncpu" else _parse_number(other)
+    if factor is None:
+        return None
+    return factor * (os.cpu_count() or 1)
+
+
+def parse_rule(raw: str) -> RuleSpec | None:
+    text = " ".join(str(raw).split())
+    match = RULE_RE.fullmatch(text)
+    if not match:
+        return None
+    metric, arg, field = match.group("metric"), match.group("arg"), match.group("field")
+    threshold = _parse_threshold(match.group("rhs"))
+    if threshold is None:
+        return None
+    if metric in SIMPLE_METRICS:
+        if arg or field:
+            return None
+        source: Source = (metric,)
+        unit = SIMPLE_METRICS[metric]
+    elif metric in PATH_METRICS:
+        if not arg or not arg.startswith("/") or field:
+            return None
+        source = (metric, os.path.normpath(arg))
+        unit = PATH_METRICS[metric]
+    elif metric == "proc":
+        field = field or "rss"
+        if not arg or not PROC_NAME_RE.fullmatch(arg) or field not in PROC_FIELDS:
+            return None
+        source = (metric, arg, field)
+        unit = PROC_FIELDS[field]
+    else:
+        return None
+    head = metric + (f":{arg}" if arg else "") + (f" {match.group('field')}" if match.group("field") else "")
+    canonical = f"{head} {match.group('op')} {match.group('rhs').strip()}"
+    return RuleSpec(text=canonical, source=source, op=match.group("op"), threshold=threshold, unit=unit)
+
+
+def normalize_rules(raw: object) -> list[str]:
+    if not isinstance(raw, list):
+        return []
+    result: list[str] = []
+    seen: set[str] = set()
+    for item in raw:
+        spec = parse_rule(str(item))
+        if spec is None or spec.text in seen:
+            continue
+        seen.add(spec.text)
+        result.append(spec.text)
+    return result[:MAX_RULES]
+
+
+def _make_check(index: int, op: str, threshold: float) -> Callable[[SampleVector], bool]:
+    compare = OPERATORS[op]
+
+    def check(values: SampleVector) -> bool:
+        value = values[index]
+        return value is not None and compare(value, threshold)
+
+    return check
+
+
+class RuleSet:
+    def __init__(self, texts: Sequence[str]) -> None:
+        self.key = tuple(texts)
+        self.sources: list[Source] = []
+        self.rules: list[CompiledRule] = []
+        positions: dict[Source, int] = {}
+        for text in texts:
+            spec = parse_rule(text)
+            if spec is None:
+                continue
+            index = positions.get(spec.source)
+            if index is None:
+                index = len(self.sources)
+                positions[spec.source] = index
+                self.sources.append(spec.source)
+            self.rules.append(CompiledRule(spec, index, _make_check(index, spec.op, spec.threshold)))
+
+
+def _process_totals() -> dict[str, tuple[float, float]]:
+    totals: dict[str, tuple[float, float]] = {}
+    for process in psutil.process_iter(["name", "memory_info"]):
+        name = process.info.get("name")
+        memory = process.info.get("memory_info")
+        if not name:
+            continue
+        rss, count = totals.get(name, (0.0, 0.0))
+        totals[name] = (rss + (memory.rss if memory else 0), count + 1)
+    return totals
+
+
+def _inodes_percent(path: str) -> float | None:
+    stat = os.statvfs(path)
+    if not stat.f_files:
+        return None
+    return (stat.f_files - stat.f_ffree) / stat.f_files * 100
+
+
+def collect_sources(sources: Sequence[Source], snapshot: MetricsSnapshot) -> list[float | None]:
+    processes: dict[str, tuple[float, float]] | None = None
+    loads: tuple[float, float, float] | None = None
+    values: list[float | None] = []
+    for source in sources:
+        kind = source[0]
+        value: float | None = None
+        try:
+            if kind == "cpu":
+                value = snapshot.cpu
+            elif kind == "ram":
+                value = snapshot.ram_percent
+            elif kind == "swap":
+                value = psutil.swap_memory().percent
+            elif kind in {"load1", "load5", "load15"}:
+                loads = loads or os.getloadavg()
+                value = loads[("load1", "load5", "load15").index(kind)]
+            elif kind == "disk":
+                value = psutil.disk_usage(source[1]).percent
+            elif kind == "inodes":
+                value = _inodes_percent(source[1])
+            elif kind == "proc":
+                if processes is None:
+                    processes = _process_totals()
+                rss, count = processes.get(source[1], (0.0, 0.0))
+                value = rss if source[2] == "rss" else count
+        except OSError:
+            value = None
+        values.append(value)
+    return values
+
+
+def format_rule_value(spec: RuleSpec, value: float) -> str:
+    if spec.unit == UNIT_BYTES:
+        return human_bytes(value)
+    if spec.unit == UNIT_PERCENT:
+        return f"{value:.1f}%"
+    return f"{value:.2f}"
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+SESSIONS_PATH = Path("data") / "sessions.json"
+SESSION_TTL = 7 * 86400
+WINDOW_TTL = 2 * 86400
+SESSION_FLUSH_DELAY = 2.0
+
+
+def storage_key_id(key: StorageKey) -> str:
+    return ":".join(
+        str(part) if part is not None else ""
+        for part in (key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny)
+    )
+
+
+class SessionStore:
+    def __init__(
+        self,
+        path: Path = SESSIONS_PATH,
+        ttl: float = SESSION_TTL,
+        window_ttl: float = WINDOW_TTL,
+        flush_delay: float = SESSION_FLUSH_DELAY,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.window_ttl = window_ttl
+        self.flush_delay = flush_delay
+        self._loaded = False
+        self._fsm: dict[str, tuple[str | None, dict[str, Any], float]] = {}
+        self._windows: dict[int, tuple[int, int, float]] = {}
+        self._dirty = False
+        self._flush_task: asyncio.Task | None = None
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(raw, dict):
+            return
+        fsm = raw.get("fsm")
+        if isinstance(fsm, dict):
+            for key, item in fsm.items():
+                try:
+                    state, data, ts = item
+                except (TypeError, ValueError):
+                    continue
+                if (state is None or isinstance(state, str)) and isinstance(data, dict) and isinstance(ts, (int, float)):
+                    self._fsm[str(key)] = (state, data, float(ts))
+        windows = raw.get("windows")
+        if isinstance(windows, dict):
+            for user_id, item in windows.items():
+                try:
+                    chat_id, message_id, ts = item
+                    self._windows[int(user_id)] = (int(chat_id), int(message_id), float(ts))
+                except (TypeError, ValueError):
+                    continue
+        if self.evict():
+            self._mark_dirty()
+
+    def evict(self, now: float | None = None) -> int:
+        now = time.time() if now is None else now
+        expired_fsm = [key for key, item in self._fsm.items() if now - item[2] > self.ttl]
+        expired_windows = [user_id for user_id, item in self._windows.items() if now - item[2] > self.window_ttl]
+        for key in expired_fsm:
+            del self._fsm[key]
+        for user_id in expired_windows:
+            del self._windows[user_id]
+        return len(expired_fsm) + len(expired_windows)
+
+    def get_window(self, user_id: int) -> tuple[int, int] | None:
+        self._ensure_loaded()
+        item = self._windows.get(user_id)
+        if item is None or time.time() - item[2] > self.window_ttl:
+            return None
+        return item[0], item[1]
+
+    def set_window(self, user_id: int, chat_id: int, message_id: int) -> None:
+        self._ensure_loaded()
+        current = self._windows.get(user_id)
+        now = time.time()
+        if current is not None and current[:2] == (chat_id, message_id) and now - current[2] < self.window_ttl / 2:
+            return
+        self._windows[user_id] = (chat_id, message_id, now)
+        self._mark_dirty()
+
+    def get_fsm(self, key: str) -> tuple[str | None, dict[str, Any]]:
+        self._ensure_loaded()
+        item = self._fsm.get(key)
+        if item is None or time.time() - item[2] > self.ttl:
+            return None, {}
+        return item[0], item[1]
+
+    def set_fsm(self, key: str, state: str | None, data: dict[str, Any]) -> None:
+        self._ensure_loaded()
+        current = self._fsm.get(key)
+        if state is None and not data:
+            if current is None:
+                return
+            del self._fsm[key]
+        elif current is not None and current[0] == state and current[1] == data:
+            return
+        else:
+            self._fsm[key] = (state, data, time.time())
+        self._mark_dirty()
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+            except RuntimeError:
+                self._flush_task = None
+
+    async def _delayed_flush(self) -> None:
+        while self._dirty:
+            await asyncio.sleep(self.flush_delay)
+            await self.flush()
+
+    def _payload(self) -> str:
+        return json.dumps(
+            {
+                "fsm": {key: list(item) for key, item in self._fsm.items()},
+                "windows": {str(user_id): list(item) for user_id, item in self._windows.items()},
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    def _write(self, payload: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        tmp.replace(self.path)
+
+    async def flush(self) -> None:
+        if not self._dirty:
+            return
+        self.evict()
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write, self._payload())
+        except OSError:
+            self._dirty = True
+
+    async def close(self) -> None:
+        task, self._flush_task = self._flush_task, None
+        if task and task is not asyncio.current_task():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.flush()
+
+
+SESSIONS = SessionStore()
+
+
+class PersistentFSMStorage(BaseStorage):
+    def __init__(self, store: SessionStore = SESSIONS) -> None:
+        self.store = store
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        item_key = storage_key_id(key)
+        _, data = self.store.get_fsm(item_key)
+        self.store.set_fsm(item_key, value, data)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return self.store.get_fsm(storage_key_id(key))[0]
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        item_key = storage_key_id(key)
+        state, _ = self.store.get_fsm(item_key)
+        self.store.set_fsm(item_key, state, dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return dict(self.store.get_fsm(storage_key_id(key))[1])
+
+    async def close(self) -> None:
+        await self.store.close()
@@ -1,66 +1,372 @@
 import asyncio
+import itertools
+import os
 import shlex
+import signal
 import time
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import Sequence
+from typing import AsyncIterator, Awaitable, Callable, Sequence
+
+STREAM_CHUNK = 64 * 1024
+STREAM_LINE_LIMIT = 1024 * 1024
+PROGRESS_TAIL = 4096
+CAPTURE_LIMIT = 64 * 1024
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_ALERTS = "alerts"
+PRIORITY_MAINTENANCE = "maintenance"
+PRIORITY_BACKUP = "backup"
+
+SCHEDULER_LIMITS: dict[str, int] = {
+    PRIORITY_INTERACTIVE: 4,
+    PRIORITY_ALERTS: 2,
+    PRIORITY_MAINTENANCE: 1,
+    PRIORITY_BACKUP: 1,
+}
+
+
+class OutputCapture:
+    __slots__ = ("head_limit", "tail_limit", "head", "_ring", "_pos", "_filled", "total", "_text")
+
+    def __init__(self, head_limit: int, tail_limit: int) -> None:
+        self.head_limit = head_limit
+        self.tail_limit = tail_limit
+        self.head = bytearray()
+        self._ring = bytearray(tail_limit)
+        self._pos = 0
+        self._filled = 0
+        self.total = 0
+        self._text: str | None = None
+
+    @classmethod
+    def bounded(cls, limit: int) -> "OutputCapture":
+        half = max(limit // 2, 1)
+        return cls(half, half)
+
+    def write(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        self._text = None
+        view = memoryview(chunk)
+        if len(self.head) < self.head_limit:
+            take = self.head_limit - len(self.head)
+            self.head.extend(view[:take])
+            view = view[take:]
+        size = len(view)
+        capacity = self.tail_limit
+        if not size or not capacity:
+            return
+        if size >= capacity:
+            self._ring[:] = view[size - capacity :]
+            self._pos = 0
+            self._filled = capacity
+            return
+        end = self._pos + size
+        if end <= capacity:
+            self._ring[self._pos : end] = view
+        else:
+            first = capacity - self._pos
+            self._ring[self._pos :] = view[:first]
+            self._ring[: size - first] = view[first:]
+        self._pos = end % capacity
+        self._filled = min(capacity, self._filled + size)
+
+    def tail_bytes(self) -> bytes:
+        if self._filled < self.tail_limit:
+            return bytes(self._ring[: self._filled])
+        return bytes(self._ring[self._pos :]) + bytes(self._ring[: self._pos])
+
+    def _parts(self) -> tuple[bytes, bytes]:
+        head = bytes(self.head)
+        tail = self.tail_bytes()
+        if self.total - len(head) - len(tail) <= 0:
+            return head, tail
+        cut = head.rfind(b"\n")
+        if cut >= 0:
+            head = head[: cut + 1]
+        cut = tail.find(b"\n")
+        if cut >= 0:
+            tail = tail[cut + 1 :]
+        return head, tail
+
+    @property
+    def dropped(self) -> int:
+        head, tail = self._parts()
+        return self.total - len(head) - len(tail)
+
+    def parts(self) -> tuple[str, str]:
+        head, tail = self._parts()
+        return head.decode("utf-8", errors="replace"), tail.decode("utf-8", errors="replace")
+
+    def text(self) -> str:
+        if self._text is None:
+            head, tail = self._parts()
+            self._text = (head + tail).decode("utf-8", errors="replace")
+        return self._text
 
 
 @dataclass(slots=True)
 class ExecResult:
     command: str
     returncode: int
-    stdout: str
-    stderr: str
+    stdout_capture: OutputCapture
+    stderr_capture: OutputCapture
     duration: float
     timed_out: bool
 
+    @property
+    def stdout(self) -> str:
+        return self.stdout_capture.text()
 
-async def run_exec(command: Sequence[str], timeout: int) -> ExecResult:
-    started = time.monotonic()
-    process = await asyncio.create_subprocess_exec(
-        *command,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
+    @property
+    def stderr(self) -> str:
+        return self.stderr_capture.text()
+
+    @property
+    def elided(self) -> int:
+        return self.stdout_capture.dropped + self.stderr_capture.dropped
+
+
+@dataclass(slots=True)
+class ExecProgress:
+    command: str
+    tail: str
+    elapsed: float
+    received: int
+
+
+ProgressCallback = Callable[[ExecProgress], Awaitable[None]]
+
+
+@dataclass(slots=True)
+class ScheduledCommand:
+    id: int
+    priority: str
+    label: str
+    queued_at: float
+    started_at: float | None = None
+
+
+class CommandScheduler:
+    def __init__(self, limits: dict[str, int]) -> None:
+        self.limits = dict(limits)
+        self._semaphores = {name: asyncio.Semaphore(max(1, limit)) for name, limit in self.limits.items()}
+        self._entries: dict[int, ScheduledCommand] = {}
+        self._ids = itertools.count(1)
+
+    @asynccontextmanager
+    async def slot(self, priority: str, label: str) -> AsyncIterator[ScheduledCommand]:
+        if priority not in self._semaphores:
+            priority = PRIORITY_INTERACTIVE
+        entry = ScheduledCommand(id=next(self._ids), priority=priority, label=label, queued_at=time.monotonic())
+        self._entries[entry.id] = entry
+        try:
+            async with self._semaphores[priority]:
+                entry.started_at = time.monotonic()
+                yield entry
+        finally:
+            self._entries.pop(entry.id, None)
+
+    def entries(self) -> list[ScheduledCommand]:
+        return sorted(self._entries.values(), key=lambda item: item.id)
+
+    def counts(self) -> dict[str, tuple[int, int]]:
+        result = {name: (0, 0) for name in self.limits}
+        for entry in self._entries.values():
+            running, pending = result[entry.priority]
+            if entry.started_at is None:
+                result[entry.priority] = (running, pending + 1)
+            else:
+                result[entry.priority] = (running + 1, pending)
+        return result
+
+
+SCHEDULER = CommandScheduler(SCHEDULER_LIMITS)
+
+ExecListener = Callable[[Sequence[str]], None]
+_EXEC_LISTENERS: list[ExecListener] = []
+
+
+def add_exec_listener(listener: ExecListener) -> None:
+    if listener not in _EXEC_LISTENERS:
+        _EXEC_LISTENERS.append(listener)
+
+
+def _notify_listeners(argv: Sequence[str]) -> None:
+    for listener in _EXEC_LISTENERS:
+        try:
+            listener(argv)
+        except Exception:
+            continue
+
+
+class _OutputState:
+    __slots__ = ("command", "started", "stdout", "stderr", "tail")
+
+    def __init__(self, command: str, started: float, capture_limit: int) -> None:
+        self.command = command
+        self.started = started
+        self.stdout = OutputCapture.bounded(capture_limit)
+        self.stderr = OutputCapture.bounded(capture_limit)
+        self.tail = OutputCapture(0, PROGRESS_TAIL)
+
+    def feed(self, sink: OutputCapture, chunk: bytes) -> None:
+        sink.write(chunk)
+        self.tail.write(chunk)
+
+    def progress(self) -> ExecProgress:
+        return ExecProgress(
+            command=self.command,
+            tail=self.tail.text(),
+            elapsed=time.monotonic() - self.started,
+            received=self.tail.total,
+        )
+
+
+def _kill_group(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is not None:
+        return
     try:
-        stdout_bytes, stderr_bytes = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+
+
+async def _pump(stream: asyncio.StreamReader | None, sink: OutputCapture, state: _OutputState) -> None:
+    if stream is None:
+        return
+    while True:
+        chunk = await stream.read(STREAM_CHUNK)
+        if not chunk:
+            return
+        state.feed(sink, chunk)
+
+
+async def _report(state: _OutputState, on_progress: ProgressCallback, interval: float) -> None:
+    while True:
+        try:
+            await on_progress(state.progress())
+        except Exception:
+            pass
+        await asyncio.sleep(interval)
+
+
+async def _collect(
+    process: asyncio.subprocess.Process,
+    command_text: str,
+    started: float,
+    timeout: int,
+    on_progress: ProgressCallback | None,
+    interval: float,
+    capture_limit: int,
+) -> ExecResult:
+    state = _OutputState(command_text, started, capture_limit)
+
+    async def _drain() -> None:
+        await asyncio.gather(
+            _pump(process.stdout, state.stdout, state),
+            _pump(process.stderr, state.stderr, state),
+        )
+        await process.wait()
+
+    reporter = asyncio.create_task(_report(state, on_progress, max(interval, 1.0))) if on_progress else None
+    try:
+        await asyncio.wait_for(_drain(), timeout=timeout)
         timed_out = False
     except asyncio.TimeoutError:
-        process.kill()
-        stdout_bytes, stderr_bytes = await process.communicate()
+        _kill_group(process)
+        try:
+            await asyncio.wait_for(_drain(), timeout=5)
+        except asyncio.TimeoutError:
+            pass
         timed_out = True
+    except asyncio.CancelledError:
+        _kill_group(process)
+        raise
+    finally:
+        if reporter:
+            reporter.cancel()
+            await asyncio.gather(reporter, return_exceptions=True)
     duration = time.monotonic() - started
     return ExecResult(
-        command=shlex.join(command),
+        command=command_text,
         returncode=process.returncode if process.returncode is not None else -1,
-        stdout=stdout_bytes.decode("utf-8", errors="replace"),
-        stderr=stderr_bytes.decode("utf-8", errors="replace"),
+        stdout_capture=state.stdout,
+        stderr_capture=state.stderr,
         duration=duration,
         timed_out=timed_out,
     )
 
 
-async def run_shell(command: str, timeout: int) -> ExecResult:
-    started = time.monotonic()
-    process = await asyncio.create_subprocess_shell(
-        command,
-        executable="/bin/bash",
+async def run_exec(
+    command: Sequence[str],
+    timeout: int,
+    on_progress: ProgressCallback | None = None,
+    interval: float = 3.0,
+    capture_limit: int = CAPTURE_LIMIT,
+    priority: str = PRIORITY_INTERACTIVE,
+) -> ExecResult:
+    command_text = shlex.join(command)
+    async with SCHEDULER.slot(priority, command_text):
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        try:
+            return await _collect(process, command_text, started, timeout, on_progress, interval, capture_limit)
+        finally:
+            _notify_listeners(command)
+
+
+async def run_shell(
+    command: str,
+    timeout: int,
+    on_progress: ProgressCallback | None = None,
+    interval: float = 3.0,
+    capture_limit: int = CAPTURE_LIMIT,
+    priority: str = PRIORITY_INTERACTIVE,
+) -> ExecResult:
+    async with SCHEDULER.slot(priority, command):
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_shell(
+            command,
+            executable="/bin/bash",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        try:
+            return await _collect(process, command, started, timeout, on_progress, interval, capture_limit)
+        finally:
+            _notify_listeners(command.split())
+
+
+async def stream_lines(command: Sequence[str], limit: int = STREAM_LINE_LIMIT) -> AsyncIterator[str]:
+    process = await asyncio.create_subprocess_exec(
+        *command,
         stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        start_new_session=True,
+        limit=limit,
     )
     try:
-        stdout_bytes, stderr_bytes = await asyncio.wait_for(process.communicate(), timeout=timeout)
-        timed_out = False
-    except asyncio.TimeoutError:
-        process.kill()
-        stdout_bytes, stderr_bytes = await process.communicate()
-        timed_out = True
-    duration = time.monotonic() - started
-    return ExecResult(
-        command=command,
-        returncode=process.returncode if process.returncode is not None else -1,
-        stdout=stdout_bytes.decode("utf-8", errors="replace"),
-        stderr=stderr_bytes.decode("utf-8", errors="replace"),
-        duration=duration,
-        timed_out=timed_out,
-    )
+        while True:
+            try:
+                line = await process.stdout.readline()
+            except ValueError:
+                continue
+            if not line:
+                return
+            yield line.decode("utf-8", errors="replace")
+    finally:
+        _kill_group(process)
+        try:
+            await asyncio.wait_for(process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Mapping
+
+DATABASE_PATH = Path("data") / "state.db"
+BATCH_LIMIT = 256
+BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL, updated REAL NOT NULL)",
+)
+
+WriteOp = Callable[[sqlite3.Connection], Any]
+
+
+def thaw(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_json(value: Any, indent: int | None = None) -> str:
+    return json.dumps(value, ensure_ascii=False, indent=indent, default=thaw)
+
+
+class StateDatabase:
+    def __init__(self, path: Path = DATABASE_PATH) -> None:
+        self.path = path
+        self.transactions = 0
+        self.writes = 0
+        self._queue: queue.SimpleQueue[tuple[WriteOp, Future] | None] = queue.SimpleQueue()
+        self._written: dict[str, str] = {}
+        self._staged: dict[str, str] = {}
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return connection
+
+    def open(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            connection = self._connect()
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._written = {key: value for key, value in connection.execute("SELECT key, value FROM state")}
+            self._thread = threading.Thread(target=self._writer, args=(connection,), name="state-db", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join()
+
+    async def aclose(self) -> None:
+        await asyncio.to_thread(self.close)
+
+    def _writer(self, connection: sqlite3.Connection) -> None:
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                stop = False
+                while len(batch) < BATCH_LIMIT:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._run_batch(connection, batch)
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+    def _run_batch(self, connection: sqlite3.Connection, batch: list[tuple[WriteOp, Future]]) -> None:
+        results: list[tuple[Future, Any, BaseException | None]] = []
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for index, (operation, future) in enumerate(batch):
+                savepoint = f"op{index}"
+                connection.execute(f"SAVEPOINT {savepoint}")
+                try:
+                    result = operation(connection)
+                except Exception as exc:
+                    connection.execute(f"ROLLBACK TO {savepoint}")
+                    results.append((future, None, exc))
+                else:
+                    results.append((future, result, None))
+                connection.execute(f"RELEASE {savepoint}")
+            connection.execute("COMMIT")
+        except sqlite3.Error as exc:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        finally:
+            staged, self._staged = self._staged, {}
+        self._written.update(staged)
+        self.transactions += 1
+        self.writes += len(batch)
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def submit(self, operation: WriteOp) -> Future:
+        future: Future = Future()
+        if self._thread is None:
+            future.set_exception(sqlite3.OperationalError("state database is closed"))
+            return future
+        self._queue.put((operation, future))
+        return future
+
+    async def write(self, operation: WriteOp) -> Any:
+        return await asyncio.wrap_future(self.submit(operation))
+
+    def load_state(self) -> dict[str, Any] | None:
+        if not self._written:
+            return None
+        data: dict[str, Any] = {}
+        for key, value in self._written.items():
+            try:
+                data[key] = json.loads(value)
+            except ValueError:
+                continue
+        return data
+
+    def _save_sections(self, connection: sqlite3.Connection, data: Mapping[str, Any]) -> int:
+        staged: dict[str, str] = {}
+        now = time.time()
+        for key, value in data.items():
+            payload = dump_json(value)
+            if self._staged.get(key, self._written.get(key)) == payload:
+                continue
+            connection.execute(
+                "INSERT INTO state (key, value, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated = excluded.updated",
+                (key, payload, now),
+            )
+            staged[key] = payload
+        self._staged.update(staged)
+        return len(staged)
+
+    def save_state(self, data: Mapping[str, Any]) -> Future:
+        return self.submit(lambda connection: self._save_sections(connection, data))
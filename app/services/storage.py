@@ -1,11 +1,20 @@
 import asyncio
 import copy
 import json
+import os
 import re
+import sqlite3
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from app.services.rules import normalize_rules
+from app.services.statedb import StateDatabase, dump_json
 
 SERVICE_NAME_RE = re.compile(r"^[a-zA-Z0-9_.@-]+$")
+MAX_ALERT_SERVICES = 500
 
 DEFAULT_DATA: dict[str, Any] = {
     "runtime": {
@@ -22,7 +31,12 @@ DEFAULT_DATA: dict[str, Any] = {
         "disk": 90,
         "interval": 30,
         "cooldown": 300,
+        "hold": 0,
+        "hysteresis": 5,
         "services": [],
+        "rules": [],
+        "muted": [],
+        "journal": True,
     },
 }
 
@@ -56,7 +70,7 @@ def _normalize_services(raw: Any) -> list[str]:
             continue
         seen.add(item)
         deduped.append(item)
-    return deduped[:20]
+    return deduped[:MAX_ALERT_SERVICES]
 
 
 def _normalize_admin_ids(raw: Any) -> list[int]:
@@ -133,18 +147,83 @@ def normalize_data(data: Any) -> dict[str, Any]:
             "disk": _clamp_int(alerts.get("disk"), 90, 1, 100),
             "interval": _clamp_int(alerts.get("interval"), 30, 10, 3600),
             "cooldown": _clamp_int(alerts.get("cooldown"), 300, 30, 86400),
+            "hold": _clamp_int(alerts.get("hold"), 0, 0, 3600),
+            "hysteresis": _clamp_int(alerts.get("hysteresis"), 5, 0, 50),
             "services": _normalize_services(alerts.get("services", [])),
+            "rules": normalize_rules(alerts.get("rules", [])),
+            "muted": _normalize_admin_ids(alerts.get("muted", [])),
+            "journal": bool(alerts.get("journal", True)),
         },
     }
 
 
+def freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class StateSnapshot:
+    version: int
+    data: Mapping[str, Any]
+    extra_admin_ids: frozenset[int]
+
+    @property
+    def runtime(self) -> Mapping[str, Any]:
+        return self.data["runtime"]
+
+    @property
+    def alerts(self) -> Mapping[str, Any]:
+        return self.data["alerts"]
+
+    def is_admin(self, user_id: int, base_admin_ids: tuple[int, ...]) -> bool:
+        return user_id in base_admin_ids or user_id in self.extra_admin_ids
+
+
 class Storage:
-    def __init__(self, path: Path | None = None) -> None:
+    def __init__(
+        self,
+        path: Path | None = None,
+        flush_delay: float = 1.0,
+        max_staleness: float = 10.0,
+        database: StateDatabase | None = None,
+    ) -> None:
         self.path = path or Path("data") / "state.json"
+        self.database = database
+        self.flush_delay = flush_delay
+        self.max_staleness = max(max_staleness, flush_delay)
         self._lock = asyncio.Lock()
         self._cache = self._load_sync()
+        self._current = self._build_snapshot(0)
+        self._dirty_since: float | None = None
+        self._deadline = 0.0
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
 
     def _load_sync(self) -> dict[str, Any]:
+        if self.database is not None:
+            return self._load_database(self.database)
+        return self._load_file()
+
+    def _load_database(self, database: StateDatabase) -> dict[str, Any]:
+        database.open()
+        stored = database.load_state()
+        if stored is not None:
+            return normalize_data(stored)
+        data = self._load_file()
+        database.save_state(data).result()
+        if self.path.exists():
+            try:
+                self.path.replace(self.path.with_suffix(self.path.suffix + ".migrated"))
+            except OSError:
+                pass
+        return data
+
+    def _load_file(self) -> dict[str, Any]:
         if not self.path.exists():
             return copy.deepcopy(DEFAULT_DATA)
         try:
@@ -154,32 +233,112 @@ class Storage:
             return copy.deepcopy(DEFAULT_DATA)
         return normalize_data(data)
 
+    def _build_snapshot(self, version: int) -> StateSnapshot:
+        return StateSnapshot(
+            version=version,
+            data=freeze(self._cache),
+            extra_admin_ids=frozenset(self._cache["runtime"]["extra_admin_ids"]),
+        )
+
+    @property
+    def current(self) -> StateSnapshot:
+        return self._current
+
     def _save_sync(self) -> None:
+        if self.database is not None:
+            self.database.save_state(self._current.data).result()
+            return
+        self._write_file(self._current.data)
+
+    async def _persist(self, data: Mapping[str, Any]) -> None:
+        if self.database is not None:
+            await asyncio.wrap_future(self.database.save_state(data))
+            return
+        await asyncio.to_thread(self._write_file, data)
+
+    def _write_file(self, data: Mapping[str, Any]) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
         tmp = self.path.with_suffix(self.path.suffix + ".tmp")
-        tmp.write_text(json.dumps(self._cache, ensure_ascii=False, indent=2), encoding="utf-8")
+        with tmp.open("w", encoding="utf-8") as handle:
+            handle.write(dump_json(data, indent=2))
+            handle.flush()
+            os.fsync(handle.fileno())
         tmp.replace(self.path)
 
-    async def snapshot(self) -> dict[str, Any]:
-        async with self._lock:
-            return copy.deepcopy(self._cache)
+    @property
+    def dirty(self) -> bool:
+        return self._dirty_since is not None
+
+    def start(self) -> None:
+        if self.flush_delay > 0 and (self._flusher is None or self._flusher.done()):
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        flusher, self._flusher = self._flusher, None
+        if flusher:
+            flusher.cancel()
+            await asyncio.gather(flusher, return_exceptions=True)
+        await self.flush()
+        if self.database is not None:
+            await self.database.aclose()
+
+    def _commit(self) -> StateSnapshot:
+        self._current = self._build_snapshot(self._current.version + 1)
+        if self._flusher is None or self._flusher.done():
+            self._save_sync()
+            return self._current
+        now = time.monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = now
+        self._deadline = min(now + self.flush_delay, self._dirty_since + self.max_staleness)
+        self._wakeup.set()
+        return self._current
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._dirty_since is not None:
+                delay = self._deadline - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                await self.flush()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if self._dirty_since is None:
+                return
+            data = self._current.data
+            self._dirty_since = None
+            try:
+                await self._persist(data)
+            except (OSError, sqlite3.Error):
+                now = time.monotonic()
+                if self._dirty_since is None:
+                    self._dirty_since = now
+                self._deadline = now + max(self.flush_delay, 1.0)
+                self._wakeup.set()
+
+    async def snapshot(self) -> Mapping[str, Any]:
+        return self._current.data
 
     async def get_admin_chat_id(self) -> int | None:
-        async with self._lock:
-            value = self._cache["runtime"]["admin_chat_id"]
-            return int(value) if isinstance(value, int) else None
+        value = self._current.runtime["admin_chat_id"]
+        return int(value) if isinstance(value, int) else None
 
     async def set_admin_chat_id(self, chat_id: int) -> None:
+        value = int(chat_id)
+        if self._current.runtime["admin_chat_id"] == value:
+            return
         async with self._lock:
-            value = int(chat_id)
             if self._cache["runtime"]["admin_chat_id"] == value:
                 return
             self._cache["runtime"]["admin_chat_id"] = value
-            self._save_sync()
+            self._commit()
 
     async def get_compose_project(self) -> str:
-        async with self._lock:
-            return str(self._cache["runtime"]["compose_project"])
+        return str(self._current.runtime["compose_project"])
 
     async def set_compose_project(self, path: str) -> None:
         async with self._lock:
@@ -187,11 +346,10 @@ class Storage:
             if self._cache["runtime"]["compose_project"] == value:
                 return
             self._cache["runtime"]["compose_project"] = value
-            self._save_sync()
+            self._commit()
 
     async def get_extra_admin_ids(self) -> list[int]:
-        async with self._lock:
-            return list(self._cache["runtime"]["extra_admin_ids"])
+        return list(self._current.runtime["extra_admin_ids"])
 
     async def add_admin_id(self, admin_id: int) -> list[int]:
         async with self._lock:
@@ -201,7 +359,7 @@ class Storage:
             normalized = _normalize_admin_ids(current)
             if normalized != self._cache["runtime"]["extra_admin_ids"]:
                 self._cache["runtime"]["extra_admin_ids"] = normalized
-                self._save_sync()
+                self._commit()
             return list(self._cache["runtime"]["extra_admin_ids"])
 
     async def remove_admin_id(self, admin_id: int) -> list[int]:
@@ -210,45 +368,32 @@ class Storage:
             normalized = _normalize_admin_ids(current)
             if normalized != self._cache["runtime"]["extra_admin_ids"]:
                 self._cache["runtime"]["extra_admin_ids"] = normalized
-                self._save_sync()
+                self._commit()
             return list(self._cache["runtime"]["extra_admin_ids"])
 
     async def is_admin(self, user_id: int, base_admin_ids: tuple[int, ...]) -> bool:
-        async with self._lock:
-            if user_id in base_admin_ids:
-                return True
-            return user_id in self._cache["runtime"]["extra_admin_ids"]
+        return self._current.is_admin(user_id, base_admin_ids)
 
     async def list_admin_ids(self, base_admin_ids: tuple[int, ...]) -> list[int]:
-        async with self._lock:
-            values = list(base_admin_ids) + list(self._cache["runtime"]["extra_admin_ids"])
-            deduped: list[int] = []
-            seen: set[int] = set()
-            for item in values:
-                if item in seen:
-                    continue
-                seen.add(item)
-                deduped.append(item)
-            return deduped
+        values = list(base_admin_ids) + list(self._current.runtime["extra_admin_ids"])
+        return list(dict.fromkeys(values))
 
     async def get_firewall_ports(self, fallback: tuple[int, ...]) -> list[int]:
-        async with self._lock:
-            current = list(self._cache["runtime"]["firewall_safe_ports"])
-            if current:
-                return current
-            return list(fallback)
+        current = list(self._current.runtime["firewall_safe_ports"])
+        if current:
+            return current
+        return list(fallback)
 
     async def set_firewall_ports(self, ports: list[int]) -> list[int]:
         async with self._lock:
             normalized = _normalize_ports(ports)
             if normalized != self._cache["runtime"]["firewall_safe_ports"]:
                 self._cache["runtime"]["firewall_safe_ports"] = normalized
-                self._save_sync()
+                self._commit()
             return list(normalized)
 
     async def get_firewall_enabled(self) -> bool:
-        async with self._lock:
-            return bool(self._cache["runtime"]["firewall_enabled"])
+        return bool(self._current.runtime["firewall_enabled"])
 
     async def set_firewall_enabled(self, enabled: bool) -> bool:
         async with self._lock:
@@ -256,30 +401,46 @@ class Storage:
             if self._cache["runtime"]["firewall_enabled"] == value:
                 return value
             self._cache["runtime"]["firewall_enabled"] = value
-            self._save_sync()
+            self._commit()
             return bool(self._cache["runtime"]["firewall_enabled"])
 
-    async def get_alerts(self) -> dict[str, Any]:
-        async with self._lock:
-            return copy.deepcopy(self._cache["alerts"])
+    async def get_alerts(self) -> Mapping[str, Any]:
+        return self._current.alerts
 
-    async def set_alert_value(self, key: str, value: Any) -> dict[str, Any]:
+    async def set_alert_value(self, key: str, value: Any) -> Mapping[str, Any]:
         async with self._lock:
             alerts = self._cache["alerts"]
-            if key == "enabled":
-                alerts["enabled"] = bool(value)
+            if key in {"enabled", "journal"}:
+                alerts[key] = bool(value)
             elif key in {"cpu", "ram", "disk"}:
                 alerts[key] = _clamp_int(value, alerts[key], 1, 100)
             elif key == "interval":
                 alerts["interval"] = _clamp_int(value, alerts["interval"], 10, 3600)
             elif key == "cooldown":
                 alerts["cooldown"] = _clamp_int(value, alerts["cooldown"], 30, 86400)
-            self._save_sync()
-            return copy.deepcopy(alerts)
+            elif key == "hold":
+                alerts["hold"] = _clamp_int(value, alerts["hold"], 0, 3600)
+            elif key == "hysteresis":
+                alerts["hysteresis"] = _clamp_int(value, alerts["hysteresis"], 0, 50)
+            return self._commit().alerts
 
-    async def set_alert_services(self, values: list[str]) -> dict[str, Any]:
+    async def set_alert_rules(self, values: list[str]) -> Mapping[str, Any]:
+        async with self._lock:
+            self._cache["alerts"]["rules"] = normalize_rules(values)
+            return self._commit().alerts
+
+    async def toggle_alert_mute(self, user_id: int) -> bool:
         async with self._lock:
             alerts = self._cache["alerts"]
-            alerts["services"] = _normalize_services(values)
-            self._save_sync()
-            return copy.deepcopy(alerts)
+            muted = [item for item in alerts["muted"] if item != user_id]
+            is_muted = len(muted) == len(alerts["muted"])
+            if is_muted:
+                muted.append(user_id)
+            alerts["muted"] = _normalize_admin_ids(muted)
+            self._commit()
+            return is_muted
+
+    async def set_alert_services(self, values: list[str]) -> Mapping[str, Any]:
+        async with self._lock:
+            self._cache["alerts"]["services"] = _normalize_services(values)
+            return self._commit().alerts
@@ -0,0 +1,101 @@
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Sequence
+
+from app.services.shell import stream_lines
+
+RESTART_DELAY = 5.0
+
+UNIT_MESSAGES: dict[str, str] = {
+    "39f53479d3a045ac8e11786248231fbf": "active",
+    "9d1aaa27d60140bd96365438aad20286": "inactive",
+    "be02cf6855d2428ba40df7e9d022f03d": "failed",
+    "d9b373ed55a64feb8242e02dbe79a49c": "failed",
+    "7ad2d189f7e94e70a38c781354912448": "inactive",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class UnitEvent:
+    unit: str
+    state: str
+    result: str
+
+
+def unit_id(name: str) -> str:
+    return name if "." in name.rsplit("@", 1)[-1] else f"{name}.service"
+
+
+def unit_events_command() -> list[str]:
+    matches = [f"MESSAGE_ID={message_id}" for message_id in UNIT_MESSAGES]
+    return ["journalctl", "-f", "-o", "json", "--no-pager", "-n", "0", "_PID=1", *matches]
+
+
+def parse_unit_event(line: str) -> UnitEvent | None:
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(entry, dict):
+        return None
+    state = UNIT_MESSAGES.get(str(entry.get("MESSAGE_ID", "")))
+    unit = entry.get("UNIT")
+    if state is None or not isinstance(unit, str) or not unit:
+        return None
+    result = entry.get("UNIT_RESULT")
+    return UnitEvent(unit=unit, state=state, result=result if isinstance(result, str) else "")
+
+
+LineSource = Callable[[Sequence[str]], AsyncIterator[str]]
+UnitCallback = Callable[[UnitEvent], Awaitable[None]]
+
+
+class UnitWatcher:
+    def __init__(self, on_event: UnitCallback, source: LineSource = stream_lines) -> None:
+        self.on_event = on_event
+        self.source = source
+        self.healthy = False
+        self.generation = 0
+        self.events = 0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self.healthy = False
+
+    async def handle_line(self, line: str) -> None:
+        event = parse_unit_event(line)
+        if event is None:
+            return
+        self.events += 1
+        try:
+            await self.on_event(event)
+        except Exception:
+            pass
+
+    async def run(self) -> None:
+        try:
+            while True:
+                self.generation += 1
+                self.healthy = True
+                try:
+                    async for line in self.source(unit_events_command()):
+                        await self.handle_line(line)
+                except (OSError, ValueError):
+                    pass
+                self.healthy = False
+                await asyncio.sleep(RESTART_DELAY)
+        finally:
+            self.healthy = False
@@ -17,7 +17,11 @@ class BotStates(StatesGroup):
     waiting_alert_disk = State()
     waiting_alert_interval = State()
     waiting_alert_cooldown = State()
+    waiting_alert_hold = State()
+    waiting_alert_hysteresis = State()
     waiting_alert_services = State()
+    waiting_alert_rule_add = State()
+    waiting_alert_rule_delete = State()
     waiting_firewall_panic_ip = State()
     waiting_log_service = State()
     waiting_log_search = State()
@@ -27,10 +31,16 @@ class BotStates(StatesGroup):
     waiting_docker_logs_container = State()
     waiting_docker_compose_path = State()
     waiting_backup_pro_source = State()
+    waiting_backup_pro_incremental_source = State()
     waiting_backup_pro_restore_archive = State()
     waiting_backup_pro_restore_target = State()
     waiting_backup_pro_delete_name = State()
     waiting_backup_pro_download_name = State()
+    waiting_backup_pro_verify_name = State()
+    waiting_repo_source = State()
+    waiting_repo_restore_id = State()
+    waiting_repo_restore_target = State()
+    waiting_repo_delete_id = State()
     waiting_add_admin_id = State()
     waiting_remove_admin_id = State()
     terminal_mode = State()
@@ -1,4 +1,20 @@
 import html
+import time
+from datetime import datetime
+
+from app.services.alerts import AlertCycleStats
+from app.services.cache import CacheStats
+from app.services.eventlog import EventSummary
+from app.services.formatting import human_bytes, pre
+from app.services.jobs import JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_RUNNING, Job
+from app.services.repository import SnapshotInfo
+from app.services.shell import ScheduledCommand
+
+SERVICES_SHOWN = 30
+RULE_EXAMPLES = (
+    "Примеры: <code>disk:/var &gt; 85</code>, <code>load5 &gt; ncpu*1.5</code>, <code>swap &gt; 50</code>, "
+    "<code>inodes:/ &gt; 90</code>, <code>proc:java rss &gt; 8G</code>"
+)
 
 
 def main_text() -> str:
@@ -13,10 +29,13 @@ def tools_text() -> str:
     return "<b>🧰 Инструменты</b>\nРасширенные блоки управления сервером:"
 
 
-def alerts_text(config: dict) -> str:
-    services = ", ".join(config.get("services", [])) if config.get("services") else "не заданы"
+def alerts_text(config: dict, cycle: AlertCycleStats | None = None) -> str:
+    names = list(config.get("services", []))
+    services = ", ".join(names[:SERVICES_SHOWN]) if names else "не заданы"
+    if len(names) > SERVICES_SHOWN:
+        services = f"{services} … (+{len(names) - SERVICES_SHOWN})"
     status = "ON" if config.get("enabled") else "OFF"
-    return (
+    text = (
         "<b>📈 Мониторинг + алерты</b>\n"
         f"<b>Статус:</b> {status}\n"
         f"<b>CPU порог:</b> {config.get('cpu')}%\n"
@@ -24,7 +43,76 @@ def alerts_text(config: dict) -> str:
         f"<b>Disk порог:</b> {config.get('disk')}%\n"
         f"<b>Интервал:</b> {config.get('interval')} c\n"
         f"<b>Cooldown:</b> {config.get('cooldown')} c\n"
-        f"<b>Службы:</b> <code>{html.escape(services)}</code>"
+        f"<b>Удержание:</b> {config.get('hold')} c | <b>Гистерезис:</b> {config.get('hysteresis')} п.п.\n"
+        f"<b>Службы ({len(names)}):</b> <code>{html.escape(services)}</code>\n"
+        f"<b>Правила:</b> {len(config.get('rules', []))} | <b>Без уведомлений:</b> {len(config.get('muted', []))}\n"
+        f"<b>Журнал (OOM, segfault, I/O, SSH):</b> {'ON' if config.get('journal') else 'OFF'}"
+    )
+    if cycle is not None and cycle.cycles:
+        finished = datetime.fromtimestamp(cycle.started_at + cycle.duration).strftime("%H:%M:%S")
+        text += f"\n<b>Последний цикл:</b> {cycle.duration:.2f} c в {finished}"
+        if cycle.unresolved:
+            text += f", без ответа: {cycle.unresolved} из {cycle.services}"
+        mode = f"события systemd ({cycle.unit_events})" if cycle.event_mode else "опрос"
+        text += f"\n<b>Службы отслеживаются:</b> {mode}"
+    return text
+
+
+def alert_rules_text(rules: list[str]) -> str:
+    lines = ["<b>📐 Правила алертов</b>"]
+    if rules:
+        lines.extend(f"{index}. <code>{html.escape(rule)}</code>" for index, rule in enumerate(rules, start=1))
+    else:
+        lines.append("Правил нет.")
+    lines.append("")
+    lines.append(RULE_EXAMPLES)
+    return "\n".join(lines)
+
+
+def _human_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rem = divmod(seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    if hours:
+        return f"{hours}ч {minutes:02}м"
+    if minutes:
+        return f"{minutes}м {secs:02}с"
+    return f"{secs}с"
+
+
+def incidents_text(summary: EventSummary, limit: int = 15) -> str:
+    hours = summary.window // 3600
+    lines = [f"<b>📜 Инциденты за {hours} ч:</b> {len(summary.incidents)}"]
+    if not summary.incidents:
+        lines.append("Срабатываний не было.")
+        return "\n".join(lines)
+    for incident in summary.incidents[:limit]:
+        started = datetime.fromtimestamp(incident.started).strftime("%d.%m %H:%M")
+        if incident.duration is None:
+            duration = "продолжается"
+        elif incident.expired:
+            duration = f"{_human_duration(incident.duration)}, закрыт перезапуском"
+        else:
+            duration = _human_duration(incident.duration)
+        lines.append(f"{started} <code>{html.escape(incident.key)}</code> — {duration}")
+    if len(summary.incidents) > limit:
+        lines.append(f"… и ещё {len(summary.incidents) - limit}")
+    lines.append("")
+    lines.append("<b>По ключам</b> (инцидентов / MTTR):")
+    for stats in summary.keys[:limit]:
+        mttr = "—" if stats.mttr is None else _human_duration(stats.mttr)
+        flags = " 🔁 флаппинг" if stats.flapping else ""
+        if stats.open:
+            flags += " 🔴"
+        lines.append(f"<code>{html.escape(stats.key)}</code>: {stats.incidents} / {mttr}{flags}")
+    return "\n".join(lines)
+
+
+def job_started_text(title: str) -> str:
+    return (
+        f"<b>{html.escape(title)}</b> ⏳\n"
+        "Задача запущена в фоне. Прогресс появится в этом окне,\n"
+        "список и отмена: <b>Инструменты → Задачи</b>."
     )
 
 
@@ -44,6 +132,75 @@ def updates_text(manager_title: str) -> str:
 def backup_pro_text() -> str:
     return (
         "<b>💾 Бэкапы PRO</b>\n"
-        "Архивирование, список, скачивание, восстановление и удаление.\n"
+        "Архивирование, список, скачивание, проверка, восстановление и удаление.\n"
         "Рабочая директория архивов: <code>/backup</code>"
     )
+
+
+def repository_text(items: list[SnapshotInfo]) -> str:
+    header = (
+        "<b>🧩 Репозиторий снимков</b>\n"
+        "Файлы режутся на чанки (content-defined chunking), одинаковые чанки хранятся один раз.\n"
+        "Каталог: <code>/backup/repo</code>"
+    )
+    if not items:
+        return f"{header}\n\nСнимков пока нет."
+    lines = [
+        f"{datetime.fromtimestamp(item.created).strftime('%Y-%m-%d %H:%M')}  {human_bytes(item.size):>9}  "
+        f"+{human_bytes(item.new_bytes):>9}  {item.id}"
+        for item in items
+    ]
+    body = "\n".join(lines)
+    return f"{header}\n\n<b>Снимки</b> (дата, объем, новые данные, id):\n{pre(body, limit=3000)}"
+
+
+def queue_text(limits: dict[str, int], counts: dict[str, tuple[int, int]], entries: list[ScheduledCommand]) -> str:
+    lines = ["<b>Очередь команд</b>"]
+    for name, limit in limits.items():
+        running, pending = counts.get(name, (0, 0))
+        lines.append(f"<b>{name}:</b> {running}/{limit} выполняется, {pending} в очереди")
+    if not entries:
+        lines.append("Активных команд нет.")
+        return "\n".join(lines)
+    now = time.monotonic()
+    rows: list[str] = []
+    for entry in entries[:20]:
+        if entry.started_at is None:
+            state = f"ждет {now - entry.queued_at:.0f} c"
+        else:
+            state = f"идет {now - entry.started_at:.0f} c"
+        label = entry.label if len(entry.label) <= 60 else entry.label[:57] + "..."
+        rows.append(f"#{entry.id} [{entry.priority}] {state}: {label}")
+    body = "\n".join(rows)
+    lines.append(f"<pre>{html.escape(body)}</pre>")
+    return "\n".join(lines)
+
+
+def cache_text(stats: CacheStats) -> str:
+    total = stats.hits + stats.misses + stats.coalesced
+    ratio = (stats.hits + stats.coalesced) / total * 100 if total else 0.0
+    return (
+        "<b>Кэш команд</b>\n"
+        f"<b>Попадания:</b> {stats.hits} | <b>Промахи:</b> {stats.misses} | <b>Склеено:</b> {stats.coalesced}\n"
+        f"<b>Эффективность:</b> {ratio:.0f}% | <b>Инвалидаций:</b> {stats.invalidations}"
+    )
+
+
+JOB_STATE_TITLES = {
+    JOB_RUNNING: "⏳ выполняется",
+    JOB_DONE: "✅ готово",
+    JOB_FAILED: "❌ ошибка",
+    JOB_CANCELLED: "⛔ отменена",
+}
+
+
+def jobs_text(jobs: list[Job]) -> str:
+    if not jobs:
+        return "<b>🗂 Задачи</b>\nФоновых задач пока не было."
+    rows: list[str] = []
+    for job in jobs[:15]:
+        started = datetime.fromtimestamp(job.created_at).strftime("%H:%M:%S")
+        state = JOB_STATE_TITLES.get(job.state, job.state)
+        rows.append(f"#{job.id} {started} {state} ({job.duration:.0f} c)\n   {job.title}")
+    body = "\n".join(rows)
+    return f"<b>🗂 Задачи</b>\n<pre>{html.escape(body)}</pre>"
@@ -0,0 +1,92 @@
+import argparse
+import gzip
+import io
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.backups import COMPRESSION_GZIP, COMPRESSION_ZSTD, open_compressor, zstandard
+
+WORKER_COUNTS = (1, 2, 4, 8)
+CHUNK = 64 * 1024
+
+
+class CountingSink(io.RawIOBase):
+    def __init__(self, keep: bool) -> None:
+        self.size = 0
+        self.buffer = bytearray() if keep else None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        if self.buffer is not None:
+            self.buffer += data
+        return len(data)
+
+
+def sample_data(size: int) -> bytes:
+    rng = random.Random(42)
+    words = [bytes(rng.choice(b"abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10))) for _ in range(5000)]
+    parts: list[bytes] = []
+    total = 0
+    while total < size:
+        if rng.random() < 0.2:
+            part = os.urandom(CHUNK)
+        else:
+            part = b" ".join(rng.choice(words) for _ in range(CHUNK // 6))
+        parts.append(part)
+        total += len(part)
+    return b"".join(parts)[:size]
+
+
+def load_data(path: Path | None, size: int) -> bytes:
+    if path is None:
+        return sample_data(size)
+    with path.open("rb") as handle:
+        return handle.read(size)
+
+
+def run(data: bytes, compression: str, workers: int, verify: bool) -> tuple[float, int]:
+    sink = CountingSink(keep=verify)
+    started = time.perf_counter()
+    with open_compressor(sink, compression, workers) as stream:
+        view = memoryview(data)
+        for offset in range(0, len(view), CHUNK):
+            stream.write(view[offset : offset + CHUNK])
+    elapsed = time.perf_counter() - started
+    if verify and compression == COMPRESSION_GZIP and gzip.decompress(bytes(sink.buffer)) != data:
+        raise SystemExit(f"gzip output mismatch at {workers} workers")
+    return elapsed, sink.size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backup compression throughput at 1/2/4/8 workers")
+    parser.add_argument("path", nargs="?", type=Path, help="file to compress (default: synthetic data)")
+    parser.add_argument("--size", type=int, default=256, help="MiB to compress")
+    parser.add_argument("--zstd", action="store_true", help="also benchmark zstd if zstandard is installed")
+    parser.add_argument("--verify", action="store_true", help="decompress gzip output and compare")
+    args = parser.parse_args()
+
+    data = load_data(args.path, args.size * 1024 * 1024)
+    modes = [COMPRESSION_GZIP]
+    if args.zstd and zstandard is not None:
+        modes.append(COMPRESSION_ZSTD)
+    print(f"input: {len(data) / 1024**2:.1f} MiB, cpus: {os.cpu_count()}")
+    print(f"{'mode':<6}{'workers':>8}{'MiB/s':>10}{'ratio':>8}{'speedup':>9}")
+    for mode in modes:
+        baseline: float | None = None
+        for workers in WORKER_COUNTS:
+            elapsed, size = run(data, mode, workers, args.verify)
+            throughput = len(data) / 1024**2 / elapsed
+            baseline = baseline or throughput
+            print(f"{mode:<6}{workers:>8}{throughput:>10.1f}{size / len(data):>8.3f}{throughput / baseline:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()